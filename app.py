@@ -18,9 +18,11 @@ import streamlit as st
 import os
 import sys
 import time
+import hashlib
 import logging
 from typing import Dict, List, Any, Optional
 from datetime import datetime
+from dataclasses import replace
 from pathlib import Path
 import re
 import json
@@ -120,11 +122,13 @@ except Exception as e:
 
 try:
     # Core required modules
-    from modules.universal_document_reader import UniversalDocumentReader, DocumentMetadata, DocumentPage
+    from modules.universal_document_reader import UniversalDocumentReader, DocumentMetadata, DocumentPage, cached_thumbnail
     from modules.intelligent_processor import IntelligentProcessor, ProcessingResult
     from modules.gpt_dialogue_generator import GPTDialogueGenerator
     from modules.enhanced_universal_extractor import EnhancedUniversalExtractor
     from modules.multi_format_exporter import MultiFormatExporter
+    from modules.file_storage_manager import get_file_storage, open_mapped
+    from modules.processing_cache import get_processing_cache, processing_cache_key
     REQUIRED_MODULES = ['universal_document_reader', 'intelligent_processor', 
                        'gpt_dialogue_generator', 'enhanced_universal_extractor', 
                        'multi_format_exporter']
@@ -144,7 +148,8 @@ optional_imports = {
     'ui_state_manager': 'modules.ui_state_manager',
     'realtime_ai_processor': 'modules.realtime_ai_processor',
     'ai_chat_interface': 'modules.ai_chat_interface',
-    'edit_mode_manager': 'modules.edit_mode_manager'
+    'edit_mode_manager': 'modules.edit_mode_manager',
+    'semantic_index': 'modules.semantic_index'
 }
 
 for module_name, module_path in optional_imports.items():
@@ -161,6 +166,8 @@ for module_name, module_path in optional_imports.items():
             from modules.ai_chat_interface import AIChatInterface, get_ai_chat_interface
         elif module_name == 'edit_mode_manager':
             from modules.edit_mode_manager import EditModeManager, get_edit_mode_manager
+        elif module_name == 'semantic_index':
+            from modules.semantic_index import SemanticIndexManager, get_semantic_index_manager
         OPTIONAL_MODULES.append(module_name)
     except ImportError as e:
         MODULE_ERRORS[module_name] = str(e)
@@ -190,6 +197,10 @@ for module_name, module_path in optional_imports.items():
             
             def initialize_persistent_session():
                 pass
+        
+        elif module_name == 'semantic_index':
+            def get_semantic_index_manager(encoder=None):
+                return None
 
 # Import new framework modules
 framework_imports = {
@@ -1056,6 +1067,8 @@ class UniversalDocumentReaderApp:
         self.realtime_ai = get_realtime_ai_processor()
         self.ai_chat = get_ai_chat_interface()
         self.edit_manager = get_edit_mode_manager()
+        self.semantic_index = get_semantic_index_manager(self.nlp_processor.sentence_model)
+        self.processing_cache = get_processing_cache(getattr(self.persistence, 'db', None))
         
         self._initialize_session_state()
         self._initialize_database_session()
@@ -1066,6 +1079,7 @@ class UniversalDocumentReaderApp:
         defaults = {
             # Document state
             "current_document": None,
+            "current_document_hash": None,
             "current_page": 1,
             "total_pages": 0,
             "zoom_level": 1.0,
@@ -1444,6 +1458,11 @@ class UniversalDocumentReaderApp:
         
         badge_color = format_colors.get(doc.format_type.lower(), '#666666')
         
+        # First-page preview if thumbnails were generated when the document was opened
+        preview = cached_thumbnail(doc.file_hash) if getattr(doc, 'file_hash', None) else None
+        if preview:
+            st.image(preview, use_container_width=True)
+        
         st.markdown(f"""
         <div class="file-thumbnail" onclick="loadDocument('{doc.document_id}')">
             <div class="file-badge" style="background: {badge_color};">
@@ -1506,8 +1525,9 @@ class UniversalDocumentReaderApp:
                         for warning in validation_result.warnings:
                             st.warning(f"⚠️ {warning}")
                 
-                # Read file content
-                file_content = uploaded_file.read()
+                # Stream the upload to storage once, hashing it on the way;
+                # later stages work from the stored file instead of byte copies
+                upload = get_file_storage().ingest_upload(uploaded_file, uploaded_file.name)
                 
                 # Safe file type extraction
                 file_parts = uploaded_file.name.split('.')
@@ -1520,7 +1540,7 @@ class UniversalDocumentReaderApp:
                 if 'business_rules' in OPTIONAL_MODULES and context:
                     valid, mode, errors = integration_manager.validate_and_process_file(
                         uploaded_file.name,
-                        len(file_content),
+                        upload.size,
                         context
                     )
                     
@@ -1537,15 +1557,18 @@ class UniversalDocumentReaderApp:
                 
                 # Store in database first
                 try:
-                    document_id = self.persistence.store_document(
-                        file_content=file_content,
-                        filename=uploaded_file.name,
-                        format_type=file_type,
-                        metadata={
-                            'upload_time': datetime.now().isoformat(),
-                            'file_size': len(file_content)
-                        }
-                    )
+                    with open_mapped(upload.path) as file_content:
+                        document_id = self.persistence.store_document(
+                            file_content=file_content,
+                            filename=uploaded_file.name,
+                            format_type=file_type,
+                            metadata={
+                                'upload_time': datetime.now().isoformat(),
+                                'file_size': upload.size
+                            },
+                            file_hash=upload.sha256,
+                            storage_path=str(upload.path)
+                        )
                 except Exception as e:
                     logger.error(f"Failed to store document in database: {e}")
                     st.error(f"Failed to save document: {str(e)}")
@@ -1554,9 +1577,10 @@ class UniversalDocumentReaderApp:
                 # Load with document reader
                 try:
                     result = self.document_reader.load_document(
-                        file_content, 
+                        upload.path, 
                         file_type, 
-                        uploaded_file.name
+                        uploaded_file.name,
+                        content_hash=upload.sha256
                     )
                 except Exception as e:
                     logger.error(f"Document reader error: {e}")
@@ -1567,12 +1591,18 @@ class UniversalDocumentReaderApp:
                     # Update session state with database integration
                     st.session_state.current_document = result
                     st.session_state.current_document_id = document_id
+                    st.session_state.current_document_hash = upload.sha256
+                    st.session_state.current_document_source = str(upload.path)
+                    st.session_state.current_document_type = file_type
                     st.session_state.total_pages = result['total_pages']
                     st.session_state.current_page = 1
                     st.session_state.document_loaded = True
                     st.session_state.table_of_contents = result.get('toc', [])
                     st.session_state.files_processed += 1
                     
+                    # Embed document chunks in the background for semantic search
+                    self._start_semantic_indexing()
+                    
                     # Load persistent bookmarks from database
                     bookmarks = self.persistence.get_bookmarks(document_id)
                     st.session_state.bookmarks = bookmarks
@@ -1581,6 +1611,10 @@ class UniversalDocumentReaderApp:
                     self.persistence.save_session_state()
                     
                     st.success(f"✅ Document loaded: {uploaded_file.name} (ID: {document_id[:8]})")
+                    if upload.rss_growth_mb is not None:
+                        st.caption(f"Stored {upload.size / (1024 * 1024):.1f}MB; "
+                                   f"memory during upload: {upload.rss_growth_mb:+.1f}MB "
+                                   f"(now {upload.rss_after_mb:.0f}MB)")
                     
                     # Don't rerun - let the UI update naturally
                     # st.rerun() can cause authentication state loss
@@ -1660,10 +1694,11 @@ class UniversalDocumentReaderApp:
         """Load document from database history"""
         try:
             with st.spinner("📖 Loading document from history..."):
-                # Get document content from database
+                # Get document content from database, or the stored upload for binary formats
                 content = self.persistence.load_document(document_id)
+                storage_path = None if content else self.persistence.db.get_document_storage_path(document_id)
                 
-                if content:
+                if content or storage_path:
                     # Get document metadata
                     doc_record = self.persistence.db.get_document(document_id)
                     
@@ -1672,21 +1707,28 @@ class UniversalDocumentReaderApp:
                         return
                     
                     # Load with document reader
+                    source = content.encode('utf-8') if content else str(storage_path)
                     result = self.document_reader.load_document(
-                        content.encode('utf-8'),
+                        Path(source) if isinstance(source, str) else source,
                         doc_record.format_type,
-                        doc_record.filename
+                        doc_record.filename,
+                        content_hash=doc_record.file_hash
                     )
                     
                     if result and result.get('success', False):
                         # Update session state
                         st.session_state.current_document = result
                         st.session_state.current_document_id = document_id
+                        st.session_state.current_document_hash = doc_record.file_hash
+                        st.session_state.current_document_source = source
+                        st.session_state.current_document_type = doc_record.format_type
                         st.session_state.total_pages = result['total_pages']
                         st.session_state.current_page = 1
                         st.session_state.document_loaded = True
                         st.session_state.table_of_contents = result.get('toc', [])
                         
+                        self._start_semantic_indexing()
+                        
                         # Restore document state from database
                         try:
                             self.persistence.restore_document_state(document_id)
@@ -1815,6 +1857,25 @@ class UniversalDocumentReaderApp:
             else:
                 st.info("No table of contents available")
         
+        # Page thumbnails around the current page
+        if st.session_state.current_document and st.session_state.current_document.get('format') == 'pdf':
+            with st.expander("🖼️ Pages", expanded=False):
+                first_page = max(1, st.session_state.current_page - 4)
+                last_page = min(st.session_state.total_pages, first_page + 8)
+                thumb_cols = st.columns(3)
+                for i, page_num in enumerate(range(first_page, last_page + 1)):
+                    with thumb_cols[i % 3]:
+                        # Thumbnails are generated in the background; never rasterize here
+                        thumbnail = self.document_reader.render_thumbnail(page_num, cached_only=True)
+                        if thumbnail:
+                            st.image(thumbnail, use_container_width=True)
+                        else:
+                            st.caption("⏳ Preview pending")
+                        if st.button(f"{page_num}", key=f"thumb_page_{page_num}",
+                                     disabled=page_num == st.session_state.current_page):
+                            st.session_state.current_page = page_num
+                            st.rerun()
+        
         # Bookmarks
         with st.expander("🔖 Bookmarks", expanded=False):
             if st.session_state.bookmarks:
@@ -2031,6 +2092,19 @@ class UniversalDocumentReaderApp:
         
         # Document page display with AI insights
         try:
+            # Show the cached thumbnail immediately and swap in the full page once rendered
+            page_image_slot = st.empty()
+            if not self.document_reader.is_page_rendered(st.session_state.current_page,
+                                                         st.session_state.zoom_level):
+                preview = self.document_reader.render_thumbnail(st.session_state.current_page,
+                                                                cached_only=True)
+                if preview:
+                    page_image_slot.image(
+                        preview,
+                        caption=f"Page {st.session_state.current_page} (loading...)",
+                        use_container_width=True
+                    )
+            
             page_data = self.document_reader.render_page(
                 st.session_state.current_page, 
                 st.session_state.zoom_level
@@ -2048,7 +2122,7 @@ class UniversalDocumentReaderApp:
                 
                 # Display page image if available
                 if page_data.image_data:
-                    st.image(
+                    page_image_slot.image(
                         page_data.image_data, 
                         caption=f"Page {st.session_state.current_page}",
                         use_container_width=True
@@ -2371,57 +2445,43 @@ class UniversalDocumentReaderApp:
                 st.session_state.processing_results.extend(results)
                 
                 # Save each result to database
-                for result in results:
-                    try:
-                        result_data = {
-                            'id': result.id,
-                            'type': result.type,
-                            'content': result.content,
-                            'source_text': result.source_text,
-                            'metadata': result.metadata,
-                            'timestamp': result.timestamp
-                        }
-                        
-                        self.persistence.save_processing_result(
-                            processing_mode=st.session_state.current_processing_mode,
-                            page_number=st.session_state.current_page,
-                            result_data=result_data,
-                            confidence=result.confidence
-                        )
-                    except Exception as e:
-                        logger.warning(f"Failed to save result to database: {e}")
-                    
-                    # Add to processing history (session state)
-                    page_key = f"page_{st.session_state.current_page}"
-                    st.session_state.processing_history[page_key] = {
-                        'page_number': st.session_state.current_page,
-                        'mode': st.session_state.current_processing_mode,
-                        'results': results,
-                        'timestamp': datetime.now().isoformat()
-                    }
-                    
-                    st.session_state.total_processing_operations += 1
-                    
-                    # Save session state to database
-                    self.persistence.save_session_state()
-                    
-                    st.success(f"Generated {len(results)} results (saved to database)!")
-                    
-                    # Complete progress tracking
-                    if 'ux_improvements' in OPTIONAL_MODULES:
-                        ux_enhancements.progress_tracker.complete_operation(
-                            operation_id, True, f"✅ Successfully processed {len(results)} results!"
-                        )
-                    
-                    st.rerun()
-                else:
-                    st.warning("No results generated")
-                    
-                    # Complete progress tracking
-                    if 'ux_improvements' in OPTIONAL_MODULES:
-                        ux_enhancements.progress_tracker.complete_operation(
-                            operation_id, False, "No results generated"
-                        )
+                self._save_processing_results(
+                    results, page_text,
+                    st.session_state.current_processing_mode,
+                    st.session_state.current_page
+                )
+                
+                # Add to processing history (session state)
+                page_key = f"page_{st.session_state.current_page}"
+                st.session_state.processing_history[page_key] = {
+                    'page_number': st.session_state.current_page,
+                    'mode': st.session_state.current_processing_mode,
+                    'results': results,
+                    'timestamp': datetime.now().isoformat()
+                }
+                
+                st.session_state.total_processing_operations += 1
+                
+                # Save session state to database
+                self.persistence.save_session_state()
+                
+                st.success(f"Generated {len(results)} results (saved to database)!")
+                
+                # Complete progress tracking
+                if 'ux_improvements' in OPTIONAL_MODULES:
+                    ux_enhancements.progress_tracker.complete_operation(
+                        operation_id, True, f"✅ Successfully processed {len(results)} results!"
+                    )
+                
+                st.rerun()
+            else:
+                st.warning("No results generated")
+                
+                # Complete progress tracking
+                if 'ux_improvements' in OPTIONAL_MODULES:
+                    ux_enhancements.progress_tracker.complete_operation(
+                        operation_id, False, "No results generated"
+                    )
                     
         except Exception as e:
             logger.error(f"Processing error: {e}")
@@ -2644,7 +2704,8 @@ class UniversalDocumentReaderApp:
             response = self.ai_chat.send_message(
                 initial_message,
                 document_context=selected_text,
-                current_page=st.session_state.current_page
+                current_page=st.session_state.current_page,
+                document_hash=st.session_state.get('current_document_hash')
             )
             
             # Show chat interface
@@ -2660,7 +2721,61 @@ class UniversalDocumentReaderApp:
         """Legacy method - redirects to enhanced processing"""
         self._process_selected_text_enhanced(selected_text)
     
+    def _processing_cache_key(self, text: str, mode: str) -> str:
+        """Cache key for processing text with a mode under the current settings"""
+        params = {}
+        if mode == "Keyword Analysis":
+            params['keywords'] = (st.session_state.get('keywords', '') or '').split(',')
+        elif mode == "Context Extraction":
+            params['context_query'] = st.session_state.get('context_query', '')
+            params['gpu_accelerated'] = 'gpu_accelerator' in OPTIONAL_MODULES
+        if st.session_state.get('use_openai', False):
+            params['ai_model'] = st.session_state.get('ai_model')
+            params['ai_temperature'] = st.session_state.get('ai_temperature')
+        return processing_cache_key(text, mode, params, self.nlp_processor.model_version)
+    
+    def _save_processing_results(self, results: List[ProcessingResult], text: str, mode: str, page_number: int):
+        """Save freshly computed results to the database, reusable through their cache key"""
+        if not hasattr(self.persistence, 'save_processing_result'):
+            return
+        cache_key = self._processing_cache_key(text, mode)
+        for result in results:
+            # Cache hits are already stored under this key
+            if result.metadata.get('from_cache'):
+                continue
+            try:
+                result_data = {
+                    'id': result.id,
+                    'type': result.type,
+                    'content': result.content,
+                    'source_text': result.source_text,
+                    'metadata': result.metadata,
+                    'timestamp': result.timestamp
+                }
+                
+                self.persistence.save_processing_result(
+                    processing_mode=mode,
+                    page_number=page_number,
+                    result_data=result_data,
+                    confidence=result.confidence,
+                    cache_key=cache_key
+                )
+            except Exception as e:
+                logger.warning(f"Failed to save result to database: {e}")
+    
     def _process_text_with_mode(self, text: str, mode: str, page_number: int) -> List[ProcessingResult]:
+        """Process text with specified mode, reusing stored results for identical text and settings"""
+        cache_key = self._processing_cache_key(text, mode)
+        cached_results = self.processing_cache.get(cache_key, page_number)
+        if cached_results is not None:
+            logger.debug(f"Reusing {len(cached_results)} cached {mode} results for page {page_number}")
+            return cached_results
+        
+        results = self._run_processing_mode(text, mode, page_number)
+        self.processing_cache.put(cache_key, results)
+        return results
+    
+    def _run_processing_mode(self, text: str, mode: str, page_number: int) -> List[ProcessingResult]:
         """Process text with specified mode"""
         results = []
         
@@ -2782,11 +2897,14 @@ class UniversalDocumentReaderApp:
                         )
                         
                         if enhanced and not enhanced.get('is_demo', False):
-                            # Update result with enhanced content
-                            result.content = enhanced['content']
-                            result.confidence = enhanced['quality_score']
-                            result.metadata['enhanced_with_ai'] = True
-                            result.metadata['model_used'] = enhanced['model_used']
+                            # New result: the processor's results may be shared through its cache
+                            result = replace(
+                                result,
+                                content=enhanced['content'],
+                                confidence=enhanced['quality_score'],
+                                metadata={**result.metadata, 'enhanced_with_ai': True,
+                                          'model_used': enhanced['model_used']}
+                            )
                 
                 enhanced_results.append(result)
             
@@ -2810,13 +2928,15 @@ class UniversalDocumentReaderApp:
             total_pages = end_page - start_page + 1
             all_results = []
             
-            for i, page_num in enumerate(range(start_page, end_page + 1)):
+            # Pages are pulled one at a time rather than materializing the range
+            for i, page in enumerate(self.document_reader.iter_pages(start_page, end_page)):
+                page_num = page.page_number
                 progress = (i + 1) / total_pages
                 progress_bar.progress(progress)
                 status_text.text(f"Processing page {page_num}...")
                 
-                # Extract and process page
-                page_text = self.document_reader.extract_page_text(page_num)
+                # Process page
+                page_text = page.text_content
                 if page_text:
                     results = self._process_text_with_mode(
                         page_text,
@@ -2826,6 +2946,11 @@ class UniversalDocumentReaderApp:
                     
                     if results:
                         all_results.extend(results)
+                        self._save_processing_results(
+                            results, page_text,
+                            st.session_state.current_processing_mode,
+                            page_num
+                        )
                         
                         # Store in history
                         page_key = f"page_{page_num}"
@@ -3178,34 +3303,48 @@ class UniversalDocumentReaderApp:
         
         return results
     
+    def _document_pages(self):
+        """Yield (page number, text) for every page of the current document"""
+        for page_num in range(1, st.session_state.total_pages + 1):
+            yield page_num, self.document_reader.extract_page_text(page_num) or ""
+    
+    def _start_semantic_indexing(self):
+        """Queue chunk embedding for the current document"""
+        if not self.semantic_index or not self.semantic_index.available:
+            return
+        doc_hash = st.session_state.get('current_document_hash')
+        source = st.session_state.get('current_document_source')
+        file_type = st.session_state.get('current_document_type')
+        if not doc_hash or not source or not file_type or self.semantic_index.get(doc_hash, wait=False):
+            return
+        
+        try:
+            # The worker opens its own copy of the document; nothing is extracted on this thread
+            self.semantic_index.build_async(doc_hash, source, file_type)
+        except Exception as e:
+            logger.warning(f"Failed to start semantic indexing: {e}")
+    
     def _semantic_search(self, query: str, max_results: int):
-        """Semantic search using sentence similarity"""
+        """Semantic search over the document's chunk embeddings"""
         results = []
         
         try:
-            # Use the NLP processor's semantic search if available
-            if hasattr(self.nlp_processor, 'sentence_transformers_available') and self.nlp_processor.sentence_transformers_available:
-                for page_num in range(1, st.session_state.total_pages + 1):
-                    page_text = self.document_reader.extract_page_text(page_num)
-                    if not page_text:
-                        continue
-                    
-                    # Extract context using the NLP processor
-                    context_results = self.nlp_processor.extract_context_based_content(
-                        page_text, query, 0.3, page_num
-                    )
-                    
-                    for result in context_results:
-                        if len(results) >= max_results:
-                            return results
-                            
-                        results.append({
-                            'page': page_num,
-                            'text': query,
-                            'context': result.content[:200] + "...",
-                            'confidence': result.confidence,
-                            'match_type': 'semantic'
-                        })
+            doc_hash = st.session_state.get('current_document_hash')
+            if self.semantic_index and self.semantic_index.available and doc_hash:
+                matches = self.semantic_index.search(
+                    doc_hash, query, top_k=max_results, pages=self._document_pages()
+                )
+                
+                for chunk, score in matches:
+                    if score < 0.3:
+                        break
+                    results.append({
+                        'page': chunk.page_number,
+                        'text': query,
+                        'context': chunk.text[:200] + "...",
+                        'confidence': score,
+                        'match_type': 'semantic'
+                    })
             
             else:
                 # Fallback to keyword-based search
@@ -3361,7 +3500,8 @@ class UniversalDocumentReaderApp:
             response = self.ai_chat.send_message(
                 message,
                 document_context=context,
-                current_page=st.session_state.current_page
+                current_page=st.session_state.current_page,
+                document_hash=st.session_state.get('current_document_hash')
             )
             
             # Clear input
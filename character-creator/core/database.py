@@ -8,7 +8,7 @@ SQLite database setup and management for character storage.
 import sqlite3
 import json
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
 from contextlib import contextmanager
 
@@ -197,6 +197,97 @@ class DatabaseManager:
                 ON emotional_memory(user_id)
             """)
             
+            # Emotional memory state: latest compact snapshot plus an append-only delta log
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS emotional_memory_snapshots (
+                    character_id TEXT NOT NULL,
+                    user_id TEXT NOT NULL DEFAULT '',
+                    seq INTEGER NOT NULL,
+                    state BLOB NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (character_id, user_id)
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS emotional_memory_deltas (
+                    character_id TEXT NOT NULL,
+                    user_id TEXT NOT NULL DEFAULT '',
+                    seq INTEGER NOT NULL,
+                    delta JSON NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (character_id, user_id, seq)
+                )
+            """)
+            
+            # Long-term memories are append-only and loaded on demand
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS emotional_long_term_memories (
+                    character_id TEXT NOT NULL,
+                    user_id TEXT NOT NULL DEFAULT '',
+                    seq INTEGER NOT NULL,
+                    memory JSON NOT NULL,
+                    PRIMARY KEY (character_id, user_id, seq)
+                )
+            """)
+            
+            # Append-only conversation log, one row per turn
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS conversation_turns (
+                    character_id TEXT NOT NULL,
+                    session_id TEXT NOT NULL,
+                    turn_no INTEGER NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    metadata JSON,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (character_id, session_id, turn_no)
+                )
+            """)
+            
+            # Rolling summary of turns that fell out of the context window
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS conversation_summaries (
+                    character_id TEXT NOT NULL,
+                    session_id TEXT NOT NULL,
+                    up_to_turn INTEGER NOT NULL,
+                    summary TEXT NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (character_id, session_id)
+                )
+            """)
+            
+            # Library version, bumped on every character write to invalidate derived data
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS character_library_version (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    version INTEGER NOT NULL
+                )
+            """)
+            
+            cursor.execute("""
+                INSERT OR IGNORE INTO character_library_version (id, version) VALUES (1, 0)
+            """)
+            
+            # Library version at which each character was last written
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS character_versions (
+                    character_id TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+            """)
+            
+            # Precomputed top-k partner rankings (fusion compatibility, similarity)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS character_rankings (
+                    character_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    rankings JSON NOT NULL,
+                    PRIMARY KEY (character_id, kind)
+                )
+            """)
+            
             logger.info("Database initialized successfully")
     
     def save_character(self, character: Character) -> bool:
@@ -250,6 +341,7 @@ class DatabaseManager:
                     ))
                     logger.info(f"Created character: {character.name} ({character.id})")
                 
+                self._bump_library_version(cursor, character.id)
                 return True
                 
         except Exception as e:
@@ -276,6 +368,19 @@ class DatabaseManager:
             logger.error(f"Error getting character: {e}")
             return None
     
+    def get_character_record(self, character_id: str) -> Optional[Dict[str, Any]]:
+        """Raw stored data for a character, including fields Character does not model"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT data FROM characters WHERE id = ?", (character_id,))
+                row = cursor.fetchone()
+                return json.loads(row['data']) if row else None
+                
+        except Exception as e:
+            logger.error(f"Error getting character record: {e}")
+            return None
+    
     def list_characters(
         self, 
         status: Optional[CharacterStatus] = None,
@@ -362,6 +467,7 @@ class DatabaseManager:
                     WHERE id = ?
                 """, (json.dumps(character_dict), character_id))
                 
+                self._bump_library_version(cursor, character_id)
                 logger.info(f"Updated character: {character_id}")
                 return True
                 
@@ -375,6 +481,9 @@ class DatabaseManager:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("DELETE FROM characters WHERE id = ?", (character_id,))
+                cursor.execute("DELETE FROM character_rankings WHERE character_id = ?", (character_id,))
+                self._bump_library_version(cursor, character_id)
+                cursor.execute("DELETE FROM character_versions WHERE character_id = ?", (character_id,))
                 logger.info(f"Deleted character: {character_id}")
                 return True
                 
@@ -382,6 +491,224 @@ class DatabaseManager:
             logger.error(f"Error deleting character: {e}")
             return False
     
+    def append_conversation_turn(
+        self,
+        character_id: str,
+        session_id: str,
+        turn_no: int,
+        role: str,
+        content: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Append one turn to the conversation log"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO conversation_turns
+                    (character_id, session_id, turn_no, role, content, metadata)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (character_id, session_id, turn_no, role, content, json.dumps(metadata or {})))
+                return True
+                
+        except Exception as e:
+            logger.error(f"Error appending conversation turn: {e}")
+            return False
+    
+    def get_conversation_turns(
+        self,
+        character_id: str,
+        session_id: str,
+        after_turn: int = 0,
+        up_to_turn: Optional[int] = None,
+        last_n: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Get a range of conversation turns (or only the last N), oldest first"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                query = """
+                    SELECT turn_no, role, content, metadata, created_at FROM conversation_turns
+                    WHERE character_id = ? AND session_id = ? AND turn_no > ?
+                """
+                params = [character_id, session_id, after_turn]
+                if up_to_turn is not None:
+                    query += " AND turn_no <= ?"
+                    params.append(up_to_turn)
+                if last_n is not None:
+                    query += " ORDER BY turn_no DESC LIMIT ?"
+                    params.append(last_n)
+                else:
+                    query += " ORDER BY turn_no"
+                
+                cursor.execute(query, params)
+                turns = [
+                    {
+                        'turn_no': row['turn_no'],
+                        'role': row['role'],
+                        'content': row['content'],
+                        'metadata': json.loads(row['metadata'] or '{}'),
+                        'created_at': row['created_at']
+                    }
+                    for row in cursor.fetchall()
+                ]
+                return turns[::-1] if last_n is not None else turns
+                
+        except Exception as e:
+            logger.error(f"Error getting conversation turns: {e}")
+            return []
+    
+    def get_last_turn_no(self, character_id: str, session_id: str) -> int:
+        """Highest stored turn number for a conversation (0 if none)"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT MAX(turn_no) AS last_turn FROM conversation_turns
+                    WHERE character_id = ? AND session_id = ?
+                """, (character_id, session_id))
+                row = cursor.fetchone()
+                return row['last_turn'] or 0
+                
+        except Exception as e:
+            logger.error(f"Error getting last turn number: {e}")
+            return 0
+    
+    def save_conversation_summary(self, character_id: str, session_id: str, up_to_turn: int, summary: str) -> bool:
+        """Store the summary of a conversation's older turns"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO conversation_summaries (character_id, session_id, up_to_turn, summary, updated_at)
+                    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(character_id, session_id) DO UPDATE SET
+                        up_to_turn = excluded.up_to_turn,
+                        summary = excluded.summary,
+                        updated_at = excluded.updated_at
+                """, (character_id, session_id, up_to_turn, summary))
+                return True
+                
+        except Exception as e:
+            logger.error(f"Error saving conversation summary: {e}")
+            return False
+    
+    def get_conversation_summary(self, character_id: str, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get the summary of a conversation's older turns"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT up_to_turn, summary FROM conversation_summaries
+                    WHERE character_id = ? AND session_id = ?
+                """, (character_id, session_id))
+                row = cursor.fetchone()
+                return {'up_to_turn': row['up_to_turn'], 'summary': row['summary']} if row else None
+                
+        except Exception as e:
+            logger.error(f"Error getting conversation summary: {e}")
+            return None
+    
+    def _bump_library_version(self, cursor, character_id: str):
+        """Mark one character's derived data (feature matrix row, rankings) as stale"""
+        cursor.execute("UPDATE character_library_version SET version = version + 1 WHERE id = 1")
+        cursor.execute("""
+            INSERT OR REPLACE INTO character_versions (character_id, version)
+            SELECT ?, version FROM character_library_version WHERE id = 1
+        """, (character_id,))
+    
+    def get_library_version(self) -> int:
+        """Current character library version"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT version FROM character_library_version WHERE id = 1")
+                row = cursor.fetchone()
+                return row['version'] if row else 0
+                
+        except Exception as e:
+            logger.error(f"Error getting library version: {e}")
+            return 0
+    
+    def get_character_version(self, character_id: str) -> int:
+        """Library version at which a character was last written (0 if never tracked)"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT version FROM character_versions WHERE character_id = ?", (character_id,))
+                row = cursor.fetchone()
+                return row['version'] if row else 0
+                
+        except Exception as e:
+            logger.error(f"Error getting character version: {e}")
+            return 0
+    
+    def list_character_changes(self, since_version: int) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Records written after a library version, plus the ids of every current character"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT c.data FROM characters c
+                    JOIN character_versions v ON v.character_id = c.id
+                    WHERE v.version > ?
+                    ORDER BY c.created_at, c.id
+                """, (since_version,))
+                changed = [json.loads(row['data']) for row in cursor.fetchall()]
+                cursor.execute("SELECT id FROM characters")
+                return changed, [row['id'] for row in cursor.fetchall()]
+                
+        except Exception as e:
+            logger.error(f"Error listing character changes: {e}")
+            raise RuntimeError(f"Failed to list character changes: {e}")
+    
+    def list_character_records(self) -> List[Dict[str, Any]]:
+        """Raw stored data for every character"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT data FROM characters ORDER BY created_at, id")
+                return [json.loads(row['data']) for row in cursor.fetchall()]
+                
+        except Exception as e:
+            logger.error(f"Error listing character records: {e}")
+            return []
+    
+    def save_character_rankings(self, kind: str, version: int, rankings: Dict[str, List[Any]]) -> bool:
+        """Store precomputed rankings of one kind for the given characters"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany("""
+                    INSERT OR REPLACE INTO character_rankings (character_id, kind, version, rankings)
+                    VALUES (?, ?, ?, ?)
+                """, [
+                    (character_id, kind, version, json.dumps(ranked))
+                    for character_id, ranked in rankings.items()
+                ])
+                return True
+                
+        except Exception as e:
+            logger.error(f"Error saving character rankings: {e}")
+            return False
+    
+    def get_character_rankings(self, character_id: str, kind: str, version: int) -> Optional[List[Any]]:
+        """Precomputed rankings for a character, if computed at the given library version"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT rankings FROM character_rankings
+                    WHERE character_id = ? AND kind = ? AND version = ?
+                """, (character_id, kind, version))
+                row = cursor.fetchone()
+                return json.loads(row['rankings']) if row else None
+                
+        except Exception as e:
+            logger.error(f"Error getting character rankings: {e}")
+            return None
+    
     def save_knowledge_chunks(
         self, 
         character_id: str, 
@@ -478,6 +805,37 @@ class DatabaseManager:
             logger.error(f"Error saving evolution record: {e}")
             return False
     
+    def save_evolution_records(self, records: List[Dict[str, Any]]) -> bool:
+        """Save a batch of evolution records in one transaction"""
+        if not records:
+            return True
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany("""
+                    INSERT INTO character_evolution 
+                    (character_id, evolution_type, previous_state, new_state, 
+                     trigger_event, metadata)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, [
+                    (
+                        record['character_id'],
+                        record['evolution_type'],
+                        json.dumps(record.get('previous_state', {})),
+                        json.dumps(record.get('new_state', {})),
+                        record.get('trigger_event', ''),
+                        json.dumps(record.get('metadata', {}))
+                    )
+                    for record in records
+                ])
+                
+                logger.info(f"Saved {len(records)} evolution records")
+                return True
+                
+        except Exception as e:
+            logger.error(f"Error saving evolution records: {e}")
+            return False
+    
     def get_evolution_records(
         self,
         character_id: str,
@@ -587,5 +945,116 @@ class DatabaseManager:
             logger.error(f"Error getting emotional memories: {e}")
             return []
 
+    def save_memory_snapshot(
+        self,
+        character_id: str,
+        seq: int,
+        state: bytes,
+        user_id: str = ''
+    ) -> bool:
+        """Replace the memory snapshot and drop the deltas it covers"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO emotional_memory_snapshots (character_id, user_id, seq, state)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(character_id, user_id) DO UPDATE SET
+                        seq = excluded.seq,
+                        state = excluded.state,
+                        created_at = CURRENT_TIMESTAMP
+                """, (character_id, user_id, seq, state))
+                cursor.execute("""
+                    DELETE FROM emotional_memory_deltas
+                    WHERE character_id = ? AND user_id = ? AND seq <= ?
+                """, (character_id, user_id, seq))
+                
+                return True
+                
+        except Exception as e:
+            logger.error(f"Error saving memory snapshot: {e}")
+            return False
+    
+    def load_memory_snapshot(self, character_id: str, user_id: str = '') -> Optional[Dict[str, Any]]:
+        """Get the latest memory snapshot as {'seq', 'state'}"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT seq, state FROM emotional_memory_snapshots
+                    WHERE character_id = ? AND user_id = ?
+                """, (character_id, user_id))
+                row = cursor.fetchone()
+                
+                return {'seq': row['seq'], 'state': row['state']} if row else None
+                
+        except Exception as e:
+            logger.error(f"Error loading memory snapshot: {e}")
+            return None
+    
+    def append_memory_delta(
+        self,
+        character_id: str,
+        seq: int,
+        delta: Dict[str, Any],
+        long_term_memory: Optional[Dict[str, Any]] = None,
+        user_id: str = ''
+    ) -> bool:
+        """Append one interaction to the delta log (and the long-term store if significant)"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT OR REPLACE INTO emotional_memory_deltas (character_id, user_id, seq, delta)
+                    VALUES (?, ?, ?, ?)
+                """, (character_id, user_id, seq, json.dumps(delta)))
+                
+                if long_term_memory is not None:
+                    cursor.execute("""
+                        INSERT OR IGNORE INTO emotional_long_term_memories
+                        (character_id, user_id, seq, memory)
+                        VALUES (?, ?, ?, ?)
+                    """, (character_id, user_id, seq, json.dumps(long_term_memory)))
+                
+                return True
+                
+        except Exception as e:
+            logger.error(f"Error appending memory delta: {e}")
+            return False
+    
+    def get_memory_deltas(self, character_id: str, after_seq: int = 0, user_id: str = '') -> List[Dict[str, Any]]:
+        """Get deltas newer than a snapshot, oldest first"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT seq, delta FROM emotional_memory_deltas
+                    WHERE character_id = ? AND user_id = ? AND seq > ?
+                    ORDER BY seq
+                """, (character_id, user_id, after_seq))
+                
+                return [{'seq': row['seq'], 'delta': json.loads(row['delta'])} for row in cursor.fetchall()]
+                
+        except Exception as e:
+            logger.error(f"Error getting memory deltas: {e}")
+            return []
+    
+    def get_long_term_memories(self, character_id: str, up_to_seq: int, user_id: str = '') -> List[Dict[str, Any]]:
+        """Get stored long-term memories up to a sequence number, oldest first"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT memory FROM emotional_long_term_memories
+                    WHERE character_id = ? AND user_id = ? AND seq <= ?
+                    ORDER BY seq
+                """, (character_id, user_id, up_to_seq))
+                
+                return [json.loads(row['memory']) for row in cursor.fetchall()]
+                
+        except Exception as e:
+            logger.error(f"Error getting long-term memories: {e}")
+            return []
+
 # Global database instance
 db = DatabaseManager()
\ No newline at end of file
@@ -20,9 +20,11 @@ class AnalyticsAdapter:
         self._initialized = False
         self.dashboard = None
         self.visual_dashboard = None
+        self.rollups = None
         
         try:
-            from analytics_dashboard import AnalyticsDashboard
+            from analytics_dashboard import AnalyticsDashboard, AnalyticsRollups
+            self.rollups = AnalyticsRollups()
             self.dashboard = AnalyticsDashboard()
             self._initialized = True
             logger.info("AnalyticsDashboard initialized successfully")
@@ -67,6 +69,12 @@ class AnalyticsAdapter:
                 'data': event_data
             }
             
+            if self.rollups is not None:
+                self.rollups.add('event', event_type)
+                character_id = event_data.get('character_id')
+                if character_id:
+                    self.rollups.add('character', character_id)
+            
             if self._initialized and hasattr(self.dashboard, 'track_event'):
                 self.dashboard.track_event(event)
             else:
@@ -322,23 +330,66 @@ class AnalyticsAdapter:
         }
     
     def _get_top_characters(self, limit: int = 5) -> List[Dict[str, Any]]:
-        """Get top performing characters"""
-        # This would query actual data
-        return []
+        """Get top performing characters from the rollup totals"""
+        if self.rollups is None:
+            return []
+        
+        ranked = sorted(
+            self.rollups.dimensions('character'),
+            key=lambda character_id: -self.rollups.total('character', character_id).count
+        )
+        return [
+            {
+                'character_id': character_id,
+                'interactions': self.rollups.total('character', character_id).count
+            }
+            for character_id in ranked[:limit]
+        ]
     
     def _get_all_character_analytics(
         self,
         time_range: Optional[timedelta]
     ) -> Dict[str, Any]:
-        """Get analytics for all characters"""
-        # This would aggregate character data
-        return {}
+        """Get analytics for all characters from the daily rollups"""
+        if self.rollups is None:
+            return {}
+        
+        since = (datetime.now() - (time_range or timedelta(days=30))).timestamp()
+        analytics = {}
+        
+        for character_id in self.rollups.dimensions('character'):
+            daily = [
+                bucket for bucket_start, bucket in self.rollups.series('character', character_id, 'day')
+                if bucket_start >= since - 86400
+            ]
+            analytics[character_id] = {
+                'interactions': sum(bucket.count for bucket in daily),
+                'active_days': len(daily)
+            }
+        
+        return analytics
     
     def _get_usage_patterns(self) -> Dict[str, Any]:
-        """Get usage patterns"""
+        """Get usage patterns from the hourly rollups"""
+        if self.rollups is None:
+            return {
+                'peak_hours': [],
+                'popular_features': [],
+                'common_workflows': []
+            }
+        
+        hour_counts: Dict[int, int] = {}
+        event_counts: Dict[str, int] = {}
+        
+        for event_type in self.rollups.dimensions('event'):
+            event_counts[event_type] = self.rollups.total('event', event_type).count
+            for bucket_start, bucket in self.rollups.series('event', event_type, 'hour'):
+                hour = datetime.fromtimestamp(bucket_start).hour
+                hour_counts[hour] = hour_counts.get(hour, 0) + bucket.count
+        
         return {
-            'peak_hours': [],
-            'popular_features': [],
+            'peak_hours': sorted(hour_counts, key=lambda hour: -hour_counts[hour])[:3],
+            'popular_features': sorted(event_counts, key=lambda event: -event_counts[event])[:5],
             'common_workflows': []
         }
     
@@ -222,6 +222,41 @@ class IntelligentProcessorAdapter(NLPProcessorInterface):
             logger.error(f"Error extracting dialogue: {e}")
             return []
     
+    def extract_entities_and_dialogue(self, text: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+        """Entities and dialogue from a single spaCy parse when one is available"""
+        nlp = getattr(self.processor, 'nlp', None) if self._initialized else None
+        if nlp is None:
+            return super().extract_entities_and_dialogue(text)
+        
+        try:
+            doc = nlp(text)
+            entities = [{
+                'text': ent.text,
+                'type': ent.label_,
+                'start': ent.start_char,
+                'end': ent.end_char,
+                'confidence': 1.0
+            } for ent in doc.ents]
+            
+            # Quoted spans, attributed to a person named in the same sentence
+            import re
+            dialogue = []
+            for match in re.finditer(r'"([^"]+)"', text):
+                sentence = doc.char_span(match.start(), match.end(), alignment_mode='expand')
+                sentence = sentence.sent if sentence is not None else None
+                speakers = [ent.text for ent in sentence.ents if ent.label_ == 'PERSON'] if sentence else []
+                dialogue.append({
+                    'speaker': speakers[0] if speakers else 'Unknown',
+                    'text': match.group(1),
+                    'context': sentence.text if sentence is not None else ''
+                })
+            
+            return entities, dialogue
+            
+        except Exception as e:
+            logger.error(f"Error extracting entities and dialogue: {e}")
+            return [], []
+    
     def analyze_writing_style(self, text: str) -> Dict[str, Any]:
         """Analyze writing style and tone"""
         if not self._initialized:
@@ -90,6 +90,18 @@ class NLPProcessorInterface(ABC):
         """
         pass
     
+    def extract_entities_and_dialogue(self, text: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+        """
+        Entities and dialogue together, so implementations can share one parse
+        
+        Args:
+            text: Input text
+            
+        Returns:
+            (extract_entities(text), extract_dialogue(text)) shaped results
+        """
+        return self.extract_entities(text), self.extract_dialogue(text)
+    
     @abstractmethod
     def analyze_writing_style(self, text: str) -> Dict[str, Any]:
         """
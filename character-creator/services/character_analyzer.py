@@ -17,6 +17,8 @@ from integrations.config import integration_config
 from config.logging_config import logger
 from core.exceptions import DocumentProcessingError
 
+from .document_analysis import DocumentAnalysis, CharacterContextIndex
+
 class CharacterAnalyzer:
     """Deep character analysis for unique personality extraction"""
     
@@ -25,6 +27,10 @@ class CharacterAnalyzer:
         # Use the intelligent processor adapter
         self.nlp_adapter = IntelligentProcessorAdapter()
         
+        # Mention/context index for the document currently being analyzed
+        self._context_index: Optional[CharacterContextIndex] = None
+        self._indexed_text: Optional[str] = None
+        
         # Character-specific data
         self.character_data = defaultdict(lambda: {
             'speech_patterns': [],
@@ -52,8 +58,17 @@ class CharacterAnalyzer:
             }
         })
     
-    def analyze_character_depth(self, character_name: str, text: str, 
-                              dialogues: List[Dict], contexts: List[str]) -> Dict[str, Any]:
+    def build_index(self, text: str, analysis: Optional[DocumentAnalysis] = None) -> CharacterContextIndex:
+        """Index a document once so per-character analysis scales with mentions, not length"""
+        if self._context_index is None or self._indexed_text is not text:
+            analysis = analysis if analysis is not None and analysis.text is text else DocumentAnalysis(text, self.nlp_adapter)
+            self._context_index = CharacterContextIndex(analysis)
+            self._indexed_text = text
+        return self._context_index
+    
+    def analyze_character_depth(self, character_name: str, text: Optional[str], 
+                              dialogues: List[Dict], contexts: List[str],
+                              index: Optional[CharacterContextIndex] = None) -> Dict[str, Any]:
         """
         Perform deep analysis of a character
         
@@ -62,12 +77,18 @@ class CharacterAnalyzer:
             text: Full document text
             dialogues: Character's dialogues
             contexts: Contexts where character appears
+            index: Prebuilt mention index (e.g. a CharacterSliceIndex); built from text if omitted
             
         Returns:
             Deep character analysis
         """
         logger.info(f"Deep analysis for character: {character_name}")
         
+        if index is None:
+            index = self.build_index(text)
+        if not dialogues:
+            dialogues = index.dialogues(character_name)
+        
         # Analyze speech patterns
         speech_analysis = self._analyze_speech_patterns(dialogues)
         
@@ -78,7 +99,7 @@ class CharacterAnalyzer:
         behaviors = self._extract_unique_behaviors(character_name, contexts)
         
         # Analyze relationships dynamics
-        relationship_dynamics = self._analyze_relationship_dynamics(character_name, text)
+        relationship_dynamics = self._analyze_relationship_dynamics(character_name, index)
         
         # Extract character arc
         character_arc = self._extract_character_arc(character_name, contexts)
@@ -316,7 +337,7 @@ class CharacterAnalyzer:
         
         return unique_behaviors[:20]  # Top 20 unique behaviors
     
-    def _analyze_relationship_dynamics(self, character_name: str, text: str) -> Dict[str, Any]:
+    def _analyze_relationship_dynamics(self, character_name: str, index: CharacterContextIndex) -> Dict[str, Any]:
         """Analyze how character interacts with others"""
         dynamics = {
             'interaction_styles': defaultdict(list),
@@ -326,29 +347,27 @@ class CharacterAnalyzer:
             'alliance_patterns': []
         }
         
-        # Find all character interactions
-        sentences = text.split('.')
+        interaction_keywords = {
+            'supportive': ['helped', 'supported', 'encouraged', 'comforted', 'defended'],
+            'antagonistic': ['argued', 'fought', 'opposed', 'challenged', 'confronted'],
+            'romantic': ['loved', 'kissed', 'embraced', 'flirted', 'admired'],
+            'mentoring': ['taught', 'guided', 'advised', 'instructed', 'showed'],
+            'competitive': ['competed', 'rivaled', 'raced', 'challenged', 'outdid'],
+            'collaborative': ['worked with', 'teamed up', 'cooperated', 'partnered']
+        }
         
-        for sentence in sentences:
-            if character_name in sentence:
-                # Look for other character names (simple heuristic)
-                doc = self.nlp(sentence)
-                other_persons = [ent.text for ent in doc.ents if ent.label_ == "PERSON" and ent.text != character_name]
-                
-                for other_person in other_persons:
-                    # Analyze interaction type
-                    interaction_keywords = {
-                        'supportive': ['helped', 'supported', 'encouraged', 'comforted', 'defended'],
-                        'antagonistic': ['argued', 'fought', 'opposed', 'challenged', 'confronted'],
-                        'romantic': ['loved', 'kissed', 'embraced', 'flirted', 'admired'],
-                        'mentoring': ['taught', 'guided', 'advised', 'instructed', 'showed'],
-                        'competitive': ['competed', 'rivaled', 'raced', 'challenged', 'outdid'],
-                        'collaborative': ['worked with', 'teamed up', 'cooperated', 'partnered']
-                    }
-                    
-                    for interaction_type, keywords in interaction_keywords.items():
-                        if any(keyword in sentence.lower() for keyword in keywords):
-                            dynamics['interaction_styles'][other_person].append(interaction_type)
+        # Only the sentences this character appears in, with co-mentioned characters
+        for sentence_id, sentence_lower in index.sentences(character_name):
+            other_persons = index.others_in_sentence(sentence_id, character_name)
+            if not other_persons:
+                continue
+            
+            interaction_types = [
+                interaction_type for interaction_type, keywords in interaction_keywords.items()
+                if any(keyword in sentence_lower for keyword in keywords)
+            ]
+            for other_person in other_persons:
+                dynamics['interaction_styles'][other_person].extend(interaction_types)
         
         return dynamics
     
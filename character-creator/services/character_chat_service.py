@@ -6,13 +6,16 @@ Integrates all character systems for authentic, engaging conversations.
 """
 
 import time
-from typing import Dict, List, Any, Optional, Tuple
+import uuid
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple, Iterator
 from datetime import datetime
 import json
 
 from config.settings import settings
 from config.logging_config import logger
 from core.models import Character, ConversationTurn
+from core.database import DatabaseManager
 from core.exceptions import CharacterCreationError
 from core.rate_limiter import rate_limiter
 
@@ -25,55 +28,125 @@ from .llm_service import LLMService
 class CharacterChatService:
     """Service for managing character conversations with full emotional context"""
     
-    def __init__(self, character: Character):
-        """Initialize chat service with character"""
+    # Turns kept verbatim in memory and in the prompt context
+    CONTEXT_WINDOW_TURNS = 12
+    # Older turns are folded into the summary in batches of this size
+    SUMMARY_BATCH_TURNS = 20
+    MAX_SUMMARY_LINES = 30
+    
+    def __init__(self, character: Character, session_id: Optional[str] = None):
+        """Initialize chat service with character (pass session_id to resume a conversation)"""
         self.character = character
         self.character_id = character.id
+        self.db = DatabaseManager()
         
         # Initialize core systems
         self.behavior_engine = CharacterBehaviorEngine(
             character_profile=character.to_dict()
         )
-        self.emotional_memory = EmotionalMemoryCore(character.id)
+        # Replay of the memory log starts from the character's baseline mood
+        self.emotional_memory = EmotionalMemoryCore(character.id, db=self.db,
+                                                    baseline_mood=self._baseline_mood())
         self.llm_service = LLMService()
         
         # Track conversation state
-        self.conversation_id = None
+        self.conversation_id = session_id or uuid.uuid4().hex
+        self.recent_turns = deque(maxlen=self.CONTEXT_WINDOW_TURNS)
+        self.history_summary = ''
+        self.summarized_up_to = 0
+        self.turn_count = 0
+        self._load_conversation_window()
         self.message_count = 0
         self.session_start = datetime.now()
         self.last_message_time = None
-        
-        # Initialize with character's baseline mood
-        self._set_baseline_mood()
+        self.last_response = None
     
-    def _set_baseline_mood(self):
-        """Set character's baseline mood based on personality"""
+    def _baseline_mood(self) -> str:
+        """Character's baseline mood based on personality"""
         personality = self.character.personality
         
         # Determine baseline based on traits
         if personality.traits.get('neuroticism', 0.5) > 0.7:
-            baseline = 'anxious'
+            return 'anxious'
         elif personality.traits.get('agreeableness', 0.5) < 0.3:
-            baseline = 'irritable'
+            return 'irritable'
         elif personality.traits.get('extraversion', 0.5) > 0.7:
-            baseline = 'energetic'
-        else:
-            baseline = 'neutral'
-        
-        self.emotional_memory.emotional_state['baseline_mood'] = baseline
-        self.emotional_memory.emotional_state['current_mood'] = baseline
+            return 'energetic'
+        return 'neutral'
     
     def generate_response(self, user_message: str) -> Dict[str, Any]:
         """Generate character response with full context and emotional memory"""
+        turn = self._prepare_turn(user_message)
+        if 'rate_limited' in turn:
+            return turn['rate_limited']
+        
+        # Generate base response
+        base_response = self._generate_base_response(user_message, turn['context'])
+        
+        return self._finalize_turn(turn, base_response)
+    
+    def stream_response(self, user_message: str) -> Iterator[str]:
+        """
+        Stream the character response, yielding text as it is generated
+        
+        Behavior and memory post-processing run as a tail step once the base
+        response has finished; its additions are yielded last. The full
+        response package is available from last_response afterwards.
+        """
+        self.last_response = None
+        turn = self._prepare_turn(user_message)
+        if 'rate_limited' in turn:
+            self.last_response = turn['rate_limited']
+            yield self.last_response['response']
+            return
+        
+        mood = self.emotional_memory.emotional_state['current_mood']
+        chunks = []
+        first_token_time = None
+        
+        for chunk in self.llm_service.stream_response(prompt=user_message, mood=mood):
+            if not chunk:
+                continue
+            if first_token_time is None:
+                first_token_time = time.time()
+            chunks.append(chunk)
+            yield chunk
+        
+        stream_end = time.time()
+        base_response = ''.join(chunks)
+        response_data = self._finalize_turn(turn, base_response)
+        
+        # Post-processing usually appends; anything else is picked up from the final response
+        final_response = response_data['response']
+        if final_response.startswith(base_response) and len(final_response) > len(base_response):
+            yield final_response[len(base_response):]
+        
+        token_count = sum(1 for c in chunks if c.strip())
+        first_token_time = first_token_time or stream_end
+        generation_seconds = stream_end - first_token_time
+        response_data['metadata']['streaming'] = {
+            'time_to_first_token': first_token_time - turn['start_time'],
+            'tokens': token_count,
+            'tokens_per_second': token_count / generation_seconds if generation_seconds > 0 else 0.0,
+            'tail_seconds': time.time() - stream_end
+        }
+        logger.info(f"Streamed response for {self.character.name}: "
+                   f"ttft={response_data['metadata']['streaming']['time_to_first_token']:.2f}s, "
+                   f"{response_data['metadata']['streaming']['tokens_per_second']:.1f} tokens/s")
+        
+        self.last_response = response_data
+    
+    def _prepare_turn(self, user_message: str) -> Dict[str, Any]:
+        """Analyze the user message and assemble context for a response"""
         # Check rate limit
         if not rate_limiter.check_and_track('chat_message'):
-            return {
+            return {'rate_limited': {
                 'response': "I need a moment to catch my breath. Please slow down a bit.",
                 'metadata': {
                     'rate_limited': True,
                     'emotional_state': 'overwhelmed'
                 }
-            }
+            }}
         
         start_time = time.time()
         
@@ -89,10 +162,6 @@ class CharacterChatService:
         # Get memory context
         memory_context = self.emotional_memory.get_memory_context_for_response()
         
-        # Get relevant memories for this conversation
-        relevant_memories = memory_context.get('recent_memories', [])
-        core_memories = memory_context.get('core_memories', [])
-        
         # Build comprehensive context
         context = self._build_conversation_context(
             user_message, 
@@ -100,14 +169,26 @@ class CharacterChatService:
             memory_context
         )
         
-        # Generate base response
-        base_response = self._generate_base_response(user_message, context)
+        return {
+            'user_message': user_message,
+            'start_time': start_time,
+            'response_time': response_time,
+            'user_analysis': user_analysis,
+            'memory_context': memory_context,
+            'context': context
+        }
+    
+    def _finalize_turn(self, turn: Dict[str, Any], base_response: str) -> Dict[str, Any]:
+        """Apply behavior and memory post-processing and build the response package"""
+        user_message = turn['user_message']
+        user_analysis = turn['user_analysis']
+        memory_context = turn['memory_context']
         
         # Apply behavior modifications
         modified_response = self.behavior_engine.generate_response_modifiers(
             base_response, 
             user_analysis,
-            response_time
+            turn['response_time']
         )
         
         # Add memory-based continuity
@@ -131,6 +212,10 @@ class CharacterChatService:
         # Update conversation tracking
         self.message_count += 1
         self.last_message_time = datetime.now()
+        self._record_turn('user', user_message)
+        self._record_turn('assistant', final_response, {
+            'emotional_state': self.emotional_memory.emotional_state['current_mood']
+        })
         
         # Build response package
         response_data = {
@@ -143,7 +228,7 @@ class CharacterChatService:
             'memory_triggers': [m['memory']['memory_tag'] for m in memory_update.get('context_triggers', []) 
                               if m['type'] == 'core'],
             'emotional_continuity': memory_update['emotional_continuity'],
-            'response_time': time.time() - start_time,
+            'response_time': time.time() - turn['start_time'],
             'metadata': {
                 'message_count': self.message_count,
                 'session_duration': (datetime.now() - self.session_start).total_seconds(),
@@ -185,6 +270,18 @@ class CharacterChatService:
             if recent_topics:
                 context_parts.append(f"Recent topics: {'; '.join(recent_topics)}")
         
+        # Earlier conversation beyond the recent window
+        if self.history_summary:
+            context_parts.append(f"Earlier in this conversation:\n{self.history_summary}")
+        
+        # Recent conversation turns
+        if self.recent_turns:
+            name = self.character.name
+            context_parts.append("Recent conversation:\n" + "\n".join(
+                f"{'User' if turn.role == 'user' else name}: {turn.content}"
+                for turn in self.recent_turns
+            ))
+        
         # Core memories that might be relevant
         core_memories = memory_context.get('core_memories', [])
         if core_memories:
@@ -379,12 +476,50 @@ User: {user_message}
         # Combine with base starters
         return base_starters[:3] + starters[:2]
     
+    def _load_conversation_window(self):
+        """Load only the summary and the most recent turns of this conversation"""
+        summary = self.db.get_conversation_summary(self.character_id, self.conversation_id)
+        if summary:
+            self.history_summary = summary['summary']
+            self.summarized_up_to = summary['up_to_turn']
+        
+        for row in self.db.get_conversation_turns(self.character_id, self.conversation_id,
+                                                  last_n=self.CONTEXT_WINDOW_TURNS):
+            self.recent_turns.append(ConversationTurn(role=row['role'], content=row['content'],
+                                                      metadata=row['metadata']))
+            self.turn_count = row['turn_no']
+    
+    def _record_turn(self, role: str, content: str, metadata: Optional[Dict[str, Any]] = None):
+        """Append a turn to the conversation log and the in-memory window"""
+        self.turn_count += 1
+        self.db.append_conversation_turn(self.character_id, self.conversation_id,
+                                         self.turn_count, role, content, metadata)
+        self.recent_turns.append(ConversationTurn(role=role, content=content, metadata=metadata or {}))
+        
+        # Fold turns that left the window into the summary, a batch at a time
+        if self.turn_count - self.summarized_up_to >= self.CONTEXT_WINDOW_TURNS + self.SUMMARY_BATCH_TURNS:
+            self._summarize_older_turns(self.turn_count - self.CONTEXT_WINDOW_TURNS)
+    
+    def _summarize_older_turns(self, up_to_turn: int):
+        """Extend the rolling summary with turns up to up_to_turn"""
+        turns = self.db.get_conversation_turns(self.character_id, self.conversation_id,
+                                               after_turn=self.summarized_up_to, up_to_turn=up_to_turn)
+        lines = self.history_summary.split('\n') if self.history_summary else []
+        for turn in turns:
+            if turn['role'] == 'user':
+                words = turn['content'].split()
+                lines.append(f"- User talked about: {' '.join(words[:12])}{'...' if len(words) > 12 else ''}")
+        
+        self.history_summary = '\n'.join(lines[-self.MAX_SUMMARY_LINES:])
+        self.summarized_up_to = up_to_turn
+        self.db.save_conversation_summary(self.character_id, self.conversation_id,
+                                          up_to_turn, self.history_summary)
+    
     def save_conversation(self):
         """Save conversation to database"""
-        # This would integrate with the database service
-        # For now, just log
-        logger.info(f"Saving conversation for {self.character.name}: "
-                   f"{self.message_count} messages, "
+        # Turns are appended as they happen; nothing is rewritten here
+        logger.info(f"Conversation {self.conversation_id} for {self.character.name}: "
+                   f"{self.turn_count} turns stored, "
                    f"relationship: {self.emotional_memory.relationship_memory['relationship_stage']}")
     
     def get_chat_summary(self) -> Dict[str, Any]:
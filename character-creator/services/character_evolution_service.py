@@ -6,9 +6,13 @@ Manages character growth and personality drift over time.
 """
 
 import json
+import time
+import atexit
+import threading
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Tuple
-from collections import defaultdict
+from collections import defaultdict, deque
 import numpy as np
 
 from core.database import DatabaseManager
@@ -17,14 +21,51 @@ from config.logging_config import logger
 from integrations.adapters.analytics_adapter import AnalyticsAdapter
 
 
+@dataclass
+class EvolutionAccumulator:
+    """In-memory evolution state for one character between database flushes"""
+    character_id: str
+    snapshot: Dict[str, Any]  # Cached character data with current/original traits
+    recent_changes: deque  # Last min_interactions_for_drift trait changes (sliding window)
+    pending_records: List[Dict[str, Any]] = field(default_factory=list)
+    pending_events: List[Dict[str, Any]] = field(default_factory=list)
+    character_dirty: bool = False
+    last_flush: float = field(default_factory=time.monotonic)
+    # Record version and traits as of the last read/write of the stored record
+    record_version: int = 0
+    base_traits: Dict[str, float] = field(default_factory=dict)
+    base_evolution_count: int = 0
+
+
 class CharacterEvolutionService:
     """Service for managing character evolution and growth"""
     
+    # Write-behind settings: flush after this many records or seconds
+    FLUSH_THRESHOLD = 20
+    FLUSH_INTERVAL_SECONDS = 30.0
+    
+    # Shared across instances so UI reruns keep accumulated state
+    _accumulators: Dict[str, EvolutionAccumulator] = {}
+    _lock = threading.RLock()
+    _exit_flush_registered = False
+    _flush_thread: Optional[threading.Thread] = None
+    
     def __init__(self):
         """Initialize evolution service"""
         self.db = DatabaseManager()
         self.analytics = AnalyticsAdapter()
         
+        with self._lock:
+            if not CharacterEvolutionService._exit_flush_registered:
+                atexit.register(self.flush)
+                CharacterEvolutionService._exit_flush_registered = True
+            # Pending records are flushed on time even if no further interaction arrives
+            if CharacterEvolutionService._flush_thread is None:
+                CharacterEvolutionService._flush_thread = threading.Thread(
+                    target=self._flush_periodically, name="evolution-flush", daemon=True
+                )
+                CharacterEvolutionService._flush_thread.start()
+        
         # Evolution parameters
         self.evolution_config = {
             'min_interactions_for_drift': 10,
@@ -56,10 +97,11 @@ class CharacterEvolutionService:
             Evolution impact data
         """
         try:
-            # Get current character state
-            character = self.db.get_character(character_id)
-            if not character:
+            # Use the cached character snapshot instead of a query per message
+            accumulator = self._get_accumulator(character_id)
+            if accumulator is None:
                 return {'success': False, 'error': 'Character not found'}
+            character = accumulator.snapshot
             
             # Calculate emotional impact
             emotional_impact = self._calculate_emotional_impact(interaction_data)
@@ -74,44 +116,181 @@ class CharacterEvolutionService:
             # Apply boundaries
             trait_changes = self._apply_boundaries(character, trait_changes)
             
-            # Store evolution data
-            evolution_record = {
-                'character_id': character_id,
-                'timestamp': datetime.now().isoformat(),
-                'trait_changes': trait_changes,
-                'emotional_impact': emotional_impact,
-                'trigger_event': interaction_data.get('user_message', '')[:100],
-                'user_influence': interaction_data.get('interaction_quality', 0.5)
-            }
-            
-            # Save to database
-            self._save_evolution_record(evolution_record)
-            
-            # Update character if significant changes
-            if self._should_apply_evolution(character_id):
-                self._apply_evolution(character_id)
-            
-            # Track analytics
-            self.analytics.track_event(
-                'character_evolution',
-                {
+            with self._lock:
+                # Queue evolution record and analytics for the next flush
+                accumulator.recent_changes.append(trait_changes)
+                accumulator.pending_records.append({
+                    'character_id': character_id,
+                    'evolution_type': 'trait_drift',
+                    'trigger_event': interaction_data.get('user_message', '')[:100],
+                    'metadata': {
+                        'timestamp': datetime.now().isoformat(),
+                        'trait_changes': trait_changes,
+                        'emotional_impact': emotional_impact,
+                        'user_influence': interaction_data.get('interaction_quality', 0.5)
+                    }
+                })
+                accumulator.pending_events.append({
                     'character_id': character_id,
                     'drift_magnitude': sum(abs(v) for v in trait_changes.values()),
                     'emotional_impact': emotional_impact
-                }
-            )
+                })
+                
+                # Update character if significant changes
+                if self._should_apply_evolution(character_id):
+                    self._apply_evolution(character_id)
+                
+                progress = self._get_evolution_progress(character_id)
+                
+                if (len(accumulator.pending_records) >= self.FLUSH_THRESHOLD or
+                        time.monotonic() - accumulator.last_flush >= self.FLUSH_INTERVAL_SECONDS):
+                    self.flush(character_id)
             
             return {
                 'success': True,
                 'trait_changes': trait_changes,
                 'emotional_impact': emotional_impact,
-                'evolution_progress': self._get_evolution_progress(character_id)
+                'evolution_progress': progress
             }
             
         except Exception as e:
             logger.error(f"Error tracking interaction: {e}")
             return {'success': False, 'error': str(e)}
     
+    def flush(self, character_id: Optional[str] = None):
+        """Write pending evolution records, trait updates and analytics to storage"""
+        with self._lock:
+            character_ids = [character_id] if character_id else list(self._accumulators)
+            
+            for cid in character_ids:
+                accumulator = self._accumulators.get(cid)
+                if accumulator is None:
+                    continue
+                
+                records, accumulator.pending_records = accumulator.pending_records, []
+                events, accumulator.pending_events = accumulator.pending_events, []
+                accumulator.last_flush = time.monotonic()
+                
+                if records and not self.db.save_evolution_records(records):
+                    # Keep records for the next attempt
+                    accumulator.pending_records[:0] = records
+                
+                if accumulator.character_dirty:
+                    accumulator.character_dirty = not self._persist_character(accumulator)
+                
+                for event in events:
+                    self.analytics.track_event('character_evolution', event)
+    
+    def flush_stale(self):
+        """Flush characters whose pending changes have waited FLUSH_INTERVAL_SECONDS"""
+        now = time.monotonic()
+        with self._lock:
+            stale = [
+                cid for cid, accumulator in self._accumulators.items()
+                if (accumulator.pending_records or accumulator.pending_events or accumulator.character_dirty)
+                and now - accumulator.last_flush >= self.FLUSH_INTERVAL_SECONDS
+            ]
+        for cid in stale:
+            self.flush(cid)
+    
+    def _flush_periodically(self):
+        """Background flush loop (daemon thread)"""
+        while True:
+            time.sleep(self.FLUSH_INTERVAL_SECONDS / 2)
+            try:
+                self.flush_stale()
+            except Exception as e:
+                logger.error(f"Background evolution flush failed: {e}")
+    
+    def _get_accumulator(self, character_id: str) -> Optional[EvolutionAccumulator]:
+        """Get (loading once) the evolution accumulator for a character"""
+        with self._lock:
+            accumulator = self._accumulators.get(character_id)
+            if accumulator is not None:
+                return accumulator
+            
+            record_version = self.db.get_character_version(character_id)
+            record = self.db.get_character_record(character_id)
+            if not record:
+                return None
+            
+            # Seed the sliding drift window with the latest stored changes
+            window = self.evolution_config['min_interactions_for_drift']
+            stored = self.db.get_evolution_records(character_id, 'trait_drift', limit=window)
+            accumulator = EvolutionAccumulator(
+                character_id=character_id,
+                snapshot=self._character_snapshot(record),
+                recent_changes=deque((r['metadata'].get('trait_changes', {}) for r in reversed(stored)),
+                                     maxlen=window)
+            )
+            self._mark_synced(accumulator, record_version)
+            self._accumulators[character_id] = accumulator
+            return accumulator
+    
+    def _character_snapshot(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalize a stored character record into the dict shape used for evolution.
+        
+        The raw record is used rather than Character.to_dict(), which drops the
+        evolution fields (original traits, evolution count) stored alongside it.
+        """
+        data = dict(record)
+        traits = dict((data.get('personality') or {}).get('traits') or data.get('personality_traits') or {})
+        data['personality_traits'] = traits
+        data['original_personality_traits'] = dict(data.get('original_personality_traits') or traits)
+        data.setdefault('evolution_count', 0)
+        return data
+    
+    def _mark_synced(self, accumulator: EvolutionAccumulator, record_version: int):
+        """Remember what the stored record looked like when the snapshot last matched it"""
+        accumulator.record_version = record_version
+        accumulator.base_traits = dict(accumulator.snapshot['personality_traits'])
+        accumulator.base_evolution_count = accumulator.snapshot.get('evolution_count', 0)
+    
+    def _rebase_snapshot(self, accumulator: EvolutionAccumulator) -> bool:
+        """Re-read a record changed by another writer and re-apply this accumulator's changes on top"""
+        record_version = self.db.get_character_version(accumulator.character_id)
+        record = self.db.get_character_record(accumulator.character_id)
+        if not record:
+            return False
+        
+        snapshot = accumulator.snapshot
+        fresh = self._character_snapshot(record)
+        for trait, value in fresh['personality_traits'].items():
+            delta = snapshot['personality_traits'].get(trait, value) - accumulator.base_traits.get(trait, value)
+            fresh['personality_traits'][trait] = float(np.clip(value + delta, 0.0, 1.0))
+        fresh['evolution_count'] = max(0, fresh['evolution_count']
+                                       + snapshot.get('evolution_count', 0) - accumulator.base_evolution_count)
+        for key in ('last_evolution', 'healing_applied'):
+            if snapshot.get(key):
+                fresh[key] = snapshot[key]
+        
+        # Keep the dict identity: callers may hold a reference to the snapshot
+        snapshot.clear()
+        snapshot.update(fresh)
+        accumulator.record_version = record_version
+        return True
+    
+    def _persist_character(self, accumulator: EvolutionAccumulator) -> bool:
+        """Write the accumulated traits back to the character record"""
+        if self.db.get_character_version(accumulator.character_id) != accumulator.record_version:
+            # The record may have been edited elsewhere since it was cached
+            if not self._rebase_snapshot(accumulator):
+                return False
+        
+        snapshot = accumulator.snapshot
+        personality = dict(snapshot.get('personality') or {})
+        personality['traits'] = snapshot['personality_traits']
+        
+        saved = self.db.update_character(accumulator.character_id, {
+            'personality': personality,
+            'original_personality_traits': snapshot['original_personality_traits'],
+            'evolution_count': snapshot.get('evolution_count', 0),
+            'last_evolution': snapshot.get('last_evolution')
+        })
+        if saved:
+            self._mark_synced(accumulator, self.db.get_character_version(accumulator.character_id))
+        return saved
+    
     def _calculate_emotional_impact(
         self,
         interaction_data: Dict[str, Any]
@@ -249,32 +428,31 @@ class CharacterEvolutionService:
     
     def _should_apply_evolution(self, character_id: str) -> bool:
         """Check if evolution should be applied"""
-        # Get recent evolution records
-        recent_records = self._get_recent_evolution_records(character_id)
+        # Recent trait changes are folded in memory as interactions arrive
+        recent_changes = self._accumulators[character_id].recent_changes
         
         # Need minimum interactions
-        if len(recent_records) < self.evolution_config['min_interactions_for_drift']:
+        if len(recent_changes) < self.evolution_config['min_interactions_for_drift']:
             return False
         
         # Check cumulative drift
         total_drift = sum(
-            sum(abs(v) for v in record['trait_changes'].values())
-            for record in recent_records
+            sum(abs(v) for v in changes.values())
+            for changes in recent_changes
         )
         
         return total_drift > 0.1  # Apply if total drift > 10%
     
     def _apply_evolution(self, character_id: str):
-        """Apply accumulated evolution to character"""
+        """Apply accumulated evolution to the cached character (persisted on flush)"""
         try:
-            # Get character and recent evolution
-            character = self.db.get_character(character_id)
-            recent_records = self._get_recent_evolution_records(character_id)
+            accumulator = self._accumulators[character_id]
+            character = accumulator.snapshot
             
             # Calculate cumulative changes
             cumulative_changes = defaultdict(float)
-            for record in recent_records:
-                for trait, change in record['trait_changes'].items():
+            for changes in accumulator.recent_changes:
+                for trait, change in changes.items():
                     cumulative_changes[trait] += change
             
             # Apply decay
@@ -285,17 +463,16 @@ class CharacterEvolutionService:
             current_traits = character.get('personality_traits', {})
             for trait, change in cumulative_changes.items():
                 if trait in current_traits:
-                    current_traits[trait] = np.clip(
+                    current_traits[trait] = float(np.clip(
                         current_traits[trait] + change,
                         0.0, 1.0
-                    )
+                    ))
             
-            # Save updated character
-            character['personality_traits'] = current_traits
+            # The drift window keeps sliding (last N changes), as with the stored records;
+            # mark the character for the next flush
             character['last_evolution'] = datetime.now().isoformat()
             character['evolution_count'] = character.get('evolution_count', 0) + 1
-            
-            self.db.update_character(character_id, character)
+            accumulator.character_dirty = True
             
             logger.info(f"Applied evolution to character {character_id}")
             
@@ -309,6 +486,10 @@ class CharacterEvolutionService:
     ) -> Dict[str, Any]:
         """Get character evolution history"""
         try:
+            # Make queued records visible before reading history
+            self.flush(character_id)
+            accumulator = self._get_accumulator(character_id)
+            
             # Get evolution records
             records = self._get_evolution_records(character_id, days)
             
@@ -335,7 +516,7 @@ class CharacterEvolutionService:
                 'total_drift': total_drift,
                 'average_drift_per_interaction': total_drift / max(total_interactions, 1),
                 'trait_trends': dict(trait_trends),
-                'evolution_count': self.db.get_character(character_id).get('evolution_count', 0)
+                'evolution_count': accumulator.snapshot.get('evolution_count', 0) if accumulator else 0
             }
             
         except Exception as e:
@@ -358,9 +539,10 @@ class CharacterEvolutionService:
             Healing result
         """
         try:
-            character = self.db.get_character(character_id)
-            if not character:
+            accumulator = self._get_accumulator(character_id)
+            if accumulator is None:
                 return {'success': False, 'error': 'Character not found'}
+            character = accumulator.snapshot
             
             if healing_type == 'reset':
                 # Full reset to original personality
@@ -392,8 +574,10 @@ class CharacterEvolutionService:
                     healing = (original_value - current_value) * self.evolution_config['healing_rate']
                     current_traits[trait] = current_value + healing
             
-            # Save changes
-            self.db.update_character(character_id, character)
+            # Save changes along with any queued evolution
+            with self._lock:
+                accumulator.character_dirty = True
+                self.flush(character_id)
             
             # Track event
             self.analytics.track_event(
@@ -414,52 +598,26 @@ class CharacterEvolutionService:
             logger.error(f"Error applying healing: {e}")
             return {'success': False, 'error': str(e)}
     
-    def _save_evolution_record(self, record: Dict[str, Any]):
-        """Save evolution record to database"""
-        from core.database import db
-        
-        # Save to database
-        db.save_evolution_record(
-            character_id=record['character_id'],
-            evolution_type=record['evolution_type'],
-            previous_state=record.get('previous_state', {}),
-            new_state=record.get('new_state', {}),
-            trigger_event=record.get('trigger', ''),
-            metadata=record.get('metadata', {})
-        )
-        
-        # Also track in analytics
-        self.analytics.track_event('evolution_record', record)
-    
-    def _get_recent_evolution_records(
-        self,
-        character_id: str,
-        limit: int = 10
-    ) -> List[Dict[str, Any]]:
-        """Get recent evolution records"""
-        from core.database import db
-        return db.get_evolution_records(character_id, limit=limit)
-    
     def _get_evolution_records(
         self,
         character_id: str,
         days: int
     ) -> List[Dict[str, Any]]:
         """Get evolution records for time period"""
-        from core.database import db
-        from datetime import datetime, timedelta
-        
         # Get all records and filter by date
-        all_records = db.get_evolution_records(character_id, limit=1000)
+        all_records = self.db.get_evolution_records(character_id, limit=1000)
         cutoff_date = datetime.now() - timedelta(days=days)
         
-        return [
-            record for record in all_records
-            if datetime.fromisoformat(record['created_at']) > cutoff_date
-        ]
+        records = []
+        for record in all_records:
+            if datetime.fromisoformat(record['created_at']) > cutoff_date:
+                record['trait_changes'] = record['metadata'].get('trait_changes', {})
+                record['timestamp'] = record['metadata'].get('timestamp', record['created_at'])
+                records.append(record)
+        return records
     
     def _get_evolution_progress(self, character_id: str) -> float:
         """Get evolution progress (0-1)"""
-        records = self._get_recent_evolution_records(character_id)
-        progress = len(records) / self.evolution_config['min_interactions_for_drift']
+        recent_changes = self._accumulators[character_id].recent_changes
+        progress = len(recent_changes) / self.evolution_config['min_interactions_for_drift']
         return min(progress, 1.0)
\ No newline at end of file
@@ -6,8 +6,9 @@ Extract and analyze all characters from uploaded documents.
 Now uses the integration adapter for enhanced NLP capabilities.
 """
 
-import re
+import os
 from collections import defaultdict, Counter
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict, Any, Tuple, Optional
 
 # Use our integration adapter for NLP
@@ -18,10 +19,36 @@ from config.logging_config import logger
 from core.models import Character, PersonalityProfile
 from core.exceptions import DocumentProcessingError
 from .character_analyzer import CharacterAnalyzer
+from .document_analysis import DocumentAnalysis, CharacterContextIndex, CharacterSliceIndex, normalize_name
+
+# Per-process state for map-reduce extraction workers
+_worker_state: Dict[str, Any] = {}
+
+def _init_extraction_worker(text: str):
+    """Process pool initializer: keep the document text and build NLP tools once per worker"""
+    _worker_state['text'] = text
+    _worker_state['extractor'] = CharacterExtractor()
+
+def _map_chapter(start: int, end: int) -> Dict[str, Any]:
+    """Extract mentions, contexts, dialogues and interactions from one chapter"""
+    extractor = _worker_state['extractor']
+    extractor._reset_state()
+    return extractor._extract_chapter_data(_worker_state['text'][start:end], start)
+
+def _analyze_character(name: str, dialogues: List[Dict], contexts: List[str],
+                       character_slice: Dict[str, Any]) -> Dict[str, Any]:
+    """Deep-analyze one character from its merged slice of the chapter analyses"""
+    analyzer = _worker_state['extractor'].analyzer
+    index = CharacterSliceIndex(name, character_slice)
+    return analyzer.analyze_character_depth(name, None, dialogues, contexts, index=index)
+
 
 class CharacterExtractor:
     """Extract characters from documents using NLP"""
     
+    # Map-reduce extraction is used automatically above this size
+    PARALLEL_MIN_WORDS = 50000
+    
     def __init__(self):
         """Initialize NLP models using integration adapter"""
         # Use the intelligent processor adapter
@@ -30,6 +57,10 @@ class CharacterExtractor:
         # Initialize character analyzer
         self.analyzer = CharacterAnalyzer()
         
+        self._reset_state()
+    
+    def _reset_state(self):
+        """Clear per-document extraction state"""
         # Character data storage
         self.characters = {}
         self.character_mentions = defaultdict(list)
@@ -39,62 +70,180 @@ class CharacterExtractor:
         self.character_descriptions = defaultdict(list)
         self.character_contexts = defaultdict(list)
         
-    def extract_characters(self, text: str, min_mentions: int = 3) -> List[Dict[str, Any]]:
+    def extract_characters(self, text: str, min_mentions: int = 3,
+                           parallel: Optional[bool] = None,
+                           max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Extract all characters from text
         
         Args:
             text: Document text
             min_mentions: Minimum mentions to consider as character
+            parallel: Map-reduce over chapters in worker processes
+                (default: automatic for long documents)
+            max_workers: Worker process count for parallel mode
             
         Returns:
             List of character data
         """
-        logger.info("Starting character extraction with enhanced NLP...")
-        
-        # Perform comprehensive text analysis
-        nlp_analysis = self.nlp_adapter.analyze_text(text)
+        if parallel is None:
+            parallel = len(text.split()) >= self.PARALLEL_MIN_WORDS
         
-        # Extract entities using adapter
-        entities = self.nlp_adapter.extract_entities(text)
+        if parallel:
+            try:
+                return self._extract_characters_parallel(text, min_mentions, max_workers)
+            except Exception as e:
+                logger.warning(f"Parallel extraction failed, falling back to serial: {e}")
+                self._reset_state()
         
-        # Extract themes for character context
-        themes = self.nlp_adapter.extract_themes(text)
+        logger.info("Starting character extraction with enhanced NLP...")
         
-        # Extract dialogues using adapter
-        dialogues = self.nlp_adapter.extract_dialogue(text)
+        # Parse once; every stage reads cached views of the same analysis
+        analysis = DocumentAnalysis(text, self.nlp_adapter)
         
         # Process entities as characters
-        self._process_entities(entities, text)
+        self._process_entities(analysis)
         
         # Process dialogues
-        self._process_dialogues(dialogues)
+        self._process_dialogues(analysis.dialogues)
         
         # Extract additional dialogues with patterns
-        self._extract_dialogues(text)
+        self._extract_dialogues(analysis)
         
         # Extract character interactions from entities
-        self._extract_interactions_from_entities(entities, text)
+        self._extract_interactions_from_entities(analysis)
         
         # Extract descriptions
-        self._extract_descriptions(text)
+        self._extract_descriptions(analysis)
         
         # Filter and rank characters
         characters = self._filter_characters(min_mentions)
         
-        # Generate character profiles with deep analysis
-        character_profiles = []
-        for char_name, char_data in characters.items():
-            # Basic profile
-            basic_profile = self._generate_character_profile(char_name, char_data)
-            
-            # Deep analysis
-            deep_analysis = self.analyzer.analyze_character_depth(
+        # Deep analysis per character against one shared mention index
+        self.analyzer.build_index(text, analysis)
+        deep_analyses = {
+            char_name: self.analyzer.analyze_character_depth(
                 char_name, 
                 text,
                 char_data['dialogues'],
                 self.character_contexts[char_name]
             )
+            for char_name, char_data in characters.items()
+        }
+        
+        return self._build_character_profiles(characters, deep_analyses)
+    
+    def _extract_characters_parallel(self, text: str, min_mentions: int,
+                                     max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Map-reduce extraction: per-chapter extraction and per-character analysis in worker processes"""
+        from .document_processor import DocumentProcessor
+        
+        spans = self._chapter_spans(text, DocumentProcessor().extract_chapters(text))
+        max_workers = max_workers or min(os.cpu_count() or 1, max(len(spans), 1))
+        logger.info(f"Starting map-reduce character extraction: {len(spans)} chapters, {max_workers} workers")
+        
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_extraction_worker,
+                                 initargs=(text,)) as pool:
+            # Map: chapters in worker processes; results come back in chapter order
+            chapter_results = list(pool.map(_map_chapter, *zip(*spans))) if spans else []
+            
+            # Reduce: merge deterministically in document order
+            self._reset_state()
+            for result in chapter_results:
+                self._merge_chapter_data(result)
+            self._merge_descriptions(chapter_results)
+            
+            characters = self._filter_characters(min_mentions)
+            
+            # Deep analysis per character in parallel, from the chapters' mention slices
+            # rather than a second full-document analysis in every worker
+            character_slices = defaultdict(list)
+            for result in chapter_results:
+                for name, character_slice in result['character_slices'].items():
+                    character_slices[name].append(character_slice)
+            futures = {
+                char_name: pool.submit(_analyze_character, char_name, char_data['dialogues'],
+                                       self.character_contexts[char_name],
+                                       CharacterSliceIndex.merge(character_slices.get(char_name, [])))
+                for char_name, char_data in characters.items()
+            }
+            deep_analyses = {char_name: future.result() for char_name, future in futures.items()}
+        
+        return self._build_character_profiles(characters, deep_analyses)
+    
+    def _chapter_spans(self, text: str, chapters: List[Dict[str, Any]]) -> List[Tuple[int, int]]:
+        """Character offsets of each chapter (plus any text before the first heading)"""
+        spans = []
+        cursor = 0
+        for chapter in chapters:
+            content = chapter['content']
+            if not content.strip():
+                continue
+            start = text.find(content, cursor)
+            if start < 0:
+                continue
+            if not spans and start > 0 and text[:start].strip():
+                spans.append((0, start))
+            spans.append((start, start + len(content)))
+            cursor = start + len(content)
+        return spans
+    
+    def _extract_chapter_data(self, chapter_text: str, offset: int) -> Dict[str, Any]:
+        """Run entity, dialogue, interaction and description extraction on one chapter"""
+        analysis = DocumentAnalysis(chapter_text, self.nlp_adapter)
+        
+        self._process_entities(analysis)
+        self._process_dialogues(analysis.dialogues)
+        self._extract_dialogues(analysis)
+        self._extract_interactions_from_entities(analysis)
+        
+        for mentions in self.character_mentions.values():
+            for mention in mentions:
+                mention['start'] += offset
+                mention['end'] += offset
+        
+        return {
+            'mentions': dict(self.character_mentions),
+            'contexts': dict(self.character_contexts),
+            'dialogues': dict(self.character_dialogues),
+            'relationships': {name: dict(counts) for name, counts in self.character_relationships.items()},
+            'actions': dict(self.character_actions),
+            # Filtered against document-wide mentions in the reduce step
+            'description_candidates': analysis.description_candidates,
+            'character_slices': CharacterContextIndex(analysis).character_slices()
+        }
+    
+    def _merge_chapter_data(self, result: Dict[str, Any]):
+        """Fold one chapter's extraction results into the document-wide state"""
+        for name, mentions in result['mentions'].items():
+            self.character_mentions[name].extend(mentions)
+        for name, contexts in result['contexts'].items():
+            self.character_contexts[name].extend(contexts)
+        for name, dialogues in result['dialogues'].items():
+            self.character_dialogues[name].extend(dialogues)
+        for name, counts in result['relationships'].items():
+            for other, count in counts.items():
+                self.character_relationships[name][other] += count
+        for name, actions in result['actions'].items():
+            self.character_actions[name].extend(actions)
+    
+    def _merge_descriptions(self, chapter_results: List[Dict[str, Any]]):
+        """Keep descriptions of known characters, ordered as a full-text pass would produce them"""
+        candidates = [c for result in chapter_results for c in result['description_candidates']]
+        # Stable sort keeps document order within each pattern
+        candidates.sort(key=lambda candidate: candidate[0])
+        for _, char_name, description in candidates:
+            if char_name in self.character_mentions:
+                self.character_descriptions[char_name].append(description)
+    
+    def _build_character_profiles(self, characters: Dict[str, Dict],
+                                  deep_analyses: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Combine basic profiles with deep analysis results"""
+        character_profiles = []
+        for char_name, char_data in characters.items():
+            # Basic profile
+            basic_profile = self._generate_character_profile(char_name, char_data)
+            deep_analysis = deep_analyses[char_name]
             
             # Merge profiles
             enhanced_profile = {
@@ -113,25 +262,13 @@ class CharacterExtractor:
         logger.info(f"Extracted {len(character_profiles)} characters with deep analysis")
         return character_profiles
     
-    def _process_entities(self, entities: List[Dict[str, Any]], text: str):
+    def _process_entities(self, analysis: DocumentAnalysis):
         """Process extracted entities as potential characters"""
-        for ent in entities:
-            if ent.get('type') == "PERSON":
-                # Clean character name
-                char_name = self._normalize_name(ent['text'])
-                
-                # Get context around entity
-                context = self._get_entity_context(ent, text)
-                
-                self.character_mentions[char_name].append({
-                    'text': ent['text'],
-                    'context': context,
-                    'start': ent.get('start', 0),
-                    'end': ent.get('end', 0)
-                })
-                
-                # Store context for deep analysis
-                self.character_contexts[char_name].append(context)
+        for char_name, mentions in analysis.mentions.items():
+            self.character_mentions[char_name].extend(dict(mention) for mention in mentions)
+            
+            # Store context for deep analysis
+            self.character_contexts[char_name].extend(mention['context'] for mention in mentions)
     
     def _process_dialogues(self, dialogues: List[Dict[str, str]]):
         """Process dialogues extracted by NLP adapter"""
@@ -145,54 +282,17 @@ class CharacterExtractor:
                     'context': dialogue.get('context', '')
                 })
     
-    def _extract_dialogues(self, text: str):
-        """Extract character dialogues"""
-        # Common dialogue patterns
-        dialogue_patterns = [
-            r'"([^"]+)"[,\s]+said\s+(\w+)',
-            r'(\w+)\s+said[,:\s]+"([^"]+)"',
-            r'"([^"]+)"[,\s]+(\w+)\s+replied',
-            r'(\w+)\s+replied[,:\s]+"([^"]+)"',
-            r'"([^"]+)"[,\s]+(\w+)\s+asked',
-            r'(\w+)\s+asked[,:\s]+"([^"]+)"',
-            r'"([^"]+)"[,\s]+(\w+)\s+whispered',
-            r'(\w+)\s+whispered[,:\s]+"([^"]+)"',
-            r'"([^"]+)"[,\s]+(\w+)\s+shouted',
-            r'(\w+)\s+shouted[,:\s]+"([^"]+)"',
-        ]
-        
-        for pattern in dialogue_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                if match.group(1) and match.group(2):
-                    # Determine speaker and dialogue
-                    if pattern.startswith('"'):
-                        dialogue = match.group(1)
-                        speaker = self._normalize_name(match.group(2))
-                    else:
-                        speaker = self._normalize_name(match.group(1))
-                        dialogue = match.group(2)
-                    
-                    self.character_dialogues[speaker].append({
-                        'text': dialogue,
-                        'verb': pattern.split('\\s+')[2] if '\\s+' in pattern else 'said'
-                    })
+    def _extract_dialogues(self, analysis: DocumentAnalysis):
+        """Extract character dialogues attributed with speech verbs"""
+        for dialogue in analysis.attributed_dialogues:
+            self.character_dialogues[dialogue['speaker']].append({
+                'text': dialogue['text'],
+                'verb': dialogue['verb']
+            })
     
-    def _extract_interactions_from_entities(self, entities: List[Dict[str, Any]], text: str):
+    def _extract_interactions_from_entities(self, analysis: DocumentAnalysis):
         """Extract character interactions and relationships from entities"""
-        # Group entities by sentence
-        sentences = text.split('.')
-        
-        for sentence in sentences:
-            # Find all person entities in this sentence
-            persons_in_sentence = []
-            
-            for ent in entities:
-                if ent.get('type') == "PERSON":
-                    # Check if entity appears in this sentence
-                    if ent['text'] in sentence:
-                        persons_in_sentence.append(ent)
-            
+        for sentence, persons_in_sentence in zip(analysis.sentences, analysis.sentence_persons):
             if len(persons_in_sentence) >= 2:
                 # Extract relationships between characters
                 for i, person1 in enumerate(persons_in_sentence):
@@ -210,40 +310,16 @@ class CharacterExtractor:
                             'with': char2
                         })
     
-    def _extract_descriptions(self, text: str):
+    def _extract_descriptions(self, analysis: DocumentAnalysis):
         """Extract character descriptions"""
-        description_patterns = [
-            r'(\w+)\s+was\s+(?:a|an)\s+([^.]+)',
-            r'(\w+)\s+looked\s+([^.]+)',
-            r'(\w+)\s+had\s+([^.]+)',
-            r'(\w+),\s+(?:a|an|the)\s+([^,]+),',
-        ]
-        
-        for pattern in description_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                char_name = self._normalize_name(match.group(1))
-                description = match.group(2)
-                
-                # Check if this is actually a character we've seen
-                if char_name in self.character_mentions:
-                    self.character_descriptions[char_name].append(description)
+        for _, char_name, description in analysis.description_candidates:
+            # Check if this is actually a character we've seen
+            if char_name in self.character_mentions:
+                self.character_descriptions[char_name].append(description)
     
     def _normalize_name(self, name: str) -> str:
         """Normalize character names"""
-        # Remove titles
-        titles = ['Mr.', 'Mrs.', 'Ms.', 'Dr.', 'Prof.', 'Sir', 'Lady', 'Lord']
-        for title in titles:
-            name = name.replace(title, '').strip()
-        
-        # Capitalize properly
-        return ' '.join(word.capitalize() for word in name.split())
-    
-    def _get_entity_context(self, entity: Dict[str, Any], text: str, window: int = 50) -> str:
-        """Get context around entity mention"""
-        start = max(0, entity.get('start', 0) - window)
-        end = min(len(text), entity.get('end', 0) + window)
-        return text[start:end]
+        return normalize_name(name)
     
     def _filter_characters(self, min_mentions: int) -> Dict[str, Dict]:
         """Filter and rank characters by importance"""
@@ -0,0 +1,240 @@
+"""
+Character Feature Matrix
+========================
+
+Trait, role and speaking-style features for a character library as NumPy arrays,
+so fusion compatibility and similarity are scored for every pair in vectorized
+row batches instead of pairwise dict loops.
+"""
+
+from typing import Dict, Any, List, Tuple, Iterator, Iterable
+
+import numpy as np
+
+# Same rules as CharacterFusionService's pairwise calculations
+COMPATIBLE_ROLE_PAIRS = [
+    ('Protagonist', 'Main Character'),
+    ('Supporting Character', 'Speaking Role'),
+    ('Main Character', 'Supporting Character')
+]
+CONFLICTING_STYLES = [
+    ('verbose', 'brief'),
+    ('formal', 'casual'),
+    ('serious', 'humorous')
+]
+
+
+def character_features(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Fusion-relevant fields from a stored character record"""
+    personality = data.get('personality') or {}
+    return {
+        'id': data.get('id'),
+        'name': data.get('name', ''),
+        'personality_traits': data.get('personality_traits') or personality.get('traits', {}),
+        'role': data.get('role', 'Character'),
+        'speaking_style': data.get('speaking_style', personality.get('speaking_style', ''))
+    }
+
+
+class CharacterFeatureMatrix:
+    """Materialized feature matrices for a set of characters.
+
+    Every feature row depends only on its own character, so a changed character
+    is an in-place row update (plus new vocabulary columns) rather than a rebuild.
+    """
+
+    BATCH_SIZE = 512
+
+    def __init__(self, characters: List[Dict[str, Any]], version: int = 0):
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.traits = np.zeros((0, 0))
+        self.trait_mask = np.zeros((0, 0))
+        self.roles = np.zeros(0, dtype=np.int64)
+        self.styles = np.zeros((0, 0))
+        self.style_lengths = np.zeros(0)
+        self._trait_columns: Dict[str, int] = {}
+        self._role_ids: Dict[str, int] = {}
+        self._style_columns: Dict[str, int] = {}
+        self._embeddings = None
+        self.update(characters, (), version)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def update(self, changed: List[Dict[str, Any]], removed: Iterable[str], version: int):
+        """Apply added/edited characters and deletions; only their rows are touched"""
+        removed = [char_id for char_id in removed if char_id in self.positions]
+        if removed:
+            keep = np.setdiff1d(np.arange(len(self)), [self.positions[char_id] for char_id in removed])
+            self.ids = [self.ids[i] for i in keep]
+            self.names = [self.names[i] for i in keep]
+            self.traits, self.trait_mask = self.traits[keep], self.trait_mask[keep]
+            self.roles, self.styles = self.roles[keep], self.styles[keep]
+            self.style_lengths = self.style_lengths[keep]
+
+        # Grow the vocabularies; existing rows get zeros in the new columns
+        for c in changed:
+            for trait in c.get('personality_traits', {}):
+                self._trait_columns.setdefault(trait, len(self._trait_columns))
+            self._role_ids.setdefault(c.get('role', 'Character'), len(self._role_ids))
+            for comp in self._style_components(c):
+                self._style_columns.setdefault(comp, len(self._style_columns))
+        new_ids = [c['id'] for c in changed if c['id'] not in self.positions]
+        new_ids = list(dict.fromkeys(new_ids))
+        rows = len(self) + len(new_ids)
+        self.traits = self._resize(self.traits, rows, len(self._trait_columns))
+        self.trait_mask = self._resize(self.trait_mask, rows, len(self._trait_columns))
+        self.styles = self._resize(self.styles, rows, len(self._style_columns))
+        self.roles = np.concatenate([self.roles, np.zeros(len(new_ids), dtype=np.int64)])
+        self.style_lengths = np.concatenate([self.style_lengths, np.zeros(len(new_ids))])
+        self.ids += new_ids
+        self.names += [''] * len(new_ids)
+        self.positions = {char_id: i for i, char_id in enumerate(self.ids)}
+
+        for c in changed:
+            self._set_row(self.positions[c['id']], c)
+
+        self._trait_squares = self.traits ** 2
+        self._build_role_table()
+        self.style_unique = self.styles.sum(axis=1)
+        self.style_conflicts = [
+            (self.styles[:, self._style_columns[a]].astype(bool), self.styles[:, self._style_columns[b]].astype(bool))
+            for a, b in CONFLICTING_STYLES
+            if a in self._style_columns and b in self._style_columns
+        ]
+        self._embeddings = None
+        self.version = version
+
+    @staticmethod
+    def _style_components(character: Dict[str, Any]) -> List[str]:
+        return [s.strip().lower() for s in character.get('speaking_style', '').split(',')]
+
+    @staticmethod
+    def _resize(matrix: np.ndarray, rows: int, cols: int) -> np.ndarray:
+        if matrix.shape == (rows, cols):
+            return matrix
+        resized = np.zeros((rows, cols))
+        resized[:matrix.shape[0], :matrix.shape[1]] = matrix
+        return resized
+
+    def _set_row(self, i: int, character: Dict[str, Any]):
+        self.names[i] = character.get('name', '')
+
+        # Personality traits: values with a presence mask (missing traits are not compared)
+        self.traits[i] = 0.0
+        self.trait_mask[i] = 0.0
+        for trait, value in character.get('personality_traits', {}).items():
+            self.traits[i, self._trait_columns[trait]] = float(value)
+            self.trait_mask[i, self._trait_columns[trait]] = 1.0
+
+        # Roles as indices into a role-pair compatibility table
+        self.roles[i] = self._role_ids[character.get('role', 'Character')]
+
+        # Speaking style components (comma-separated) as a multi-hot row
+        components = self._style_components(character)
+        self.styles[i] = 0.0
+        for comp in components:
+            self.styles[i, self._style_columns[comp]] = 1.0
+        self.style_lengths[i] = len(components)
+
+    def _build_role_table(self):
+        role_ids = self._role_ids
+        self.role_table = np.full((len(role_ids), len(role_ids)), 0.5)
+        for role1, role2 in COMPATIBLE_ROLE_PAIRS:
+            if role1 in role_ids and role2 in role_ids:
+                self.role_table[role_ids[role1], role_ids[role2]] = 0.7
+                self.role_table[role_ids[role2], role_ids[role1]] = 0.7
+        np.fill_diagonal(self.role_table, 1.0)
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """Unit-length feature vectors for similarity search (built lazily after updates)"""
+        if self._embeddings is None:
+            n = len(self)
+            role_onehot = np.zeros((n, len(self._role_ids)))
+            role_onehot[np.arange(n), self.roles] = 1.0
+            blocks = [self._normalize(self.traits), role_onehot, self._normalize(self.styles)]
+            self._embeddings = self._normalize(np.hstack(blocks)) if n else np.zeros((0, 0))
+        return self._embeddings
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+    def personality_compatibility(self, rows: slice) -> np.ndarray:
+        """Trait agreement over shared traits: 1 - min(2 * mean pairwise variance, 1)"""
+        common = self.trait_mask[rows] @ self.trait_mask.T
+        # Sum over shared traits of (a - b)^2, expanded so it stays a matrix product;
+        # the expansion can round slightly below zero for identical values
+        squared_diff = np.maximum(self._trait_squares[rows] @ self.trait_mask.T
+                                  + self.trait_mask[rows] @ self._trait_squares.T
+                                  - 2 * (self.traits[rows] @ self.traits.T), 0.0)
+        # Variance of two values is (a - b)^2 / 4
+        avg_variance = np.divide(squared_diff / 4, common, out=np.zeros_like(common), where=common > 0)
+        return np.where(common > 0, 1.0 - np.minimum(avg_variance * 2, 1.0), 0.3)
+
+    def role_compatibility(self, rows: slice) -> np.ndarray:
+        return self.role_table[self.roles[rows][:, None], self.roles[None, :]]
+
+    def style_compatibility(self, rows: slice) -> np.ndarray:
+        """Conflicting style components lower the score, shared components raise it"""
+        shared = self.styles[rows] @ self.styles.T
+        union = self.style_unique[rows][:, None] + self.style_unique[None, :] - shared
+        total = self.style_lengths[rows][:, None] + self.style_lengths[None, :]
+
+        compatibility = np.full(shared.shape, 0.7)
+        for first, second in self.style_conflicts:
+            has_first = first[rows][:, None] | first[None, :]
+            has_second = second[rows][:, None] | second[None, :]
+            compatibility -= 0.2 * (has_first & has_second)
+        compatibility += 0.2 * (union < total * 0.7)
+        return np.clip(compatibility, 0, 1)
+
+    def fusion_compatibility(self, rows: slice) -> np.ndarray:
+        """Overall fusion compatibility for a block of rows against every character"""
+        return (self.personality_compatibility(rows) + self.role_compatibility(rows)
+                + self.style_compatibility(rows)) / 3
+
+    def similarity(self, rows: slice) -> np.ndarray:
+        """Cosine similarity of combined trait/role/style vectors"""
+        return self.embeddings[rows] @ self.embeddings.T
+
+    def batches(self) -> Iterator[slice]:
+        for start in range(0, len(self), self.BATCH_SIZE):
+            yield slice(start, min(start + self.BATCH_SIZE, len(self)))
+
+    def _rank(self, rows: slice, kind: str, k: int) -> Dict[str, List[Tuple[str, float]]]:
+        score_block = self.fusion_compatibility if kind == 'compatibility' else self.similarity
+        scores = score_block(rows)
+        # Never rank a character against itself
+        scores[np.arange(scores.shape[0]), np.arange(rows.start, rows.stop)] = -np.inf
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind='stable')
+        return {
+            self.ids[rows.start + offset]: [(self.ids[col], round(float(val), 4)) for col, val in zip(cols, vals)]
+            for offset, (cols, vals) in enumerate(zip(np.take_along_axis(candidates, order, axis=1),
+                                                      np.take_along_axis(candidate_scores, order, axis=1)))
+        }
+
+    def top_k(self, kind: str, k: int) -> Dict[str, List[Tuple[str, float]]]:
+        """Best k partners per character for 'compatibility' or 'similarity'"""
+        k = min(k, len(self) - 1)
+        if k <= 0:
+            return {char_id: [] for char_id in self.ids}
+
+        rankings = {}
+        for rows in self.batches():
+            rankings.update(self._rank(rows, kind, k))
+        return rankings
+
+    def top_k_for(self, char_id: str, kind: str, k: int) -> List[Tuple[str, float]]:
+        """Best k partners for one character: a single row of scores, O(N)"""
+        k = min(k, len(self) - 1)
+        if char_id not in self.positions or k <= 0:
+            return []
+        i = self.positions[char_id]
+        return self._rank(slice(i, i + 1), kind, k)[char_id]
@@ -6,6 +6,7 @@ Merge multiple characters into unique hybrids.
 """
 
 import uuid
+import threading
 from typing import Dict, Any, List, Tuple, Optional
 from datetime import datetime
 import numpy as np
@@ -14,11 +15,19 @@ from core.database import DatabaseManager
 from core.models import Character, PersonalityProfile
 from config.logging_config import logger
 from integrations.adapters.analytics_adapter import AnalyticsAdapter
+from .character_feature_matrix import CharacterFeatureMatrix, character_features
 
 
 class CharacterFusionService:
     """Service for fusing characters into hybrids"""
     
+    # Rankings are precomputed this deep for every character
+    RANKING_DEPTH = 20
+    
+    # Library feature matrix shared by all service instances
+    _feature_matrix: Optional[CharacterFeatureMatrix] = None
+    _matrix_lock = threading.Lock()
+    
     def __init__(self):
         """Initialize fusion service"""
         self.db = DatabaseManager()
@@ -487,6 +496,77 @@ class CharacterFusionService:
             logger.error(f"Error checking fusion compatibility: {e}")
             return {'success': False, 'error': str(e)}
     
+    def rank_fusion_partners(self, character_id: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Best fusion partners for a character across the whole library
+        
+        Args:
+            character_id: Character to find partners for
+            top_k: Number of partners to return
+            
+        Returns:
+            Partners ordered by overall fusion compatibility
+        """
+        return [
+            {'character_id': partner_id, 'name': name, 'compatibility': score}
+            for partner_id, name, score in self._get_rankings(character_id, 'compatibility', top_k)
+        ]
+    
+    def find_similar_characters(self, character_id: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Characters with the most similar traits, role and speaking style
+        
+        Args:
+            character_id: Character to compare against
+            top_k: Number of characters to return
+            
+        Returns:
+            Characters ordered by similarity
+        """
+        return [
+            {'character_id': other_id, 'name': name, 'similarity': score}
+            for other_id, name, score in self._get_rankings(character_id, 'similarity', top_k)
+        ]
+    
+    def _get_rankings(self, character_id: str, kind: str, top_k: int) -> List[List[Any]]:
+        """Persisted top-k rankings, rescored for just this character when stale"""
+        try:
+            if top_k <= self.RANKING_DEPTH:
+                cached = self.db.get_character_rankings(character_id, kind, self.db.get_library_version())
+                if cached is not None:
+                    return cached[:top_k]
+            
+            matrix = self._get_feature_matrix()
+            depth = max(top_k, self.RANKING_DEPTH)
+            ranked = [[other_id, matrix.names[matrix.positions[other_id]], score]
+                      for other_id, score in matrix.top_k_for(character_id, kind, depth)]
+            if depth == self.RANKING_DEPTH and character_id in matrix.positions:
+                self.db.save_character_rankings(kind, matrix.version, {character_id: ranked})
+            
+            return ranked[:top_k]
+            
+        except Exception as e:
+            logger.error(f"Error ranking characters by {kind}: {e}")
+            return []
+    
+    def _get_feature_matrix(self) -> CharacterFeatureMatrix:
+        """Library feature matrix, updated row by row for characters written since it was built"""
+        version = self.db.get_library_version()
+        with self._matrix_lock:
+            matrix = CharacterFusionService._feature_matrix
+            if matrix is None or matrix.version > version:
+                records = self.db.list_character_records()
+                matrix = CharacterFeatureMatrix([character_features(r) for r in records], version)
+                CharacterFusionService._feature_matrix = matrix
+                logger.info(f"Built character feature matrix: {len(matrix)} characters (v{version})")
+            elif matrix.version < version:
+                changed, current_ids = self.db.list_character_changes(matrix.version)
+                removed = set(matrix.ids) - set(current_ids)
+                matrix.update([character_features(r) for r in changed], removed, version)
+                logger.info(f"Updated character feature matrix: {len(changed)} changed, "
+                            f"{len(removed)} removed (v{version})")
+            return matrix
+    
     def _calculate_personality_compatibility(
         self,
         characters: List[Dict[str, Any]]
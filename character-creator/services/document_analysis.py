@@ -0,0 +1,245 @@
+"""
+Document Analysis
+=================
+
+Parse-once view of a document shared by the character pipeline stages.
+The NLP adapter is called at most once per view; sentences, person mentions,
+dialogue attribution and description matches are derived lazily and cached.
+"""
+
+import re
+from bisect import bisect_right
+from collections import defaultdict, Counter
+from functools import cached_property
+from typing import List, Dict, Any, Tuple
+
+DIALOGUE_VERBS = ('said', 'replied', 'asked', 'whispered', 'shouted')
+
+_QUOTE_PATTERN = re.compile(r'"([^"]+)"')
+# '"..." said Name' / '"..." Name replied'
+_SPEAKER_AFTER_PATTERN = re.compile(
+    r'[,\s]+(?:(said)\s+(\w+)|(\w+)\s+(replied|asked|whispered|shouted))', re.IGNORECASE
+)
+# 'Name said: "..."'
+_SPEAKER_BEFORE_PATTERN = re.compile(
+    r'(\w+)\s+(said|replied|asked|whispered|shouted)[,:\s]+$', re.IGNORECASE
+)
+
+DESCRIPTION_PATTERNS = [
+    re.compile(r'(\w+)\s+was\s+(?:a|an)\s+([^.]+)', re.IGNORECASE),
+    re.compile(r'(\w+)\s+looked\s+([^.]+)', re.IGNORECASE),
+    re.compile(r'(\w+)\s+had\s+([^.]+)', re.IGNORECASE),
+    re.compile(r'(\w+),\s+(?:a|an|the)\s+([^,]+),', re.IGNORECASE),
+]
+
+NAME_TITLES = ['Mr.', 'Mrs.', 'Ms.', 'Dr.', 'Prof.', 'Sir', 'Lady', 'Lord']
+
+def normalize_name(name: str) -> str:
+    """Normalize character names"""
+    # Remove titles
+    for title in NAME_TITLES:
+        name = name.replace(title, '').strip()
+
+    # Capitalize properly
+    return ' '.join(word.capitalize() for word in name.split())
+
+
+class DocumentAnalysis:
+    """Lazily computed, cached views over one parse of a document"""
+
+    CONTEXT_WINDOW = 50
+    SPEAKER_WINDOW = 80
+
+    def __init__(self, text: str, nlp_adapter):
+        self.text = text
+        self.nlp_adapter = nlp_adapter
+
+    @cached_property
+    def _nlp_pass(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+        """Entities and dialogue from one adapter parse of the text"""
+        return self.nlp_adapter.extract_entities_and_dialogue(self.text)
+
+    @cached_property
+    def entities(self) -> List[Dict[str, Any]]:
+        """Named entities from the single NLP pass"""
+        return self._nlp_pass[0]
+
+    @cached_property
+    def person_entities(self) -> List[Dict[str, Any]]:
+        return [ent for ent in self.entities if ent.get('type') == "PERSON"]
+
+    @cached_property
+    def dialogues(self) -> List[Dict[str, str]]:
+        """Dialogue from the same NLP pass as the entities"""
+        return self._nlp_pass[1]
+
+    @cached_property
+    def sentence_spans(self) -> List[Tuple[int, int]]:
+        """(start, end) offsets of '.'-delimited sentences"""
+        spans = []
+        start = 0
+        for match in re.finditer(r'\.', self.text):
+            spans.append((start, match.start()))
+            start = match.end()
+        spans.append((start, len(self.text)))
+        return spans
+
+    @cached_property
+    def sentences(self) -> List[str]:
+        return [self.text[start:end] for start, end in self.sentence_spans]
+
+    @cached_property
+    def sentence_persons(self) -> List[List[Dict[str, Any]]]:
+        """Person entities grouped by the sentence they occur in"""
+        buckets = [[] for _ in self.sentence_spans]
+        starts = [start for start, _ in self.sentence_spans]
+
+        for ent in self.person_entities:
+            if ent.get('end', 0) > ent.get('start', 0):
+                buckets[max(0, bisect_right(starts, ent['start']) - 1)].append(ent)
+            else:
+                # No offsets: place the entity wherever its text occurs
+                for index, sentence in enumerate(self.sentences):
+                    if ent['text'] in sentence:
+                        buckets[index].append(ent)
+
+        return buckets
+
+    @cached_property
+    def mentions(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Person mentions with surrounding context, keyed by normalized name"""
+        mentions = defaultdict(list)
+        for ent in self.person_entities:
+            mentions[normalize_name(ent['text'])].append({
+                'text': ent['text'],
+                'context': self.context_window(ent.get('start', 0), ent.get('end', 0)),
+                'start': ent.get('start', 0),
+                'end': ent.get('end', 0)
+            })
+        return dict(mentions)
+
+    def contexts(self, name: str) -> List[str]:
+        """Context windows around every mention of a character"""
+        return [mention['context'] for mention in self.mentions.get(name, [])]
+
+    def context_window(self, start: int, end: int) -> str:
+        return self.text[max(0, start - self.CONTEXT_WINDOW):min(len(self.text), end + self.CONTEXT_WINDOW)]
+
+    @cached_property
+    def quotes(self) -> List[Tuple[int, int, str]]:
+        """(start, end, text) of every double-quoted span"""
+        return [(match.start(), match.end(), match.group(1)) for match in _QUOTE_PATTERN.finditer(self.text)]
+
+    @cached_property
+    def attributed_dialogues(self) -> List[Dict[str, str]]:
+        """Quoted speech with a speaker found next to the quote"""
+        dialogues = []
+        for start, end, quote in self.quotes:
+            before = _SPEAKER_BEFORE_PATTERN.search(self.text[max(0, start - self.SPEAKER_WINDOW):start])
+            if before:
+                dialogues.append({
+                    'speaker': normalize_name(before.group(1)),
+                    'text': quote,
+                    'verb': before.group(2).lower()
+                })
+
+            after = _SPEAKER_AFTER_PATTERN.match(self.text, end)
+            if after:
+                speaker = after.group(2) or after.group(3)
+                verb = after.group(1) or after.group(4)
+                dialogues.append({
+                    'speaker': normalize_name(speaker),
+                    'text': quote,
+                    'verb': verb.lower()
+                })
+
+        return dialogues
+
+    @cached_property
+    def description_candidates(self) -> List[Tuple[int, str, str]]:
+        """(pattern index, name, description) for every description-like phrase"""
+        candidates = []
+        for pattern_index, pattern in enumerate(DESCRIPTION_PATTERNS):
+            for match in pattern.finditer(self.text):
+                candidates.append((pattern_index, normalize_name(match.group(1)), match.group(2)))
+        return candidates
+
+
+class CharacterContextIndex:
+    """Per-document map from character names to sentence ids, co-occurrences and dialogue turns"""
+
+    def __init__(self, analysis: DocumentAnalysis):
+        self.analysis = analysis
+        self.sentence_ids: Dict[str, List[int]] = defaultdict(list)
+        self.cooccurrence: Dict[str, Counter] = defaultdict(Counter)
+        self.dialogue_turns: Dict[str, List[int]] = defaultdict(list)
+        self._lowered_sentences: Dict[int, str] = {}
+
+        for sentence_id, persons in enumerate(analysis.sentence_persons):
+            names = list(dict.fromkeys(normalize_name(person['text']) for person in persons))
+            for name in names:
+                self.sentence_ids[name].append(sentence_id)
+                for other in names:
+                    if other != name:
+                        self.cooccurrence[name][other] += 1
+
+        for turn, dialogue in enumerate(analysis.attributed_dialogues):
+            self.dialogue_turns[dialogue['speaker']].append(turn)
+
+    def sentences(self, name: str) -> List[Tuple[int, str]]:
+        """(sentence id, lowercased sentence) for every sentence mentioning a character"""
+        sentences = []
+        for sentence_id in self.sentence_ids.get(name, []):
+            lowered = self._lowered_sentences.get(sentence_id)
+            if lowered is None:
+                lowered = self._lowered_sentences[sentence_id] = self.analysis.sentences[sentence_id].lower()
+            sentences.append((sentence_id, lowered))
+        return sentences
+
+    def others_in_sentence(self, sentence_id: int, name: str) -> List[str]:
+        """Other characters mentioned in a sentence, in order of appearance"""
+        others = (normalize_name(person['text']) for person in self.analysis.sentence_persons[sentence_id])
+        return [other for other in dict.fromkeys(others) if other != name]
+
+    def dialogues(self, name: str) -> List[Dict[str, str]]:
+        """Attributed dialogue turns spoken by a character"""
+        return [self.analysis.attributed_dialogues[turn] for turn in self.dialogue_turns.get(name, [])]
+
+    def character_slices(self) -> Dict[str, Dict[str, Any]]:
+        """Per character, everything the deep analysis reads from the index (picklable)"""
+        return {
+            name: {
+                'sentences': [(lowered, self.others_in_sentence(sentence_id, name))
+                              for sentence_id, lowered in self.sentences(name)],
+                'dialogues': self.dialogues(name)
+            }
+            for name in dict.fromkeys(list(self.sentence_ids) + list(self.dialogue_turns))
+        }
+
+
+class CharacterSliceIndex:
+    """CharacterContextIndex interface for one character, backed by merged per-chapter slices"""
+
+    def __init__(self, name: str, character_slice: Dict[str, Any]):
+        self.name = name
+        self._sentences: List[Tuple[str, List[str]]] = character_slice.get('sentences', [])
+        self._dialogues: List[Dict[str, str]] = character_slice.get('dialogues', [])
+
+    @staticmethod
+    def merge(slices: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Concatenate one character's slices in document order"""
+        return {
+            'sentences': [sentence for s in slices for sentence in s.get('sentences', [])],
+            'dialogues': [dialogue for s in slices for dialogue in s.get('dialogues', [])]
+        }
+
+    def sentences(self, name: str) -> List[Tuple[int, str]]:
+        if name != self.name:
+            return []
+        return [(sentence_id, lowered) for sentence_id, (lowered, _) in enumerate(self._sentences)]
+
+    def others_in_sentence(self, sentence_id: int, name: str) -> List[str]:
+        return [other for other in self._sentences[sentence_id][1] if other != name]
+
+    def dialogues(self, name: str) -> List[Dict[str, str]]:
+        return list(self._dialogues) if name == self.name else []
@@ -7,26 +7,217 @@ Characters remember everything and respond with full emotional context.
 """
 
 import json
+import math
+import re
+import zlib
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Tuple
-from collections import defaultdict, deque
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple, Callable, FrozenSet
+from collections import defaultdict, deque, OrderedDict
+from collections.abc import MutableSequence
 import hashlib
 
+import numpy as np
+
 from config.logging_config import logger
 
+COMMON_WORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+                          'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'been'})
+
+@lru_cache(maxsize=1024)
+def _content_terms(text: str) -> FrozenSet[str]:
+    """Lowercased words of a message without common words (cached per message)"""
+    return frozenset(re.findall(r"[\w']+", text.lower())) - COMMON_WORDS
+
+
+class MemoryIndex:
+    """Incremental keyword (and optional embedding) index over stored memories"""
+    
+    MIN_TERM_LENGTH = 5
+    MAX_POSTINGS_PER_TERM = 200  # Only the most recent memories per term are scored
+    RECENCY_HALF_LIFE_DAYS = 30.0
+    SIMILARITY_THRESHOLD = 0.5
+    
+    def __init__(self, embedder: Optional[Callable[[str], List[float]]] = None):
+        self.embedder = embedder
+        self.postings: Dict[str, OrderedDict] = defaultdict(OrderedDict)
+        self.memories: List[Tuple[Any, datetime, float]] = []
+        self._vectors: Optional[np.ndarray] = None
+    
+    def __len__(self) -> int:
+        return len(self.memories)
+    
+    @classmethod
+    def terms(cls, text: str) -> FrozenSet[str]:
+        """Index terms for a text"""
+        return frozenset(t for t in _content_terms(text) if len(t) >= cls.MIN_TERM_LENGTH)
+    
+    def add(self, memory: Any, text: str, timestamp: datetime, significance: float = 0.0) -> int:
+        """Index a memory and return its position"""
+        memory_id = len(self.memories)
+        self.memories.append((memory, timestamp, significance))
+        
+        for term in self.terms(text):
+            postings = self.postings[term]
+            postings[memory_id] = True
+            if len(postings) > self.MAX_POSTINGS_PER_TERM:
+                postings.popitem(last=False)
+        
+        if self.embedder is not None:
+            self._add_vector(memory_id, text)
+        
+        return memory_id
+    
+    def rebuild(self, entries: List[Tuple[Any, str, datetime, float]]):
+        """Re-index (memory, text, timestamp, significance) entries from scratch"""
+        self.postings.clear()
+        self.memories.clear()
+        self._vectors = None
+        for memory, text, timestamp, significance in entries:
+            self.add(memory, text, timestamp, significance)
+    
+    def search(self, text: str, limit: int = 5, now: Optional[datetime] = None) -> List[Tuple[Any, float]]:
+        """Memories ranked by keyword/semantic relevance, significance and recency"""
+        now = now or datetime.now()
+        scores: Dict[int, float] = defaultdict(float)
+        total = len(self.memories)
+        
+        for term in self.terms(text):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + total / len(postings))
+            for memory_id in postings:
+                scores[memory_id] += idf
+        
+        if self._vectors is not None and text.strip():
+            query = self._embed(text)
+            if query is not None:
+                similarities = self._vectors[:total] @ query
+                for memory_id in np.nonzero(similarities >= self.SIMILARITY_THRESHOLD)[0]:
+                    scores[int(memory_id)] += float(similarities[memory_id])
+        
+        ranked = []
+        for memory_id, relevance in scores.items():
+            memory, timestamp, significance = self.memories[memory_id]
+            age_days = max(0.0, (now - timestamp).total_seconds() / 86400)
+            recency = 0.5 ** (age_days / self.RECENCY_HALF_LIFE_DAYS)
+            ranked.append((memory, relevance * (1 + significance) * (0.5 + 0.5 * recency)))
+        
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked[:limit]
+    
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        try:
+            vector = np.asarray(self.embedder(text), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Memory embedding failed, using keyword index only: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+    
+    def _add_vector(self, memory_id: int, text: str):
+        vector = self._embed(text)
+        if vector is None:
+            return
+        if self._vectors is None:
+            self._vectors = np.zeros((16, vector.shape[0]), dtype=np.float32)
+        if memory_id >= self._vectors.shape[0]:
+            grown = np.zeros((self._vectors.shape[0] * 2, self._vectors.shape[1]), dtype=np.float32)
+            grown[:self._vectors.shape[0]] = self._vectors
+            self._vectors = grown
+        self._vectors[memory_id] = vector
+
+
+def _to_json_safe(value: Any) -> Any:
+    """Convert memory state to JSON-compatible values, tagging datetimes"""
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, dict):
+        return {key: _to_json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, deque, MutableSequence)):
+        return [_to_json_safe(item) for item in value]
+    return value
+
+
+def _from_json_safe(value: Any) -> Any:
+    """Inverse of _to_json_safe for already-decoded JSON values"""
+    if isinstance(value, dict):
+        if len(value) == 1 and '__datetime__' in value:
+            return datetime.fromisoformat(value['__datetime__'])
+        return {key: _from_json_safe(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_from_json_safe(item) for item in value]
+    return value
+
+
+class LazyMemoryList(MutableSequence):
+    """Sequence whose stored prefix is fetched on first read; appends never trigger a load"""
+    
+    def __init__(self, loader: Callable[[], List[Any]]):
+        self._loader = loader
+        self._items: List[Any] = []
+    
+    def _loaded(self) -> List[Any]:
+        if self._loader is not None:
+            loader, self._loader = self._loader, None
+            self._items[:0] = loader()
+        return self._items
+    
+    def append(self, item: Any):
+        self._items.append(item)
+    
+    def insert(self, index: int, item: Any):
+        self._loaded().insert(index, item)
+    
+    def __getitem__(self, index):
+        return self._loaded()[index]
+    
+    def __setitem__(self, index, value):
+        self._loaded()[index] = value
+    
+    def __delitem__(self, index):
+        del self._loaded()[index]
+    
+    def __len__(self) -> int:
+        return len(self._loaded())
+    
+    def __iter__(self):
+        return iter(self._loaded())
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, LazyMemoryList)):
+            return self._loaded() == list(other)
+        return NotImplemented
+    
+    def __repr__(self) -> str:
+        return f"LazyMemoryList({self._loaded()!r})"
+
+
 class EmotionalMemoryCore:
     """Core emotional memory system for characters"""
     
-    def __init__(self, character_id: str):
-        """Initialize emotional memory for a character"""
+    SNAPSHOT_INTERVAL = 25  # Interactions between compact snapshots
+    
+    def __init__(self, character_id: str, embedder: Optional[Callable[[str], List[float]]] = None,
+                 db=None, user_id: str = '', baseline_mood: str = 'neutral'):
+        """Initialize emotional memory for a character (starting in its baseline mood)"""
         self.character_id = character_id
+        self.user_id = user_id
+        
+        # Persistence: snapshot + delta log (see restore / save_snapshot)
+        self.db = db
+        self._seq = 0
+        self._snapshot_seq = 0
+        self._replaying = False
+        self._clock: Optional[datetime] = None
         
         # Emotional state tracking
         self.emotional_state = {
-            'current_mood': 'neutral',
+            'current_mood': baseline_mood,
             'mood_intensity': 0.5,
             'emotional_momentum': 0.0,  # How fast emotions are changing
-            'baseline_mood': 'neutral',  # Character's default mood
+            'baseline_mood': baseline_mood,  # Character's default mood
             'mood_history': deque(maxlen=50),  # Track mood changes
             'triggers_activated': []  # What set off current mood
         }
@@ -86,6 +277,18 @@ class EmotionalMemoryCore:
             'core_memories': [],  # Defining moments
             'suppressed_memories': []  # Things character doesn't want to remember
         }
+        
+        # Retrieval index over core memories, maintained in _store_memory
+        self.memory_index = MemoryIndex(embedder)
+        
+        if self.db is not None:
+            self.restore()
+            # The personality may have changed since the snapshot was taken
+            self.emotional_state['baseline_mood'] = baseline_mood
+    
+    def _now(self) -> datetime:
+        """Current time, or the original interaction time while replaying deltas"""
+        return self._clock or datetime.now()
     
     def process_interaction(self, user_message: str, character_response: str, 
                           emotional_context: Dict[str, Any]) -> Dict[str, Any]:
@@ -93,7 +296,7 @@ class EmotionalMemoryCore:
         
         # Create interaction record
         interaction = {
-            'timestamp': datetime.now(),
+            'timestamp': self._now(),
             'user_message': user_message,
             'character_response': character_response,
             'emotional_context': emotional_context,
@@ -116,7 +319,7 @@ class EmotionalMemoryCore:
         interaction['significance'] = significance
         
         # Store in appropriate memory
-        self._store_memory(interaction, significance)
+        stored_long_term = self._store_memory(interaction, significance)
         
         # Update relationship status
         self._update_relationship(interaction, emotional_context)
@@ -126,10 +329,14 @@ class EmotionalMemoryCore:
         
         # Update counts
         self.relationship_memory['total_interactions'] += 1
-        self.relationship_memory['last_interaction'] = datetime.now()
+        self.relationship_memory['last_interaction'] = self._now()
         
         if self.relationship_memory['first_meeting'] is None:
-            self.relationship_memory['first_meeting'] = datetime.now()
+            self.relationship_memory['first_meeting'] = self._now()
+        
+        self._seq += 1
+        if self.db is not None and not self._replaying:
+            self._log_delta(interaction, stored_long_term)
         
         return {
             'emotional_impact': emotional_impact,
@@ -217,7 +424,7 @@ class EmotionalMemoryCore:
             self.emotional_state['mood_history'].append({
                 'from': current_mood,
                 'to': new_mood,
-                'timestamp': datetime.now(),
+                'timestamp': self._now(),
                 'trigger': context.get('trigger', 'interaction')
             })
             self.emotional_state['current_mood'] = new_mood
@@ -227,7 +434,7 @@ class EmotionalMemoryCore:
             self.emotional_state['triggers_activated'].append({
                 'trigger': context.get('trigger', 'unknown'),
                 'impact': impact,
-                'timestamp': datetime.now()
+                'timestamp': self._now()
             })
     
     def _calculate_significance(self, interaction: Dict, context: Dict) -> float:
@@ -265,26 +472,120 @@ class EmotionalMemoryCore:
         
         return min(1.0, significance)
     
-    def _store_memory(self, interaction: Dict, significance: float):
-        """Store interaction in appropriate memory bank"""
+    def _store_memory(self, interaction: Dict, significance: float) -> bool:
+        """Store interaction in appropriate memory bank; returns whether it became long-term"""
         # Always store in short-term
         self.memory_bank['short_term'].append(interaction)
+        stored_long_term = significance > 0.5
         
         # Store in long-term if significant
-        if significance > 0.5:
+        if stored_long_term:
             self.memory_bank['long_term'].append(interaction)
             
             # Check if this should be a core memory
             if significance > 0.8 or self._is_defining_moment(interaction):
-                self.memory_bank['core_memories'].append({
+                core_memory = {
                     'interaction': interaction,
                     'significance': significance,
                     'memory_tag': self._generate_memory_tag(interaction)
-                })
+                }
+                self.memory_bank['core_memories'].append(core_memory)
+                self.memory_index.add(core_memory, interaction['user_message'],
+                                      interaction['timestamp'], significance)
         
         # Handle suppressed memories (negative high-impact)
         if interaction['emotional_impact'] < -0.7:
             self.memory_bank['suppressed_memories'].append(interaction)
+        
+        return stored_long_term
+    
+    def _log_delta(self, interaction: Dict, stored_long_term: bool):
+        """Append this interaction to the delta log, snapshotting periodically"""
+        delta = _to_json_safe({
+            'timestamp': interaction['timestamp'],
+            'user_message': interaction['user_message'],
+            'character_response': interaction['character_response'],
+            'emotional_context': interaction['emotional_context']
+        })
+        long_term_memory = _to_json_safe(interaction) if stored_long_term else None
+        self.db.append_memory_delta(self.character_id, self._seq, delta,
+                                    long_term_memory, user_id=self.user_id)
+        
+        if self._seq - self._snapshot_seq >= self.SNAPSHOT_INTERVAL:
+            self.save_snapshot()
+    
+    def to_snapshot(self) -> Dict[str, Any]:
+        """Compact state for persistence (long-term memories are stored separately)"""
+        return _to_json_safe({
+            'seq': self._seq,
+            'emotional_state': self.emotional_state,
+            'relationship_memory': self.relationship_memory,
+            'context_memory': self.context_memory,
+            'memory_bank': {key: value for key, value in self.memory_bank.items() if key != 'long_term'}
+        })
+    
+    def save_snapshot(self) -> bool:
+        """Write a compressed snapshot and compact the delta log"""
+        if self.db is None:
+            return False
+        state = zlib.compress(json.dumps(self.to_snapshot(), separators=(',', ':')).encode('utf-8'))
+        saved = self.db.save_memory_snapshot(self.character_id, self._seq, state, user_id=self.user_id)
+        if saved:
+            self._snapshot_seq = self._seq
+        return saved
+    
+    def restore(self):
+        """Load the latest snapshot, replay newer deltas and defer long-term memories"""
+        start_time = datetime.now()
+        snapshot = self.db.load_memory_snapshot(self.character_id, user_id=self.user_id)
+        if snapshot:
+            state = _from_json_safe(json.loads(zlib.decompress(snapshot['state'])))
+            self._apply_snapshot(state)
+            self._seq = self._snapshot_seq = snapshot['seq']
+        
+        snapshot_seq = self._snapshot_seq
+        self.memory_bank['long_term'] = LazyMemoryList(
+            lambda: _from_json_safe(self.db.get_long_term_memories(self.character_id, snapshot_seq,
+                                                                   user_id=self.user_id))
+        )
+        
+        deltas = self.db.get_memory_deltas(self.character_id, snapshot_seq, user_id=self.user_id)
+        self._replaying = True
+        try:
+            for entry in deltas:
+                delta = _from_json_safe(entry['delta'])
+                self._clock = delta['timestamp']
+                self.process_interaction(delta['user_message'], delta['character_response'],
+                                         delta['emotional_context'])
+                self._seq = entry['seq']
+        finally:
+            self._replaying = False
+            self._clock = None
+        
+        if snapshot or deltas:
+            elapsed_ms = (datetime.now() - start_time).total_seconds() * 1000
+            logger.info(f"Restored emotional memory for {self.character_id}: snapshot seq {snapshot_seq}, "
+                       f"{len(deltas)} deltas replayed in {elapsed_ms:.1f}ms")
+    
+    def _apply_snapshot(self, state: Dict[str, Any]):
+        """Restore snapshot sections in place, keeping deque/defaultdict containers"""
+        for section in ('emotional_state', 'relationship_memory', 'context_memory', 'memory_bank'):
+            target = getattr(self, section)
+            for key, value in state.get(section, {}).items():
+                current = target.get(key)
+                if isinstance(current, deque):
+                    current.clear()
+                    current.extend(value)
+                elif isinstance(current, defaultdict):
+                    current.clear()
+                    current.update(value)
+                else:
+                    target[key] = value
+        
+        self.memory_index.rebuild([
+            (core, core['interaction']['user_message'], core['interaction']['timestamp'], core['significance'])
+            for core in self.memory_bank['core_memories']
+        ])
     
     def _update_relationship(self, interaction: Dict, context: Dict):
         """Update relationship status based on interaction"""
@@ -309,7 +610,7 @@ class EmotionalMemoryCore:
         # Track specific relationship events
         if context.get('is_conflict'):
             self.relationship_memory['conflicts'].append({
-                'timestamp': datetime.now(),
+                'timestamp': self._now(),
                 'issue': context.get('conflict_issue', 'unknown'),
                 'resolved': False
             })
@@ -319,14 +620,14 @@ class EmotionalMemoryCore:
             for conflict in reversed(self.relationship_memory['conflicts']):
                 if not conflict['resolved']:
                     conflict['resolved'] = True
-                    conflict['resolution_time'] = datetime.now()
+                    conflict['resolution_time'] = self._now()
                     break
         
         # Track promises
         if 'promise' in interaction['user_message'].lower():
             self.relationship_memory['promises_made'].append({
                 'promise': interaction['user_message'],
-                'timestamp': datetime.now(),
+                'timestamp': self._now(),
                 'kept': None
             })
         
@@ -335,13 +636,13 @@ class EmotionalMemoryCore:
             self.relationship_memory['emotional_debts'].append({
                 'type': 'gratitude',
                 'reason': 'emotional support',
-                'timestamp': datetime.now()
+                'timestamp': self._now()
             })
         elif impact < -0.5:
             self.relationship_memory['emotional_debts'].append({
                 'type': 'hurt',
                 'reason': 'emotional damage',
-                'timestamp': datetime.now()
+                'timestamp': self._now()
             })
     
     def _extract_context(self, user_message: str, character_response: str, context: Dict):
@@ -350,7 +651,7 @@ class EmotionalMemoryCore:
         topics = context.get('topics', [])
         for topic in topics:
             self.context_memory['topics_discussed'][topic].append({
-                'timestamp': datetime.now(),
+                'timestamp': self._now(),
                 'context': user_message[:100]
             })
         
@@ -364,14 +665,14 @@ class EmotionalMemoryCore:
         if '?' in user_message:
             self.context_memory['questions_asked'].append({
                 'question': user_message,
-                'timestamp': datetime.now(),
+                'timestamp': self._now(),
                 'answered': True
             })
         
         # Track emotional peaks
         if abs(context.get('emotional_intensity', 0)) > 0.7:
             self.context_memory['emotional_peaks'].append({
-                'timestamp': datetime.now(),
+                'timestamp': self._now(),
                 'intensity': context['emotional_intensity'],
                 'context': user_message[:100]
             })
@@ -389,21 +690,19 @@ class EmotionalMemoryCore:
             'emotional_debts': self.relationship_memory['emotional_debts'][-3:]  # Recent debts
         }
     
-    def _get_relevant_memories(self, user_message: str) -> List[Dict[str, Any]]:
+    def _get_relevant_memories(self, user_message: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Get memories relevant to current conversation"""
         relevant_memories = []
         message_lower = user_message.lower()
         
-        # Check core memories first
-        for core_memory in self.memory_bank['core_memories']:
-            memory_text = core_memory['interaction']['user_message'].lower()
-            # Simple relevance check - could be made more sophisticated
-            if any(word in message_lower for word in memory_text.split() if len(word) > 4):
-                relevant_memories.append({
-                    'type': 'core',
-                    'memory': core_memory,
-                    'relevance': 'high'
-                })
+        # Check core memories first, ranked by relevance and recency
+        for core_memory, score in self.memory_index.search(user_message, limit):
+            relevant_memories.append({
+                'type': 'core',
+                'memory': core_memory,
+                'relevance': 'high',
+                'score': score
+            })
         
         # Check recent interactions for continuity
         for recent in list(self.memory_bank['short_term'])[-5:]:
@@ -433,7 +732,7 @@ class EmotionalMemoryCore:
         # Get unresolved emotions
         unresolved = []
         for debt in self.relationship_memory['emotional_debts']:
-            if debt['type'] == 'hurt' and (datetime.now() - debt['timestamp']) < timedelta(hours=24):
+            if debt['type'] == 'hurt' and (self._now() - debt['timestamp']) < timedelta(hours=24):
                 unresolved.append(debt)
         
         # Get current emotional needs
@@ -465,7 +764,7 @@ class EmotionalMemoryCore:
         
         # Relationship duration
         if self.relationship_memory['first_meeting']:
-            days_known = (datetime.now() - self.relationship_memory['first_meeting']).days
+            days_known = (self._now() - self.relationship_memory['first_meeting']).days
             if days_known > 0:
                 context_parts.append(f"known for {days_known} days")
         
@@ -559,7 +858,7 @@ class EmotionalMemoryCore:
                 self.relationship_memory['shared_moments'].append({
                     'type': 'relationship_milestone',
                     'description': f"Became {prog['next']}",
-                    'timestamp': datetime.now()
+                    'timestamp': self._now()
                 })
     
     def _references_shared_memory(self, message: str) -> bool:
@@ -658,19 +957,8 @@ class EmotionalMemoryCore:
     
     def _is_related_topic(self, message1: str, message2: str) -> bool:
         """Check if two messages are about related topics"""
-        # Simple word overlap check - could use more sophisticated NLP
-        words1 = set(message1.lower().split())
-        words2 = set(message2.lower().split())
-        
-        # Remove common words
-        common = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
-                 'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'been'}
-        
-        words1 = words1 - common
-        words2 = words2 - common
-        
-        # Check overlap
-        overlap = len(words1.intersection(words2))
+        # Simple word overlap check on cached term sets - could use more sophisticated NLP
+        overlap = len(_content_terms(message1) & _content_terms(message2))
         return overlap >= 2
     
     def get_memory_context_for_response(self) -> Dict[str, Any]:
@@ -8,7 +8,7 @@ Now uses the integration adapter for real LLM capabilities.
 
 import os
 import asyncio
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterator
 
 # Use our integration adapter for LLM
 from integrations.adapters.llm_adapter import GPTDialogueAdapter
@@ -137,6 +137,76 @@ class LLMService:
             except:
                 raise LLMError(f"Failed to generate response: {str(e)}")
     
+    def stream_response(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        mood: str = 'neutral'
+    ) -> Iterator[str]:
+        """
+        Stream a response synchronously, yielding chunks as they arrive
+        
+        Args:
+            prompt: The user prompt
+            system_prompt: System instructions
+            temperature: Response randomness
+            max_tokens: Maximum response length
+            mood: Character's current mood (for character context)
+            
+        Yields:
+            Response text chunks
+        """
+        enhanced_system_prompt = system_prompt or ""
+        if mood and mood != 'neutral':
+            enhanced_system_prompt += f"\n\nCurrent emotional state: {mood}. Respond accordingly."
+        
+        if self.llm_adapter.is_available():
+            # Drive the adapter's async stream from this thread
+            loop = asyncio.new_event_loop()
+            stream = self.llm_adapter.generate_streaming_response(
+                prompt=prompt,
+                system_prompt=enhanced_system_prompt,
+                temperature=temperature or self.temperature,
+                max_tokens=max_tokens or self.max_tokens
+            )
+            try:
+                while True:
+                    try:
+                        yield loop.run_until_complete(stream.__anext__())
+                    except StopAsyncIteration:
+                        break
+            finally:
+                loop.run_until_complete(stream.aclose())
+                loop.close()
+                
+        elif self.client:
+            received = False
+            try:
+                stream = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": enhanced_system_prompt},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=temperature or self.temperature,
+                    max_tokens=max_tokens or self.max_tokens,
+                    stream=True
+                )
+                for event in stream:
+                    delta = event.choices[0].delta.content if event.choices else None
+                    if delta:
+                        received = True
+                        yield delta
+            except Exception as e:
+                logger.error(f"OpenAI streaming error: {e}")
+                if not received:
+                    yield self._generate_fallback_response(prompt, mood)
+        else:
+            logger.warning("Using fallback response generation")
+            yield self._generate_fallback_response(prompt, mood)
+    
     def _generate_fallback_response(self, prompt: str, mood: str) -> str:
         """Generate simple fallback response when LLM is unavailable"""
         # Basic mood-based responses
@@ -7,6 +7,8 @@ Real-time chat interface with emotional memory and engagement tracking.
 
 import streamlit as st
 import time
+import uuid
+from collections import deque
 from datetime import datetime
 import json
 from typing import Dict, List, Any, Optional
@@ -36,20 +38,31 @@ def render_character_chat():
     
     # Initialize chat service if needed
     if 'chat_service' not in st.session_state or st.session_state.get('current_character_id') != character['id']:
+        # Resume this character's conversation for the rest of the browser session
+        session_ids = st.session_state.setdefault('chat_session_ids', {})
+        session_id = session_ids.setdefault(character['id'], uuid.uuid4().hex)
+        
         # Create Character object from dict
         char_obj = Character.from_dict(character)
-        st.session_state.chat_service = CharacterChatService(char_obj)
+        chat_service = CharacterChatService(char_obj, session_id=session_id)
+        st.session_state.chat_service = chat_service
         st.session_state.current_character_id = character['id']
-        st.session_state.chat_messages = []
+        
+        # Displayed history is bounded to the same window the service keeps in memory
+        st.session_state.chat_messages = deque(
+            ({'role': turn.role, 'content': turn.content, **(turn.metadata or {})}
+             for turn in chat_service.recent_turns),
+            maxlen=CharacterChatService.CONTEXT_WINDOW_TURNS
+        )
         
         # Add initial greeting
-        greetings = st.session_state.chat_service.get_conversation_starters()
-        if greetings:
+        greetings = chat_service.get_conversation_starters()
+        if greetings and not st.session_state.chat_messages:
             st.session_state.chat_messages.append({
                 'role': 'assistant',
                 'content': greetings[0],
                 'timestamp': datetime.now(),
-                'emotional_state': st.session_state.chat_service.emotional_memory.emotional_state['current_mood']
+                'emotional_state': chat_service.emotional_memory.emotional_state['current_mood']
             })
     
     chat_service = st.session_state.chat_service
@@ -314,25 +327,40 @@ def render_chat_input(chat_service: CharacterChatService):
             'timestamp': datetime.now()
         })
         
-        # Show typing indicator
-        with st.spinner(""):
-            # Generate response
-            response_data = chat_service.generate_response(user_input)
-            
-            # Check for memory triggers
-            memory_trigger = None
-            if response_data['memory_triggers']:
-                trigger = response_data['memory_triggers'][0]
-                memory_trigger = f"Remembers: {trigger.replace('_', ' ').title()}"
-            
-            # Add assistant response
-            st.session_state.chat_messages.append({
-                'role': 'assistant',
-                'content': response_data['response'],
-                'timestamp': datetime.now(),
-                'emotional_state': response_data['emotional_state'],
-                'memory_trigger': memory_trigger
-            })
+        # Stream the response into a placeholder as tokens arrive
+        placeholder = st.empty()
+        placeholder.markdown("""
+        <div class="typing-indicator">
+            <div class="typing-dot"></div><div class="typing-dot"></div><div class="typing-dot"></div>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        streamed = ""
+        for chunk in chat_service.stream_response(user_input):
+            streamed += chunk
+            placeholder.markdown(f"""
+            <div class="chat-message assistant-message">
+                {streamed}
+            </div>
+            """, unsafe_allow_html=True)
+        
+        response_data = chat_service.last_response
+        
+        # Check for memory triggers
+        memory_trigger = None
+        if response_data.get('memory_triggers'):
+            trigger = response_data['memory_triggers'][0]
+            memory_trigger = f"Remembers: {trigger.replace('_', ' ').title()}"
+        
+        # Add assistant response
+        st.session_state.chat_messages.append({
+            'role': 'assistant',
+            'content': response_data['response'],
+            'timestamp': datetime.now(),
+            'emotional_state': response_data.get('emotional_state', 'neutral'),
+            'memory_trigger': memory_trigger,
+            'streaming': response_data['metadata'].get('streaming')
+        })
         
         # Clear input and rerun
         st.rerun()
@@ -13,15 +13,21 @@ from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from collections import defaultdict, Counter
 import re
+import os
 import json
+import time
+import math
+import heapq
+import bisect
+from pathlib import Path
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
 # Try to import search libraries
 try:
-    from whoosh import index, fields, qparser, scoring
-    from whoosh.filedb.filestore import RamStorage
+    from whoosh import index, fields, qparser, scoring, analysis
+    from whoosh import query as whoosh_query_lib
     WHOOSH_AVAILABLE = True
 except ImportError:
     WHOOSH_AVAILABLE = False
@@ -350,6 +356,18 @@ class AdvancedSearchUI:
         """Render search suggestions when no results"""
         st.markdown("### 💡 Search Suggestions")
         
+        # Completions for the partial query
+        if st.session_state.search_query:
+            completions = self.search_engine.suggest(st.session_state.search_query)
+            if completions:
+                st.markdown("**Did you mean**")
+                cols = st.columns(len(completions))
+                for i, completion in enumerate(completions):
+                    with cols[i]:
+                        if st.button(completion, key=f"complete_{completion}"):
+                            st.session_state.search_query = completion
+                            self._perform_search()
+        
         # Popular searches
         st.markdown("**Popular Searches**")
         popular_searches = self._get_popular_searches()
@@ -430,6 +448,7 @@ class AdvancedSearchUI:
         # Add to history
         if st.session_state.search_query not in self.search_history:
             self.search_history.append(st.session_state.search_query)
+        self.search_engine.suggestions.record_query(st.session_state.search_query)
     
     def _add_filter(self, field: str, operator: str, value: Any):
         """Add a new filter"""
@@ -493,7 +512,11 @@ class AdvancedSearchUI:
     
     def _get_popular_searches(self) -> List[str]:
         """Get popular search terms"""
-        # In production, this would come from analytics
+        popular = self.search_engine.suggestions.popular_queries(6)
+        if popular:
+            return popular
+        
+        # Defaults until enough searches have been recorded
         return [
             "Python tutorial",
             "Machine learning",
@@ -503,53 +526,586 @@ class AdvancedSearchUI:
             "Error handling"
         ]
 
+class InvertedIndex:
+    """In-process BM25 inverted index used when Whoosh is not installed.
+    
+    Tokens are normalized once at indexing time, and facet postings are kept
+    up to date on add/remove so queries only touch matching documents.
+    """
+    
+    TOKEN_PATTERN = re.compile(r'\w+')
+    FIELD_WEIGHTS = {'title': 2.0, 'content': 1.0}
+    FACET_FIELDS = ('author', 'category', 'doc_type', 'tags')
+    K1 = 1.2
+    B = 0.75
+    
+    def __init__(self):
+        # field -> term -> {doc_id: term frequency}
+        self.postings: Dict[str, Dict[str, Dict[str, int]]] = {f: defaultdict(dict) for f in self.FIELD_WEIGHTS}
+        self.field_lengths: Dict[str, Dict[str, int]] = {f: {} for f in self.FIELD_WEIGHTS}
+        self.total_lengths: Dict[str, int] = {f: 0 for f in self.FIELD_WEIGHTS}
+        # facet field -> lowercased value -> doc ids, plus display value per key
+        self.facet_postings: Dict[str, Dict[str, Set[str]]] = {f: defaultdict(set) for f in self.FACET_FIELDS}
+        self.facet_labels: Dict[str, Dict[str, str]] = {f: {} for f in self.FACET_FIELDS}
+        self.doc_terms: Dict[str, Dict[str, Counter]] = {}
+        self.doc_facets: Dict[str, Dict[str, Set[str]]] = {}
+    
+    @classmethod
+    def tokenize(cls, text: str) -> List[str]:
+        """Lowercased word tokens"""
+        return cls.TOKEN_PATTERN.findall(text.lower()) if text else []
+    
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+    
+    @property
+    def vocabulary(self) -> Set[str]:
+        """All indexed content and title terms"""
+        return {term for field_postings in self.postings.values() for term in field_postings}
+    
+    def add(self, doc: Dict[str, Any]):
+        """Index (or re-index) a document"""
+        doc_id = str(doc['id'])
+        if doc_id in self.doc_terms:
+            self.remove(doc_id)
+        
+        terms = {}
+        for field_name in self.FIELD_WEIGHTS:
+            counts = Counter(self.tokenize(doc.get(field_name, '') or ''))
+            terms[field_name] = counts
+            for term, tf in counts.items():
+                self.postings[field_name][term][doc_id] = tf
+            length = sum(counts.values())
+            self.field_lengths[field_name][doc_id] = length
+            self.total_lengths[field_name] += length
+        self.doc_terms[doc_id] = terms
+        
+        facets = {}
+        for field_name in self.FACET_FIELDS:
+            values = doc.get(field_name)
+            if not values:
+                continue
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            keys = set()
+            for value in values:
+                key = str(value).lower()
+                keys.add(key)
+                self.facet_postings[field_name][key].add(doc_id)
+                self.facet_labels[field_name].setdefault(key, str(value))
+            facets[field_name] = keys
+        self.doc_facets[doc_id] = facets
+    
+    def remove(self, doc_id: str):
+        """Drop a document's postings and facet entries"""
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        
+        for field_name, counts in terms.items():
+            field_postings = self.postings[field_name]
+            for term in counts:
+                field_postings[term].pop(doc_id, None)
+                if not field_postings[term]:
+                    del field_postings[term]
+            self.total_lengths[field_name] -= self.field_lengths[field_name].pop(doc_id, 0)
+        
+        for field_name, keys in self.doc_facets.pop(doc_id, {}).items():
+            for key in keys:
+                members = self.facet_postings[field_name][key]
+                members.discard(doc_id)
+                if not members:
+                    del self.facet_postings[field_name][key]
+                    self.facet_labels[field_name].pop(key, None)
+    
+    def score(self, query_text: str, fields: Optional[List[str]] = None) -> Dict[str, float]:
+        """BM25 scores for every document matching at least one query term"""
+        scores: Dict[str, float] = defaultdict(float)
+        doc_count = len(self.doc_terms)
+        if not doc_count:
+            return scores
+        
+        for field_name in (fields or list(self.FIELD_WEIGHTS)):
+            if field_name not in self.FIELD_WEIGHTS:
+                continue
+            weight = self.FIELD_WEIGHTS[field_name]
+            lengths = self.field_lengths[field_name]
+            avg_length = (self.total_lengths[field_name] / doc_count) or 1.0
+            
+            for term in set(self.tokenize(query_text)):
+                matches = self.postings[field_name].get(term)
+                if not matches:
+                    continue
+                idf = math.log(1 + (doc_count - len(matches) + 0.5) / (len(matches) + 0.5))
+                for doc_id, tf in matches.items():
+                    norm = self.K1 * (1 - self.B + self.B * lengths[doc_id] / avg_length)
+                    scores[doc_id] += weight * idf * tf * (self.K1 + 1) / (tf + norm)
+        
+        return scores
+    
+    def facet_matches(self, field_name: str, values: List[Any]) -> Set[str]:
+        """Documents whose facet value equals any of the given values"""
+        matched = set()
+        for value in values:
+            matched |= self.facet_postings.get(field_name, {}).get(str(value).lower(), set())
+        return matched
+    
+    def facet_counts(self, field_names: List[str], doc_ids: Optional[Set[str]] = None) -> Dict[str, Counter]:
+        """Facet counts for a result set, or for the whole index when doc_ids is None"""
+        facets = {}
+        for field_name in field_names:
+            if field_name not in self.facet_postings:
+                continue
+            labels = self.facet_labels[field_name]
+            if doc_ids is None:
+                counts = Counter({labels[key]: len(members) for key, members in self.facet_postings[field_name].items()})
+            else:
+                counts = Counter()
+                for doc_id in doc_ids:
+                    for key in self.doc_facets.get(doc_id, {}).get(field_name, ()):
+                        counts[labels[key]] += 1
+            if counts:
+                facets[field_name] = counts
+        return facets
+
+class SuggestionIndex:
+    """Prefix autocomplete over the index vocabulary and search history.
+    
+    Entries are kept in a sorted list and looked up with bisect. The best
+    completions for very short prefixes, whose ranges span much of the
+    vocabulary, are cached and updated in place as weights grow.
+    """
+    
+    MIN_TERM_LENGTH = 3
+    CACHED_PREFIX_LENGTH = 2
+    HISTORY_WEIGHT = 5.0
+    SAVE_EVERY = 20
+    STOP_WORDS = frozenset([
+        'and', 'are', 'but', 'for', 'from', 'has', 'have', 'her', 'his', 'its',
+        'not', 'that', 'the', 'their', 'them', 'then', 'there', 'these', 'they',
+        'this', 'was', 'were', 'what', 'when', 'which', 'who', 'will', 'with', 'you', 'your'
+    ])
+    
+    def __init__(self, path: Optional[Path] = None, top_k: int = 10):
+        self.path = Path(path) if path else None
+        self.top_k = top_k
+        self.entries: List[str] = []
+        self.weights: Dict[str, float] = {}
+        self.query_counts: Counter = Counter()
+        self._prefix_cache: Dict[str, List[Tuple[float, str]]] = {}
+        self._pending_writes = 0
+        
+        if self.path and self.path.exists():
+            self.load()
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def add_terms(self, term_weights: Dict[str, float]):
+        """Add vocabulary terms or raise their weights"""
+        new_terms = []
+        changed = []
+        
+        for term, weight in term_weights.items():
+            term = term.lower()
+            if len(term) < self.MIN_TERM_LENGTH or term in self.STOP_WORDS or term.isdigit():
+                continue
+            if term not in self.weights:
+                new_terms.append(term)
+                self.weights[term] = 0.0
+            self.weights[term] += weight
+            changed.append(term)
+        
+        self._insert_entries(new_terms)
+        self._refresh_cache(changed)
+    
+    def remove_terms(self, term_weights: Dict[str, float]):
+        """Lower the weights of terms from replaced or deleted documents"""
+        dropped = []
+        lowered = set()
+        
+        for term, weight in term_weights.items():
+            term = term.lower()
+            if term not in self.weights:
+                continue
+            self.weights[term] -= weight
+            if self.weights[term] <= 1e-9:
+                del self.weights[term]
+                dropped.append(term)
+            lowered.add(term)
+        
+        for term in dropped:
+            position = bisect.bisect_left(self.entries, term)
+            if position < len(self.entries) and self.entries[position] == term:
+                del self.entries[position]
+        
+        # Lowered weights can let other entries into a cached top-k, so rescan those prefixes
+        for term in lowered:
+            for length in range(1, min(len(term), self.CACHED_PREFIX_LENGTH) + 1):
+                self._prefix_cache.pop(term[:length], None)
+    
+    def record_query(self, query_text: str):
+        """Count a submitted search so it ranks as a completion"""
+        phrase = ' '.join(query_text.lower().split())
+        if len(phrase) < self.MIN_TERM_LENGTH:
+            return
+        
+        self.query_counts[phrase] += 1
+        if phrase not in self.weights:
+            self.weights[phrase] = 0.0
+            self._insert_entries([phrase])
+        self.weights[phrase] += self.HISTORY_WEIGHT
+        self._refresh_cache([phrase])
+        
+        self._pending_writes += 1
+        if self._pending_writes >= self.SAVE_EVERY:
+            self.save()
+    
+    def _insert_entries(self, new_terms: List[str]):
+        """Keep the entry list sorted (re-sort for bulk loads, insort otherwise)"""
+        if len(new_terms) > max(len(self.entries) // 8, 32):
+            self.entries = sorted(self.entries + new_terms)
+            self._prefix_cache.clear()
+        else:
+            for term in new_terms:
+                bisect.insort(self.entries, term)
+    
+    def _refresh_cache(self, terms: List[str]):
+        """Fold raised weights into cached short-prefix top-k lists"""
+        if not self._prefix_cache:
+            return
+        for term in terms:
+            weight = self.weights[term]
+            for length in range(1, min(len(term), self.CACHED_PREFIX_LENGTH) + 1):
+                top = self._prefix_cache.get(term[:length])
+                if top is None:
+                    continue
+                if len(top) >= self.top_k and weight <= top[-1][0] and all(t != term for _, t in top):
+                    continue
+                top[:] = sorted([(w, t) for w, t in top if t != term] + [(weight, term)], reverse=True)[:self.top_k]
+    
+    def _complete(self, prefix: str, k: int) -> List[Tuple[float, str]]:
+        """Top-k (weight, entry) pairs starting with prefix"""
+        if not prefix:
+            return []
+        if len(prefix) <= self.CACHED_PREFIX_LENGTH and k <= self.top_k:
+            if prefix not in self._prefix_cache:
+                self._prefix_cache[prefix] = self._scan(prefix, self.top_k)
+            return self._prefix_cache[prefix][:k]
+        return self._scan(prefix, k)
+    
+    def _scan(self, prefix: str, k: int) -> List[Tuple[float, str]]:
+        lo = bisect.bisect_left(self.entries, prefix)
+        hi = bisect.bisect_left(self.entries, prefix + '\uffff', lo)
+        return heapq.nlargest(k, ((self.weights[term], term) for term in self.entries[lo:hi]))
+    
+    def suggest(self, text: str, k: int = 5) -> List[str]:
+        """Completions for what the user has typed so far"""
+        text = ' '.join(text.lower().split())
+        if not text:
+            return []
+        
+        candidates = self._complete(text, k)
+        head, _, last = text.rpartition(' ')
+        if head:
+            # Complete the last word, keeping the words already typed
+            candidates += [(weight, f"{head} {term}") for weight, term in self._complete(last, k) if ' ' not in term]
+        
+        suggestions = []
+        for _, entry in sorted(candidates, reverse=True):
+            if entry != text and entry not in suggestions:
+                suggestions.append(entry)
+            if len(suggestions) >= k:
+                break
+        return suggestions
+    
+    def popular_queries(self, k: int = 6) -> List[str]:
+        """Most frequently submitted searches"""
+        return [query for query, _ in self.query_counts.most_common(k)]
+    
+    def save(self):
+        """Persist weights and query counts next to the search index"""
+        self._pending_writes = 0
+        if not self.path:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps({
+                'weights': self.weights,
+                'query_counts': dict(self.query_counts)
+            }))
+            tmp_path.replace(self.path)
+        except OSError as e:
+            logger.warning(f"Could not save search suggestions: {e}")
+    
+    def load(self):
+        """Load persisted weights and query counts"""
+        try:
+            data = json.loads(self.path.read_text())
+            self.weights = {term: float(weight) for term, weight in data.get('weights', {}).items()}
+            self.query_counts = Counter(data.get('query_counts', {}))
+            self.entries = sorted(self.weights)
+            self._prefix_cache.clear()
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load search suggestions: {e}")
+
 class SearchEngine:
     """Search engine implementation"""
     
-    def __init__(self):
-        self.index = self._create_index()
+    INDEX_NAME = "documents"
+    
+    # Fields stored verbatim in the Whoosh schema; other metadata goes into the JSON 'metadata' field
+    SCHEMA_FIELDS = ('id', 'title', 'content', 'author', 'tags', 'category', 'doc_type', 'date')
+    FACET_FIELDS = ('doc_type', 'category', 'author')
+    
+    def __init__(self, workspace: str = "default", index_dir: Optional[str] = None):
+        self.workspace = re.sub(r'[^A-Za-z0-9_-]', '_', workspace) or "default"
+        self.index_dir = Path(index_dir) if index_dir else self._default_index_dir()
+        self._index = None
+        self._suggestions = None
         self.documents = {}
-        
+        self.index_stats = {
+            'last_batch_size': 0,
+            'last_commit_seconds': 0.0,
+            'total_commit_seconds': 0.0,
+            'commits': 0
+        }
+    
+    def _default_index_dir(self) -> Path:
+        """Per-workspace index directory (ephemeral /tmp on Render)"""
+        if os.environ.get('RENDER') == 'true':
+            base_path = Path("/tmp/search_index")
+        else:
+            base_path = Path("./data/search_index")
+        return base_path / self.workspace
+    
+    @property
+    def index(self):
+        """Search index, opened or created on first use"""
+        if self._index is None:
+            self._index = self._create_index()
+        return self._index
+    
+    @property
+    def suggestions(self) -> SuggestionIndex:
+        """Autocomplete index, persisted alongside the Whoosh index"""
+        if self._suggestions is None:
+            if WHOOSH_AVAILABLE:
+                self._suggestions = SuggestionIndex(self.index_dir / "suggestions.json")
+                if not len(self._suggestions) and self.index.doc_count():
+                    self._seed_suggestions()
+            else:
+                self._suggestions = SuggestionIndex()
+        return self._suggestions
+    
+    def _seed_suggestions(self):
+        """Build suggestions from the lexicon of an index created before they existed"""
+        term_weights = Counter()
+        with self.index.reader() as reader:
+            for field_name in ('title', 'content'):
+                for term in reader.field_terms(field_name):
+                    term_weights[term] += reader.doc_frequency(field_name, term)
+        self._suggestions.add_terms(term_weights)
+        self._suggestions.save()
+    
+    def suggest(self, text: str, k: int = 5) -> List[str]:
+        """Autocomplete suggestions for a partial query"""
+        return self.suggestions.suggest(text, k)
+    
     def _create_index(self):
-        """Create search index"""
+        """Open the file-backed index for this workspace, creating it if needed"""
         if WHOOSH_AVAILABLE:
-            # Create schema
+            # Exact-match facet fields are lowercased so filters are case-insensitive
+            keyword_analyzer = analysis.IDTokenizer() | analysis.LowercaseFilter()
             schema = fields.Schema(
-                id=fields.ID(stored=True),
+                id=fields.ID(stored=True, unique=True),
                 title=fields.TEXT(stored=True),
                 content=fields.TEXT(stored=True),
-                author=fields.TEXT(stored=True),
-                tags=fields.KEYWORD(stored=True, commas=True),
-                category=fields.TEXT(stored=True),
-                date=fields.DATETIME(stored=True),
-                metadata=fields.TEXT(stored=True)
+                author=fields.ID(stored=True, sortable=True, analyzer=keyword_analyzer),
+                tags=fields.KEYWORD(stored=True, commas=True, lowercase=True, scorable=True),
+                category=fields.ID(stored=True, sortable=True, analyzer=keyword_analyzer),
+                doc_type=fields.ID(stored=True, sortable=True, analyzer=keyword_analyzer),
+                date=fields.DATETIME(stored=True, sortable=True),
+                metadata=fields.STORED
             )
             
-            # Create in-memory index
-            storage = RamStorage()
-            return storage.create_index(schema)
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            if index.exists_in(str(self.index_dir), indexname=self.INDEX_NAME):
+                ix = index.open_dir(str(self.index_dir), indexname=self.INDEX_NAME)
+                logger.info(f"Opened search index at {self.index_dir} ({ix.doc_count()} documents)")
+                return ix
+            
+            logger.info(f"Created search index at {self.index_dir}")
+            return index.create_in(str(self.index_dir), schema, indexname=self.INDEX_NAME)
         else:
-            # Fallback to simple dict-based index
-            return {}
+            # Fallback to the in-process inverted index
+            return InvertedIndex()
     
     def add_document(self, doc_id: str, title: str, content: str, **metadata):
         """Add document to search index"""
-        self.documents[doc_id] = {
-            'id': doc_id,
-            'title': title,
-            'content': content,
-            **metadata
+        return self.add_documents([{'id': doc_id, 'title': title, 'content': content, **metadata}])
+    
+    def add_documents(self, documents: List[Dict[str, Any]], procs: int = 1,
+                      limitmb: int = 128) -> Dict[str, Any]:
+        """Add or replace many documents with a single writer and commit.
+        
+        Args:
+            documents: Dicts with 'id', 'title', 'content' and optional metadata
+            procs: Indexing processes for the Whoosh writer (>1 for multi-core bulk loads)
+            limitmb: Memory per indexing process before segments are flushed
+        
+        Returns:
+            Batch statistics including commit time and index size
+        """
+        # A repeated id replaces the earlier copy in the same batch
+        documents = list({str(doc['id']): doc for doc in documents}.values())
+        
+        # Document frequencies feed the autocomplete vocabulary; replaced documents give theirs back
+        previous = self._stored_documents([str(doc['id']) for doc in documents])
+        self.suggestions.remove_terms(Counter(
+            term for doc in previous.values() for term in self._suggestion_terms(doc)
+        ))
+        self.suggestions.add_terms(Counter(
+            term for doc in documents for term in self._suggestion_terms(doc)
+        ))
+        
+        if not WHOOSH_AVAILABLE:
+            for doc in documents:
+                self.documents[str(doc['id'])] = doc
+                self.index.add(doc)
+            return {'documents_added': len(documents)}
+        
+        start_time = time.perf_counter()
+        writer = self.index.writer(procs=procs, limitmb=limitmb, multisegment=procs > 1, timeout=5.0)
+        try:
+            for doc in documents:
+                writer.update_document(**self._to_index_fields(doc))
+        except Exception:
+            writer.cancel()
+            raise
+        
+        commit_start = time.perf_counter()
+        writer.commit()
+        commit_seconds = time.perf_counter() - commit_start
+        
+        self.index_stats['last_batch_size'] = len(documents)
+        self.index_stats['last_commit_seconds'] = commit_seconds
+        self.index_stats['total_commit_seconds'] += commit_seconds
+        self.index_stats['commits'] += 1
+        self.suggestions.save()
+        
+        stats = {
+            'documents_added': len(documents),
+            'indexing_seconds': commit_start - start_time,
+            'commit_seconds': commit_seconds,
+            'index_size_bytes': self._index_size_bytes()
         }
+        logger.info(
+            f"Indexed {len(documents)} documents in {stats['indexing_seconds']:.3f}s "
+            f"(commit {commit_seconds:.3f}s, index {stats['index_size_bytes'] / 1024:.1f} KB)"
+        )
+        return stats
+    
+    def delete_documents(self, doc_ids: List[str]) -> int:
+        """Remove documents from the index and their terms from suggestions"""
+        doc_ids = list(dict.fromkeys(str(doc_id) for doc_id in doc_ids))
+        previous = self._stored_documents(doc_ids)
+        if not previous:
+            return 0
         
-        if WHOOSH_AVAILABLE:
-            writer = self.index.writer()
-            writer.add_document(
-                id=doc_id,
-                title=title,
-                content=content,
-                **metadata
-            )
+        self.suggestions.remove_terms(Counter(
+            term for doc in previous.values() for term in self._suggestion_terms(doc)
+        ))
+        
+        if not WHOOSH_AVAILABLE:
+            for doc_id in previous:
+                self.documents.pop(doc_id, None)
+                self.index.remove(doc_id)
+        else:
+            writer = self.index.writer(timeout=5.0)
+            try:
+                for doc_id in previous:
+                    writer.delete_by_term('id', doc_id)
+            except Exception:
+                writer.cancel()
+                raise
             writer.commit()
+            self.suggestions.save()
+        
+        return len(previous)
+    
+    @staticmethod
+    def _suggestion_terms(doc: Dict[str, Any]) -> Set[str]:
+        """Distinct title and content terms a document contributes to suggestions"""
+        return set(
+            InvertedIndex.tokenize(doc.get('title', '') or '') +
+            InvertedIndex.tokenize(doc.get('content', '') or '')
+        )
+    
+    def _stored_documents(self, doc_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Currently indexed title/content of the given ids that exist"""
+        if not WHOOSH_AVAILABLE:
+            return {doc_id: self.documents[doc_id] for doc_id in doc_ids if doc_id in self.documents}
+        
+        if not self.index.doc_count():
+            return {}
+        stored = {}
+        with self.index.searcher() as searcher:
+            for doc_id in doc_ids:
+                fields_found = searcher.document(id=doc_id)
+                if fields_found is not None:
+                    stored[doc_id] = fields_found
+        return stored
+    
+    def _to_index_fields(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Map a document dict onto the index schema"""
+        index_fields = {
+            'id': str(doc['id']),
+            'title': doc.get('title', '') or '',
+            'content': doc.get('content', '') or ''
+        }
+        
+        for field_name in ('author', 'category', 'doc_type'):
+            if doc.get(field_name):
+                index_fields[field_name] = str(doc[field_name])
+        
+        tags = doc.get('tags')
+        if tags:
+            index_fields['tags'] = ','.join(tags) if isinstance(tags, (list, tuple, set)) else str(tags)
+        
+        date_value = doc.get('date')
+        if isinstance(date_value, str):
+            try:
+                date_value = datetime.fromisoformat(date_value)
+            except ValueError:
+                date_value = None
+        if isinstance(date_value, datetime):
+            index_fields['date'] = date_value
+        
+        extra = {k: v for k, v in doc.items() if k not in self.SCHEMA_FIELDS}
+        if extra:
+            index_fields['metadata'] = json.dumps(extra, default=str)
+        
+        return index_fields
+    
+    def _index_size_bytes(self) -> int:
+        """Total size of the on-disk index files"""
+        try:
+            return sum(f.stat().st_size for f in self.index_dir.iterdir() if f.is_file())
+        except OSError:
+            return 0
+    
+    def get_index_stats(self) -> Dict[str, Any]:
+        """Index size and commit timing"""
+        stats = dict(self.index_stats)
+        if WHOOSH_AVAILABLE:
+            stats['document_count'] = self.index.doc_count()
+            stats['index_size_bytes'] = self._index_size_bytes()
+            stats['index_dir'] = str(self.index_dir)
+        else:
+            stats['document_count'] = len(self.documents)
+        return stats
     
     def search(self, query: SearchQuery) -> Tuple[List[SearchResult], Dict[str, Any]]:
         """Execute search query"""
@@ -562,111 +1118,211 @@ class SearchEngine:
         """Search using Whoosh"""
         with self.index.searcher(weighting=scoring.BM25F) as searcher:
             # Build query
+            search_fields = [f.value for f in query.fields if f.value in self.index.schema.names()]
             parser = qparser.MultifieldParser(
-                [f.value for f in query.fields],
+                search_fields or ['title', 'content'],
                 self.index.schema
             )
-            whoosh_query = parser.parse(query.query_text)
+            if query.query_text.strip():
+                whoosh_query = parser.parse(query.query_text)
+            else:
+                whoosh_query = whoosh_query_lib.Every()
+            
+            # Apply filters inside the index
+            filter_query = self._build_filter_query(query.filters)
             
-            # Apply filters
-            filter_query = None
-            for filter_obj in query.filters:
-                # Build filter queries
-                pass
+            facet_fields = [f for f in (query.facets or self.FACET_FIELDS) if f in self.FACET_FIELDS]
             
             # Execute search
             results = searcher.search_page(
                 whoosh_query,
                 query.page,
                 pagelen=query.page_size,
-                filter=filter_query
+                filter=filter_query,
+                groupedby=facet_fields or None
             )
             
             # Convert to SearchResult objects
             search_results = []
             for hit in results:
+                metadata = {
+                    'author': hit.get('author'),
+                    'date': hit.get('date'),
+                    'category': hit.get('category'),
+                    'doc_type': hit.get('doc_type'),
+                    'tags': hit.get('tags', '').split(',') if hit.get('tags') else []
+                }
+                if hit.get('metadata'):
+                    metadata.update(json.loads(hit['metadata']))
+                
                 search_results.append(SearchResult(
                     id=hit['id'],
                     title=hit['title'],
                     content=hit['content'],
                     score=hit.score,
                     highlights={'content': [hit.highlights('content')]},
-                    metadata={
-                        'author': hit.get('author'),
-                        'date': hit.get('date'),
-                        'category': hit.get('category'),
-                        'tags': hit.get('tags', '').split(',')
-                    }
+                    metadata=metadata
                 ))
             
             # Get facets
-            facets = self._calculate_facets(results)
+            facets = self._calculate_facets(results.results, facet_fields)
             
             return search_results, facets
     
-    def _simple_search(self, query: SearchQuery) -> Tuple[List[SearchResult], Dict[str, Any]]:
-        """Simple search implementation"""
-        results = []
-        query_lower = query.query_text.lower()
-        
-        for doc_id, doc in self.documents.items():
-            # Simple text matching
-            score = 0
-            if query_lower in doc.get('title', '').lower():
-                score += 2
-            if query_lower in doc.get('content', '').lower():
-                score += 1
+    def _build_filter_query(self, filters: List[SearchFilter]):
+        """Translate SearchFilters into a Whoosh filter query"""
+        if not WHOOSH_AVAILABLE or not filters:
+            return None
+        
+        q = whoosh_query_lib
+        clauses = []
+        
+        for filter_obj in filters:
+            field_name = filter_obj.field
+            operator = filter_obj.operator
+            value = filter_obj.value
             
-            if score > 0:
-                results.append(SearchResult(
-                    id=doc_id,
-                    title=doc.get('title', ''),
-                    content=doc.get('content', ''),
-                    score=score,
-                    metadata={
-                        k: v for k, v in doc.items() 
-                        if k not in ['id', 'title', 'content']
-                    }
-                ))
+            if field_name == 'date':
+                if isinstance(value, (list, tuple)) and len(value) == 2:
+                    clauses.append(q.DateRange(
+                        'date',
+                        self._as_datetime(value[0]),
+                        self._as_datetime(value[1], end_of_day=True)
+                    ))
+                continue
+            
+            if field_name in ('author', 'category', 'doc_type', 'tags'):
+                values = value if isinstance(value, (list, tuple, set)) else [value]
+                terms = [str(v).lower() for v in values if str(v).strip()]
+                if not terms:
+                    continue
+                
+                if operator in ('equals', 'in'):
+                    clauses.append(q.Or([q.Term(field_name, term) for term in terms]))
+                elif operator == 'starts with':
+                    clauses.append(q.Or([q.Prefix(field_name, term) for term in terms]))
+                elif operator == 'ends with':
+                    clauses.append(q.Or([q.Wildcard(field_name, f"*{term}") for term in terms]))
+                else:
+                    clauses.append(q.Or([q.Wildcard(field_name, f"*{term}*") for term in terms]))
+            elif field_name in ('title', 'content') and str(value).strip():
+                parser = qparser.QueryParser(field_name, self.index.schema)
+                clauses.append(parser.parse(str(value)))
         
-        # Sort by score
-        results.sort(key=lambda x: x.score, reverse=True)
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else q.And(clauses)
+    
+    @staticmethod
+    def _as_datetime(value, end_of_day: bool = False) -> datetime:
+        """Widen plain dates from st.date_input to a datetime bound"""
+        if isinstance(value, datetime):
+            return value
+        return datetime.combine(value, datetime.max.time() if end_of_day else datetime.min.time())
+    
+    def _simple_search(self, query: SearchQuery) -> Tuple[List[SearchResult], Dict[str, Any]]:
+        """Inverted index search used when Whoosh is unavailable"""
+        inverted = self.index
+        search_fields = [f.value for f in query.fields if f.value in InvertedIndex.FIELD_WEIGHTS]
+        candidates = self._simple_filter_candidates(query.filters)
         
-        # Simple faceting
-        facets = self._calculate_simple_facets(results)
+        if query.query_text.strip():
+            scores = inverted.score(query.query_text, search_fields)
+            if candidates is not None:
+                scores = {doc_id: score for doc_id, score in scores.items() if doc_id in candidates}
+        else:
+            scores = dict.fromkeys(candidates if candidates is not None else self.documents, 0.0)
         
-        # Pagination
+        # Facets: index-wide counts are maintained on insert, so unfiltered browsing is free
+        facet_fields = query.facets or list(InvertedIndex.FACET_FIELDS)
+        if not query.query_text.strip() and candidates is None:
+            facets = inverted.facet_counts(facet_fields)
+        else:
+            facets = inverted.facet_counts(facet_fields, set(scores))
+        
+        # Heap-based top-k: only the requested page is ever ordered
         start = (query.page - 1) * query.page_size
-        end = start + query.page_size
+        top_hits = heapq.nlargest(start + query.page_size, scores.items(), key=lambda item: item[1])
+        
+        results = []
+        for doc_id, score in top_hits[start:]:
+            doc = self.documents[doc_id]
+            results.append(SearchResult(
+                id=doc_id,
+                title=doc.get('title', ''),
+                content=doc.get('content', ''),
+                score=score,
+                metadata={
+                    k: v for k, v in doc.items()
+                    if k not in ['id', 'title', 'content']
+                }
+            ))
+        
+        return results, facets
+    
+    def _simple_filter_candidates(self, filters: List[SearchFilter]) -> Optional[Set[str]]:
+        """Resolve filters to a document id set (None means unfiltered)"""
+        candidates = None
+        
+        for filter_obj in filters:
+            field_name, operator, value = filter_obj.field, filter_obj.operator, filter_obj.value
+            
+            if field_name in InvertedIndex.FACET_FIELDS and operator in ('equals', 'in'):
+                values = value if isinstance(value, (list, tuple, set)) else [value]
+                matched = self.index.facet_matches(field_name, values)
+            else:
+                pool = candidates if candidates is not None else self.documents.keys()
+                matched = {doc_id for doc_id in pool if self._simple_filter_matches(self.documents[doc_id], filter_obj)}
+            
+            candidates = matched if candidates is None else candidates & matched
         
-        return results[start:end], facets
+        return candidates
     
-    def _calculate_facets(self, results) -> Dict[str, Any]:
-        """Calculate facets from search results"""
-        facets = defaultdict(Counter)
+    def _simple_filter_matches(self, doc: Dict[str, Any], filter_obj: SearchFilter) -> bool:
+        """Evaluate a non-facet filter against a stored document"""
+        doc_value = doc.get(filter_obj.field)
+        if doc_value is None:
+            return False
         
-        for result in results:
-            if hasattr(result, 'fields'):
-                for field in ['category', 'author', 'doc_type']:
-                    if field in result.fields():
-                        facets[field][result[field]] += 1
+        if filter_obj.field == 'date':
+            if isinstance(doc_value, str):
+                try:
+                    doc_value = datetime.fromisoformat(doc_value)
+                except ValueError:
+                    return False
+            if not isinstance(filter_obj.value, (list, tuple)) or len(filter_obj.value) != 2:
+                return True
+            return (self._as_datetime(filter_obj.value[0]) <= self._as_datetime(doc_value)
+                    <= self._as_datetime(filter_obj.value[1], end_of_day=True))
         
-        return dict(facets)
+        values = doc_value if isinstance(doc_value, (list, tuple, set)) else [doc_value]
+        needle = str(filter_obj.value).lower()
+        for value in values:
+            value = str(value).lower()
+            if filter_obj.operator in ('equals', 'in') and value == needle:
+                return True
+            if filter_obj.operator == 'starts with' and value.startswith(needle):
+                return True
+            if filter_obj.operator == 'ends with' and value.endswith(needle):
+                return True
+            if filter_obj.operator == 'contains' and needle in value:
+                return True
+        return False
     
-    def _calculate_simple_facets(self, results: List[SearchResult]) -> Dict[str, Any]:
-        """Calculate facets for simple search"""
-        facets = defaultdict(Counter)
+    def _calculate_facets(self, results, facet_fields: List[str]) -> Dict[str, Any]:
+        """Facet counts over all matching documents (not just the current page)"""
+        facets = {}
         
-        for result in results:
-            metadata = result.metadata
-            if 'category' in metadata:
-                facets['category'][metadata['category']] += 1
-            if 'author' in metadata:
-                facets['author'][metadata['author']] += 1
-            if 'doc_type' in metadata:
-                facets['doc_type'][metadata['doc_type']] += 1
+        for field_name in facet_fields:
+            try:
+                groups = results.groups(field_name)
+            except KeyError:
+                continue
+            counts = Counter({key: len(doc_ids) for key, doc_ids in groups.items() if key})
+            if counts:
+                facets[field_name] = counts
         
-        return dict(facets)
+        return facets
 
 # Global search UI instance
 advanced_search = AdvancedSearchUI()
\ No newline at end of file
@@ -7,6 +7,7 @@ Provides conversational AI capabilities for document analysis and Q&A.
 
 Features:
 - Document-grounded chat responses
+- Retrieval of relevant document chunks under a token budget
 - Interactive Q&A with context
 - Chat history management
 - AI response confidence scoring
@@ -33,6 +34,12 @@ try:
 except ImportError:
     OPENAI_AVAILABLE = False
 
+try:
+    from modules.semantic_index import get_semantic_index_manager, count_tokens
+    SEMANTIC_INDEX_AVAILABLE = True
+except ImportError:
+    SEMANTIC_INDEX_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -78,6 +85,11 @@ class AIChatInterface:
                     logger.error(f"Failed to initialize OpenAI client: {e}")
                     self.openai_available = False
         
+        # Retrieval settings for document-grounded prompts
+        self.context_token_budget = 1500
+        self.page_context_tokens = 400
+        self.retrieval_top_k = 8
+        
         # Chat state management
         self.current_session = None
         self.chat_history = []
@@ -122,7 +134,7 @@ class AIChatInterface:
         return session_id
     
     def send_message(self, user_message: str, document_context: str = "", 
-                    current_page: int = None) -> ChatMessage:
+                    current_page: int = None, document_hash: str = None) -> ChatMessage:
         """Send a message and get AI response"""
         
         if not self.current_session:
@@ -141,7 +153,7 @@ class AIChatInterface:
         self.current_session.messages.append(user_msg)
         
         # Generate AI response
-        ai_response = self._generate_ai_response(user_message, document_context, current_page)
+        ai_response = self._generate_ai_response(user_message, document_context, current_page, document_hash)
         
         self.current_session.messages.append(ai_response)
         self.current_session.last_activity = datetime.now().isoformat()
@@ -150,26 +162,84 @@ class AIChatInterface:
         return ai_response
     
     def _generate_ai_response(self, user_message: str, document_context: str = "", 
-                             current_page: int = None) -> ChatMessage:
+                             current_page: int = None, document_hash: str = None) -> ChatMessage:
         """Generate AI response to user message"""
         
         if self.openai_available and self.client:
-            return self._generate_openai_response(user_message, document_context, current_page)
+            return self._generate_openai_response(user_message, document_context, current_page, document_hash)
         else:
             return self._generate_demo_response(user_message, document_context, current_page)
     
+    def _retrieve_context(self, user_message: str, document_context: str = "",
+                          current_page: int = None, document_hash: str = None) -> Tuple[str, Dict[str, Any]]:
+        """Assemble prompt context from the current page and the most relevant document chunks"""
+        stats = {'retrieval_ms': 0.0, 'context_tokens': 0, 'retrieved_chunks': 0,
+                 'source_pages': [], 'document_tokens': 0}
+        
+        if not SEMANTIC_INDEX_AVAILABLE:
+            return document_context[:2000], stats
+        
+        index_manager = get_semantic_index_manager()
+        doc_index = index_manager.get(document_hash) if document_hash and index_manager.available else None
+        
+        sections = []
+        used_tokens = 0
+        
+        if document_context:
+            # Without an index the page is the only context, so it may use the whole budget
+            page_budget = self.page_context_tokens if doc_index is not None else self.context_token_budget
+            page_text = self._truncate_to_tokens(document_context, page_budget)
+            used_tokens = count_tokens(page_text)
+            sections.append(f"[Current page {current_page or 'unknown'}]\n{page_text}")
+        
+        if doc_index is not None:
+            start_time = time.perf_counter()
+            stats['document_tokens'] = sum(chunk.token_count for chunk in doc_index.chunks)
+            for chunk, score in index_manager.search(document_hash, user_message, self.retrieval_top_k):
+                if chunk.page_number == current_page and document_context:
+                    continue
+                if used_tokens + chunk.token_count > self.context_token_budget:
+                    continue
+                sections.append(f"[Page {chunk.page_number}]\n{chunk.text}")
+                used_tokens += chunk.token_count
+                stats['retrieved_chunks'] += 1
+                stats['source_pages'].append(chunk.page_number)
+            stats['retrieval_ms'] = (time.perf_counter() - start_time) * 1000
+        
+        stats['context_tokens'] = used_tokens
+        return "\n\n".join(sections), stats
+    
+    @staticmethod
+    def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+        """Trim text to roughly max_tokens, cutting at a word boundary"""
+        tokens = count_tokens(text)
+        if tokens <= max_tokens:
+            return text
+        cut = int(len(text) * max_tokens / tokens)
+        return text[:cut].rsplit(' ', 1)[0]
+    
     def _generate_openai_response(self, user_message: str, document_context: str = "", 
-                                 current_page: int = None) -> ChatMessage:
+                                 current_page: int = None, document_hash: str = None) -> ChatMessage:
         """Generate response using OpenAI"""
         try:
             # Prepare conversation history
             messages = []
             
+            prompt_context, retrieval = self._retrieve_context(
+                user_message, document_context, current_page, document_hash
+            )
+            if retrieval['document_tokens']:
+                logger.info(
+                    f"Chat retrieval: {retrieval['retrieved_chunks']} chunks in {retrieval['retrieval_ms']:.1f}ms, "
+                    f"{retrieval['context_tokens']} context tokens "
+                    f"({retrieval['document_tokens'] - retrieval['context_tokens']} saved vs full document)"
+                )
+            
             # Add system context
             system_prompt = f"""You are an AI document assistant. You are helping a user understand and analyze their document.
 
-Document context (current page {current_page or 'unknown'}):
-{document_context[:2000] if document_context else 'No specific context provided'}
+Document context (current page {current_page or 'unknown'}, plus the most relevant passages):
+{prompt_context if prompt_context else 'No specific context provided'}
 
 Guidelines:
 - Provide helpful, accurate responses based on the document content
@@ -212,7 +282,8 @@ Guidelines:
                 metadata={
                     'type': 'openai_response',
                     'model': 'gpt-3.5-turbo',
-                    'tokens_used': response.usage.total_tokens if hasattr(response, 'usage') else 0
+                    'tokens_used': response.usage.total_tokens if hasattr(response, 'usage') else 0,
+                    'retrieval': retrieval
                 }
             )
             
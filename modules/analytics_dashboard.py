@@ -11,6 +11,7 @@ Features:
 - Processing quality metrics
 - System health monitoring
 - Interactive visualizations
+- Incremental hourly/daily rollups for constant-time rendering
 """
 
 import time
@@ -104,6 +105,114 @@ class SessionAnalytics:
     performance_metrics: List[PerformanceMetric]
     processing_events: List[ProcessingEvent]
 
+@dataclass
+class RollupBucket:
+    """Running aggregate for one time bucket (or all-time total) of a metric"""
+    count: int = 0
+    total: float = 0.0
+    minimum: float = float('inf')
+    maximum: float = float('-inf')
+    successes: int = 0
+    
+    def add(self, value: float, success: bool = True):
+        """Fold a single observation into the aggregate"""
+        self.count += 1
+        self.total += value
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        if success:
+            self.successes += 1
+    
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+    
+    @property
+    def success_rate(self) -> float:
+        return self.successes / self.count if self.count else 0.0
+
+class AnalyticsRollups:
+    """Hourly and daily rollups keyed by (metric, dimension), updated as events arrive.
+    
+    Readers only touch the bounded set of retained buckets, so rendering cost does
+    not depend on how many raw events were recorded.
+    """
+    
+    BUCKET_SECONDS = {'hour': 3600, 'day': 86400}
+    
+    def __init__(self, hourly_retention_hours: int = 48, daily_retention_days: int = 90):
+        self.retention_seconds = {
+            'hour': hourly_retention_hours * 3600,
+            'day': daily_retention_days * 86400
+        }
+        # granularity -> (metric, dimension) -> {bucket_start: RollupBucket}
+        self.buckets: Dict[str, Dict[tuple, Dict[int, RollupBucket]]] = {
+            granularity: defaultdict(dict) for granularity in self.BUCKET_SECONDS
+        }
+        self.totals: Dict[tuple, RollupBucket] = {}
+    
+    def add(self, metric: str, dimension: str, value: float = 1.0,
+            success: bool = True, timestamp: Optional[float] = None):
+        """Record one observation in every granularity and in the all-time totals"""
+        timestamp = timestamp if timestamp is not None else time.time()
+        key = (metric, str(dimension))
+        
+        for granularity, seconds in self.BUCKET_SECONDS.items():
+            series = self.buckets[granularity][key]
+            bucket_start = int(timestamp // seconds) * seconds
+            if bucket_start not in series:
+                series[bucket_start] = RollupBucket()
+                self._expire(series, granularity)
+            # A late observation may land in a bucket that is already out of the window
+            if bucket_start in series:
+                series[bucket_start].add(value, success)
+        
+        self.totals.setdefault(key, RollupBucket()).add(value, success)
+    
+    def _expire(self, series: Dict[int, RollupBucket], granularity: str):
+        """Drop buckets older than the retention window behind the newest bucket.
+        
+        Only runs when a bucket opens; observations may arrive in any timestamp order.
+        """
+        cutoff = max(series) - self.retention_seconds[granularity]
+        for bucket_start in [b for b in series if b < cutoff]:
+            del series[bucket_start]
+    
+    def replay(self, analytics_data: Dict[str, Any]):
+        """Fold stored processing events and performance metrics back into the rollups"""
+        for event in analytics_data.get('processing_events', []):
+            if isinstance(event, dict) and 'processing_mode' in event:
+                self.add('processing', event['processing_mode'], event.get('duration', 0.0),
+                         event.get('success', True), timestamp=event.get('timestamp'))
+        for metric in analytics_data.get('performance_metrics', []):
+            if isinstance(metric, dict) and 'metric_type' in metric:
+                self.add('performance', metric['metric_type'], metric.get('value', 0.0),
+                         timestamp=metric.get('timestamp'))
+    
+    def dimensions(self, metric: str) -> List[str]:
+        """Dimensions recorded for a metric"""
+        return [dimension for (name, dimension) in self.totals if name == metric]
+    
+    def total(self, metric: str, dimension: str) -> RollupBucket:
+        """All-time aggregate for a (metric, dimension) pair"""
+        return self.totals.get((metric, str(dimension)), RollupBucket())
+    
+    def metric_total(self, metric: str) -> RollupBucket:
+        """All-time aggregate for a metric across its dimensions"""
+        combined = RollupBucket()
+        for (name, _), bucket in self.totals.items():
+            if name == metric and bucket.count:
+                combined.count += bucket.count
+                combined.total += bucket.total
+                combined.successes += bucket.successes
+                combined.minimum = min(combined.minimum, bucket.minimum)
+                combined.maximum = max(combined.maximum, bucket.maximum)
+        return combined
+    
+    def series(self, metric: str, dimension: str, granularity: str = 'hour') -> List[tuple]:
+        """Retained (bucket_start, RollupBucket) pairs, oldest first"""
+        return sorted(self.buckets[granularity].get((metric, str(dimension)), {}).items())
+
 class AnalyticsDashboard:
     """Real-time analytics dashboard for document processing"""
     
@@ -125,12 +234,32 @@ class AnalyticsDashboard:
             else:
                 # Validate existing analytics data structure
                 self._validate_analytics_data()
+            
+            if 'analytics_rollups' not in st.session_state:
+                st.session_state.analytics_rollups = self._restore_rollups()
                 
         except Exception as e:
             logger.error(f"Error initializing AnalyticsDashboard: {e}")
             # Initialize with minimal fallback data
             st.session_state.analytics_session_id = f"fallback_{uuid.uuid4().hex}"
             st.session_state.analytics_data = self._initialize_analytics_data()
+            st.session_state.analytics_rollups = AnalyticsRollups()
+    
+    @property
+    def rollups(self) -> AnalyticsRollups:
+        """Session rollups, recreated if the session state was reset"""
+        if 'analytics_rollups' not in st.session_state:
+            st.session_state.analytics_rollups = self._restore_rollups()
+        return st.session_state.analytics_rollups
+    
+    def _restore_rollups(self) -> AnalyticsRollups:
+        """Rollups seeded from analytics data restored into the session, if any"""
+        rollups = AnalyticsRollups()
+        try:
+            rollups.replay(st.session_state.get('analytics_data') or {})
+        except Exception as e:
+            logger.warning(f"Could not seed analytics rollups from session data: {e}")
+        return rollups
     
     def _initialize_analytics_data(self) -> Dict[str, Any]:
         """Initialize analytics data structure with proper types"""
@@ -194,6 +323,7 @@ class AnalyticsDashboard:
             
             # Use deque for automatic size management
             st.session_state.analytics_data['performance_metrics'].append(asdict(metric))
+            self.rollups.add('performance', metric_type, metric.value, timestamp=metric.timestamp)
             
         except Exception as e:
             logger.error(f"Error recording performance metric: {e}")
@@ -221,6 +351,7 @@ class AnalyticsDashboard:
         if 'processing_events' not in st.session_state.analytics_data:
             st.session_state.analytics_data['processing_events'] = []
         st.session_state.analytics_data['processing_events'].append(asdict(event))
+        self.rollups.add('processing', processing_mode, duration, success, timestamp=event.timestamp)
         
         # Performance tracking
         self.record_performance_metric('processing_duration', duration, {
@@ -276,22 +407,20 @@ class AnalyticsDashboard:
         # Real-time metrics
         col1, col2, col3, col4 = st.columns(4)
         
+        processing_totals = self.rollups.metric_total('processing')
+        
         with col1:
-            processing_events = st.session_state.analytics_data['processing_events']
-            total_events = len(processing_events)
-            st.metric("Total Operations", total_events)
+            st.metric("Total Operations", processing_totals.count)
         
         with col2:
-            if processing_events:
-                success_rate = sum(1 for e in processing_events if e['success']) / len(processing_events)
-                st.metric("Success Rate", f"{success_rate:.1%}")
+            if processing_totals.count:
+                st.metric("Success Rate", f"{processing_totals.success_rate:.1%}")
             else:
                 st.metric("Success Rate", "N/A")
         
         with col3:
-            if processing_events:
-                avg_duration = sum(e['duration'] for e in processing_events) / len(processing_events)
-                st.metric("Avg Duration", f"{avg_duration:.2f}s")
+            if processing_totals.count:
+                st.metric("Avg Duration", f"{processing_totals.mean:.2f}s")
             else:
                 st.metric("Avg Duration", "N/A")
         
@@ -439,77 +568,72 @@ class AnalyticsDashboard:
                             st.metric("Avg Confidence", f"{avg_confidence:.1%}")
     
     def _render_performance_trends(self):
-        """Render performance trend analytics"""
+        """Render performance trend analytics from the hourly rollups"""
         with st.expander("⚡ Performance Trends", expanded=False):
-            performance_metrics = st.session_state.analytics_data['performance_metrics']
+            rollups = self.rollups
+            metric_types = rollups.dimensions('performance')
             
-            if not performance_metrics:
+            if not metric_types:
                 st.info("No performance metrics recorded yet")
                 return
             
             if PANDAS_AVAILABLE and PLOTLY_AVAILABLE:
-                df = pd.DataFrame(performance_metrics)
-                df['datetime'] = pd.to_datetime(df['timestamp'], unit='s')
-                
-                # Performance over time
-                metric_types = df['metric_type'].unique()
+                selected_metrics = st.multiselect(
+                    "Select metrics to display",
+                    metric_types,
+                    default=metric_types[:3]
+                )
                 
-                if len(metric_types) > 0:
-                    selected_metrics = st.multiselect(
-                        "Select metrics to display",
-                        metric_types,
-                        default=metric_types[:3] if len(metric_types) > 3 else metric_types
+                if selected_metrics:
+                    # One point per retained hourly bucket instead of one per raw sample
+                    df = pd.DataFrame([
+                        {'bucket_start': bucket_start, 'metric_type': metric_type, 'value': bucket.mean}
+                        for metric_type in selected_metrics
+                        for bucket_start, bucket in rollups.series('performance', metric_type)
+                    ])
+                    df['datetime'] = pd.to_datetime(df['bucket_start'], unit='s')
+                    
+                    fig = px.line(
+                        df,
+                        x='datetime',
+                        y='value',
+                        color='metric_type',
+                        markers=True,
+                        title="Performance Metrics Over Time (hourly mean)"
                     )
+                    st.plotly_chart(fig, use_container_width=True)
                     
-                    if selected_metrics:
-                        filtered_df = df[df['metric_type'].isin(selected_metrics)]
-                        
-                        fig = px.line(
-                            filtered_df,
-                            x='datetime',
-                            y='value',
-                            color='metric_type',
-                            title="Performance Metrics Over Time"
-                        )
-                        st.plotly_chart(fig, use_container_width=True)
-                        
-                        # Performance statistics
-                        st.markdown("**Performance Statistics:**")
+                    # Performance statistics
+                    st.markdown("**Performance Statistics:**")
+                    
+                    for metric_type in selected_metrics:
+                        totals = rollups.total('performance', metric_type)
                         
-                        for metric_type in selected_metrics:
-                            metric_data = df[df['metric_type'] == metric_type]['value']
-                            
-                            col1, col2, col3, col4 = st.columns(4)
-                            with col1:
-                                st.metric(f"{metric_type} - Mean", f"{metric_data.mean():.3f}")
-                            with col2:
-                                st.metric(f"{metric_type} - Median", f"{metric_data.median():.3f}")
-                            with col3:
-                                st.metric(f"{metric_type} - Min", f"{metric_data.min():.3f}")
-                            with col4:
-                                st.metric(f"{metric_type} - Max", f"{metric_data.max():.3f}")
+                        col1, col2, col3, col4 = st.columns(4)
+                        with col1:
+                            st.metric(f"{metric_type} - Mean", f"{totals.mean:.3f}")
+                        with col2:
+                            st.metric(f"{metric_type} - Count", totals.count)
+                        with col3:
+                            st.metric(f"{metric_type} - Min", f"{totals.minimum:.3f}")
+                        with col4:
+                            st.metric(f"{metric_type} - Max", f"{totals.maximum:.3f}")
             
             else:
                 # Fallback without visualizations
-                metric_summary = {}
-                for metric in performance_metrics:
-                    metric_type = metric['metric_type']
-                    if metric_type not in metric_summary:
-                        metric_summary[metric_type] = []
-                    metric_summary[metric_type].append(metric['value'])
-                
-                for metric_type, values in metric_summary.items():
+                for metric_type in metric_types:
+                    totals = rollups.total('performance', metric_type)
                     st.markdown(f"**{metric_type}:**")
                     col1, col2, col3, col4 = st.columns(4)
                     
                     with col1:
-                        st.metric("Count", len(values))
+                        st.metric("Count", totals.count)
                     with col2:
-                        st.metric("Average", f"{sum(values)/len(values):.3f}")
+                        st.metric("Average", f"{totals.mean:.3f}")
                     with col3:
-                        st.metric("Min", f"{min(values):.3f}")
+                        st.metric("Min", f"{totals.minimum:.3f}")
                     with col4:
-                        st.metric("Max", f"{max(values):.3f}")
+                        st.metric("Max", f"{totals.maximum:.3f}")
     
     def _render_quality_metrics(self):
         """Render quality and accuracy metrics"""
@@ -15,6 +15,7 @@ try:
     from .enhanced_universal_extractor import EnhancedUniversalExtractor
     from .spacy_content_chunker import SpaCyContentChunker
     from .performance_optimizer import performance_optimizer
+    from .universal_document_reader import iter_pages
 except ImportError:
     # Fallback for direct execution
     import sys
@@ -22,6 +23,7 @@ except ImportError:
     from modules.enhanced_universal_extractor import EnhancedUniversalExtractor
     from modules.spacy_content_chunker import SpaCyContentChunker
     from modules.performance_optimizer import performance_optimizer
+    from modules.universal_document_reader import iter_pages
 
 @dataclass
 class PreviewChunk:
@@ -42,6 +44,9 @@ class AutoPreviewSystem:
     Provides instant preview of how content will be chunked.
     """
     
+    # Characters of source text read per requested preview chunk
+    PREVIEW_CHARS_PER_CHUNK = 3000
+    
     def __init__(self):
         """Initialize the auto preview system"""
         self.extractor = EnhancedUniversalExtractor()
@@ -70,12 +75,14 @@ class AutoPreviewSystem:
             
             # Save uploaded file temporarily
             with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as tmp_file:
-                tmp_file.write(uploaded_file.getvalue())
+                # Write from a view of the upload buffer rather than a getvalue() copy
+                with uploaded_file.getbuffer() as upload_view:
+                    tmp_file.write(upload_view)
                 tmp_file_path = tmp_file.name
             
             try:
-                # Extract content
-                extracted_content = self.extractor.extract_text(tmp_file_path)
+                # Extract only as many pages as the preview needs
+                extracted_content = self._read_preview_text(tmp_file_path, max_chunks)
                 
                 if not extracted_content or len(extracted_content.strip()) < 50:
                     return [PreviewChunk(
@@ -136,6 +143,19 @@ class AutoPreviewSystem:
                 confidence=0.0
             )]
     
+    def _read_preview_text(self, file_path: str, max_chunks: int) -> str:
+        """Leading text of a document, pulled page by page until the preview budget is met"""
+        budget = max_chunks * self.PREVIEW_CHARS_PER_CHUNK
+        texts = []
+        length = 0
+        for page in iter_pages(file_path, os.path.splitext(file_path)[1]):
+            if page.text_content:
+                texts.append(page.text_content)
+                length += len(page.text_content)
+            if length >= budget:
+                break
+        return "\n".join(texts)
+    
     def render_preview_interface(self, uploaded_file) -> Tuple[List[PreviewChunk], List[int]]:
         """
         Render the preview interface in Streamlit
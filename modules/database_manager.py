@@ -10,7 +10,7 @@ Features:
 - Document storage and history
 - Processing results archiving
 - User preferences and settings
-- Analytics and usage tracking
+- Analytics and usage tracking with hourly/daily rollups
 - Bookmarks and annotations
 """
 
@@ -19,8 +19,9 @@ import json
 import uuid
 import hashlib
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Union
 from pathlib import Path
 from dataclasses import dataclass
 import os
@@ -29,6 +30,9 @@ import os
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Formats whose content is kept in the documents table as text
+TEXT_DOCUMENT_FORMATS = ('txt', 'md', 'html')
+
 @dataclass
 class DatabaseSession:
     """Database session information"""
@@ -66,6 +70,23 @@ class ProcessingResult:
 class DatabaseManager:
     """SQLite database manager for persistent storage"""
     
+    # Rollup granularities and the strftime format used for their bucket keys
+    ROLLUP_GRANULARITIES = (
+        ('hour', '%Y-%m-%d %H:00:00'),
+        ('day', '%Y-%m-%d'),
+    )
+    
+    # Retention windows applied by compact_analytics()
+    RAW_EVENT_RETENTION_DAYS = 90
+    HOURLY_ROLLUP_RETENTION_DAYS = 14
+    
+    # Cache keys on processing results are released after this long
+    PROCESSING_CACHE_RETENTION_DAYS = 30
+    
+    # compact_analytics() runs at startup, then daily from record_analytics_event()
+    COMPACTION_INTERVAL_SECONDS = 86400
+    _last_compaction = 0.0
+    
     def __init__(self, db_path: str = None):
         """Initialize database manager with path validation"""
         # Use environment-appropriate database path
@@ -134,6 +155,8 @@ class DatabaseManager:
             # Initialize database with error handling
             self._initialize_database()
             self._create_indexes()
+            self._backfill_analytics_rollups()
+            self.compact_analytics_if_due()
             
             logger.info(f"Database initialized at {self.db_path}")
             
@@ -191,11 +214,17 @@ class DatabaseManager:
                         result_data TEXT NOT NULL,
                         confidence REAL NOT NULL,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        cache_key TEXT,
                         FOREIGN KEY (document_id) REFERENCES documents (document_id),
                         FOREIGN KEY (session_id) REFERENCES sessions (session_id)
                     )
                 """)
                 
+                # Databases created before result caching lack the cache key column
+                columns = {row[1] for row in cursor.execute("PRAGMA table_info(processing_results)")}
+                if 'cache_key' not in columns:
+                    cursor.execute("ALTER TABLE processing_results ADD COLUMN cache_key TEXT")
+                
                 # Bookmarks table
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS bookmarks (
@@ -249,6 +278,18 @@ class DatabaseManager:
                     )
                 """)
                 
+                # Pre-aggregated analytics counters, maintained on ingest
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS analytics_rollups (
+                        granularity TEXT NOT NULL,
+                        bucket_start TEXT NOT NULL,
+                        metric TEXT NOT NULL,
+                        dimension TEXT NOT NULL DEFAULT '',
+                        count INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (granularity, bucket_start, metric, dimension)
+                    )
+                """)
+                
                 conn.commit()
         except sqlite3.Error as e:
             logger.error(f"Database table initialization failed: {e}")
@@ -268,9 +309,11 @@ class DatabaseManager:
                     "CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents (file_hash)",
                     "CREATE INDEX IF NOT EXISTS idx_processing_document ON processing_results (document_id)",
                     "CREATE INDEX IF NOT EXISTS idx_processing_session ON processing_results (session_id)",
+                    "CREATE INDEX IF NOT EXISTS idx_processing_cache_key ON processing_results (cache_key)",
                     "CREATE INDEX IF NOT EXISTS idx_bookmarks_document ON bookmarks (document_id)",
                     "CREATE INDEX IF NOT EXISTS idx_analytics_session ON analytics_events (session_id)",
                     "CREATE INDEX IF NOT EXISTS idx_analytics_type ON analytics_events (event_type)",
+                    "CREATE INDEX IF NOT EXISTS idx_analytics_timestamp ON analytics_events (timestamp)",
                     "CREATE INDEX IF NOT EXISTS idx_search_session ON search_history (session_id)"
                 ]
                 
@@ -297,6 +340,7 @@ class DatabaseManager:
                     INSERT INTO sessions (session_id, user_id, session_data)
                     VALUES (?, ?, ?)
                 """, (session_id, user_id, json.dumps({})))
+                self._increment_rollups(cursor, 'session')
                 conn.commit()
             
             logger.info(f"Created session {session_id} for user {user_id}")
@@ -379,14 +423,26 @@ class DatabaseManager:
             raise RuntimeError(f"Failed to close session {session_id}: {e}")
     
     # Document Management
-    def store_document(self, session_id: str, filename: str, content: bytes, 
-                      format_type: str, metadata: Dict[str, Any] = None) -> str:
-        """Store a document and return document ID"""
+    def store_document(self, session_id: str, filename: str, content: Union[bytes, memoryview], 
+                      format_type: str, metadata: Dict[str, Any] = None,
+                      file_hash: Optional[str] = None, storage_path: Optional[str] = None) -> str:
+        """
+        Store a document and return document ID.
+        
+        Pass file_hash when the content was already hashed while streaming it to
+        disk. With storage_path, binary formats are read back from that file
+        instead of keeping a decoded copy in the database.
+        """
         # Generate document hash
-        file_hash = hashlib.sha256(content).hexdigest()
+        file_hash = file_hash or hashlib.sha256(content).hexdigest()
         document_id = str(uuid.uuid4())
         file_size = len(content)
         
+        metadata = dict(metadata or {})
+        if storage_path:
+            metadata['storage_path'] = storage_path
+        store_text = not storage_path or format_type.lower() in TEXT_DOCUMENT_FORMATS
+        
         # Check if document already exists
         existing_doc = self.get_document_by_hash(file_hash)
         if existing_doc:
@@ -403,9 +459,10 @@ class DatabaseManager:
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
                     document_id, session_id, filename, file_hash, file_size,
-                    format_type, content.decode('utf-8', errors='ignore'),
-                    json.dumps(metadata or {})
+                    format_type, str(content, 'utf-8', errors='ignore') if store_text else None,
+                    json.dumps(metadata)
                 ))
+                self._increment_rollups(cursor, 'document', format_type)
                 conn.commit()
             
             logger.info(f"Stored document {document_id}: {filename}")
@@ -487,6 +544,19 @@ class DatabaseManager:
             logger.error(f"Failed to get document content for {document_id}: {e}")
             raise RuntimeError(f"Failed to get document content for {document_id}: {e}")
     
+    def get_document_storage_path(self, document_id: str) -> Optional[str]:
+        """Path of the stored upload for a document, if it still exists"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT metadata FROM documents WHERE document_id = ?", (document_id,))
+                row = cursor.fetchone()
+            storage_path = json.loads(row[0] or '{}').get('storage_path') if row else None
+            return storage_path if storage_path and os.path.exists(storage_path) else None
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            logger.error(f"Failed to get storage path for {document_id}: {e}")
+            return None
+    
     def get_session_documents(self, session_id: str) -> List[DocumentRecord]:
         """Get all documents for a session"""
         documents = []
@@ -537,8 +607,9 @@ class DatabaseManager:
     # Processing Results Management
     def store_processing_result(self, document_id: str, session_id: str,
                                processing_mode: str, page_number: int,
-                               result_data: Dict[str, Any], confidence: float) -> str:
-        """Store processing result"""
+                               result_data: Dict[str, Any], confidence: float,
+                               cache_key: str = None) -> str:
+        """Store processing result, optionally reusable through its cache key"""
         result_id = str(uuid.uuid4())
         
         try:
@@ -547,12 +618,13 @@ class DatabaseManager:
                 cursor.execute("""
                     INSERT INTO processing_results 
                     (result_id, document_id, session_id, processing_mode, 
-                     page_number, result_data, confidence)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                     page_number, result_data, confidence, cache_key)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
                     result_id, document_id, session_id, processing_mode,
-                    page_number, json.dumps(result_data), confidence
+                    page_number, json.dumps(result_data), confidence, cache_key
                 ))
+                self._increment_rollups(cursor, 'processing', processing_mode)
                 conn.commit()
             
             return result_id
@@ -599,6 +671,86 @@ class DatabaseManager:
             logger.error(f"Failed to get processing results for {document_id}: {e}")
             raise RuntimeError(f"Failed to get processing results for {document_id}: {e}")
     
+    def get_cached_processing_results(self, cache_key: str) -> List[ProcessingResult]:
+        """Results stored under a cache key, in the order they were stored"""
+        results = []
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                # Only the most recent run, in case two sessions computed the same key
+                cursor.execute("""
+                    SELECT result_id, document_id, session_id, processing_mode,
+                           page_number, result_data, confidence, created_at
+                    FROM processing_results
+                    WHERE cache_key = ? AND (document_id, session_id) = (
+                        SELECT document_id, session_id FROM processing_results
+                        WHERE cache_key = ? ORDER BY rowid DESC LIMIT 1
+                    )
+                    ORDER BY rowid
+                """, (cache_key, cache_key))
+                
+                for row in cursor.fetchall():
+                    results.append(ProcessingResult(
+                        result_id=row[0],
+                        document_id=row[1],
+                        session_id=row[2],
+                        processing_mode=row[3],
+                        page_number=row[4],
+                        result_data=json.loads(row[5]),
+                        confidence=row[6],
+                        created_at=datetime.fromisoformat(row[7])
+                    ))
+            
+            return results
+        except sqlite3.Error as e:
+            logger.error(f"Failed to get cached processing results for {cache_key}: {e}")
+            raise RuntimeError(f"Failed to get cached processing results for {cache_key}: {e}")
+    
+    def invalidate_processing_cache(self, processing_mode: str = None) -> int:
+        """Stop reusing stored results (for one mode, or all); the results stay in history"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                query = "UPDATE processing_results SET cache_key = NULL WHERE cache_key IS NOT NULL"
+                params = []
+                if processing_mode is not None:
+                    query += " AND processing_mode = ?"
+                    params.append(processing_mode)
+                cursor.execute(query, params)
+                conn.commit()
+                return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error(f"Failed to invalidate processing cache: {e}")
+            raise RuntimeError(f"Failed to invalidate processing cache: {e}")
+    
+    def purge_processing_cache(self, max_age_days: int = None) -> int:
+        """Release cache keys that can no longer be hit usefully; the results stay in history.
+        
+        Keys of runs superseded by a newer run of the same key are released, and so
+        are keys older than the retention window (keys from old mode or model
+        versions are never looked up again, so they only age out).
+        """
+        max_age_days = max_age_days or self.PROCESSING_CACHE_RETENTION_DAYS
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE processing_results SET cache_key = NULL
+                    WHERE cache_key IS NOT NULL AND (
+                        created_at < datetime('now', ?)
+                        OR (document_id, session_id) != (
+                            SELECT latest.document_id, latest.session_id FROM processing_results latest
+                            WHERE latest.cache_key = processing_results.cache_key
+                            ORDER BY latest.rowid DESC LIMIT 1
+                        )
+                    )
+                """, (f'-{int(max_age_days)} days',))
+                conn.commit()
+                return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error(f"Failed to purge processing cache: {e}")
+            raise RuntimeError(f"Failed to purge processing cache: {e}")
+    
     # Bookmarks Management
     def add_bookmark(self, document_id: str, session_id: str, page_number: int,
                     title: str, description: str = "", position_data: Dict = None) -> str:
@@ -675,59 +827,181 @@ class DatabaseManager:
                     INSERT INTO analytics_events (event_id, session_id, event_type, event_data)
                     VALUES (?, ?, ?, ?)
                 """, (event_id, session_id, event_type, json.dumps(event_data)))
+                self._increment_rollups(cursor, 'event', event_type)
+                character_id = event_data.get('character_id') if isinstance(event_data, dict) else None
+                if character_id:
+                    self._increment_rollups(cursor, 'character', str(character_id))
                 conn.commit()
         except sqlite3.Error as e:
             logger.error(f"Failed to record analytics event {event_id}: {e}")
             raise RuntimeError(f"Failed to record analytics event {event_id}: {e}")
+        
+        self.compact_analytics_if_due()
     
-    def get_analytics_summary(self, days: int = 30) -> Dict[str, Any]:
-        """Get analytics summary for the last N days"""
+    def _increment_rollups(self, cursor: sqlite3.Cursor, metric: str, dimension: str = ''):
+        """Bump the hourly and daily rollup counters inside the caller's transaction"""
+        for granularity, bucket_format in self.ROLLUP_GRANULARITIES:
+            cursor.execute("""
+                INSERT INTO analytics_rollups (granularity, bucket_start, metric, dimension, count)
+                VALUES (?, strftime(?, 'now'), ?, ?, 1)
+                ON CONFLICT (granularity, bucket_start, metric, dimension)
+                DO UPDATE SET count = count + 1
+            """, (granularity, bucket_format, metric, dimension or ''))
+    
+    def _backfill_analytics_rollups(self):
+        """Build rollups from raw tables for databases created before rollups existed"""
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
+                cursor.execute("SELECT 1 FROM analytics_rollups LIMIT 1")
+                if cursor.fetchone():
+                    return
+                cursor.execute("SELECT 1 FROM sessions LIMIT 1")
+                if not cursor.fetchone():
+                    return
+            
+            self.rebuild_analytics_rollups()
+        except sqlite3.Error as e:
+            logger.error(f"Analytics rollup backfill failed: {e}")
+            raise RuntimeError(f"Analytics rollup backfill failed: {e}")
+    
+    def rebuild_analytics_rollups(self):
+        """Recompute rollups from the raw tables (compaction / repair job).
+        
+        Raw analytics events are purged by compact_analytics(), so event-derived
+        buckets are only rebuilt from the oldest remaining event onwards; older
+        buckets are the only record of those periods and are kept as they are.
+        Hourly buckets are only rebuilt inside their retention window, so a
+        rebuild never resurrects buckets that compaction already dropped.
+        """
+        # (metric, dimension expression, timestamp column, source table)
+        sources = [
+            ('session', "''", 'created_at', 'sessions'),
+            ('document', 'format_type', 'upload_time', 'documents'),
+            ('processing', 'processing_mode', 'created_at', 'processing_results'),
+        ]
+        
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM analytics_rollups WHERE metric IN (?, ?, ?)",
+                               tuple(metric for metric, _, _, _ in sources))
+                oldest_event = cursor.execute("SELECT MIN(timestamp) FROM analytics_events").fetchone()[0]
                 
-                # Get date range
-                end_date = datetime.now()
-                start_date = end_date - timedelta(days=days)
+                for granularity, bucket_format in self.ROLLUP_GRANULARITIES:
+                    # Hourly buckets older than their retention window stay compacted
+                    retained_since = (f"datetime('now', '-{int(self.HOURLY_ROLLUP_RETENTION_DAYS)} days')"
+                                      if granularity == 'hour' else "''")
+                    
+                    for metric, dimension_sql, time_column, table in sources:
+                        cursor.execute(f"""
+                            INSERT INTO analytics_rollups (granularity, bucket_start, metric, dimension, count)
+                            SELECT ?, strftime(?, {time_column}), ?, COALESCE({dimension_sql}, ''), COUNT(*)
+                            FROM {table}
+                            WHERE {time_column} IS NOT NULL AND {time_column} >= {retained_since}
+                            GROUP BY 2, 4
+                        """, (granularity, bucket_format, metric))
+                    
+                    if oldest_event is None:
+                        continue
+                    
+                    # The bucket holding the oldest event may have lost purged events,
+                    # so it is only ever raised, never lowered
+                    cursor.execute("""
+                        DELETE FROM analytics_rollups
+                        WHERE granularity = ? AND metric IN ('event', 'character')
+                          AND bucket_start > strftime(?, ?)
+                    """, (granularity, bucket_format, oldest_event))
+                    
+                    cursor.execute(f"""
+                        INSERT INTO analytics_rollups (granularity, bucket_start, metric, dimension, count)
+                        SELECT ?, strftime(?, timestamp), 'event', COALESCE(event_type, ''), COUNT(*)
+                        FROM analytics_events
+                        WHERE timestamp IS NOT NULL AND timestamp >= {retained_since}
+                        GROUP BY 2, 4
+                        ON CONFLICT (granularity, bucket_start, metric, dimension)
+                        DO UPDATE SET count = MAX(count, excluded.count)
+                    """, (granularity, bucket_format))
+                    
+                    cursor.execute(f"""
+                        INSERT INTO analytics_rollups (granularity, bucket_start, metric, dimension, count)
+                        SELECT ?, strftime(?, timestamp), 'character',
+                               json_extract(event_data, '$.character_id'), COUNT(*)
+                        FROM analytics_events
+                        WHERE json_valid(event_data)
+                          AND json_extract(event_data, '$.character_id') IS NOT NULL
+                          AND timestamp >= {retained_since}
+                        GROUP BY 2, 4
+                        ON CONFLICT (granularity, bucket_start, metric, dimension)
+                        DO UPDATE SET count = MAX(count, excluded.count)
+                    """, (granularity, bucket_format))
                 
-                # Total sessions
-                cursor.execute("""
-                    SELECT COUNT(DISTINCT session_id) FROM sessions 
-                    WHERE created_at >= ?
-                """, (start_date.isoformat(),))
-                total_sessions = cursor.fetchone()[0]
+                conn.commit()
+            
+            logger.info("Rebuilt analytics rollups")
+        except sqlite3.Error as e:
+            logger.error(f"Failed to rebuild analytics rollups: {e}")
+            raise RuntimeError(f"Failed to rebuild analytics rollups: {e}")
+    
+    def get_analytics_rollups(self, metric: str, granularity: str = 'day',
+                              since: str = None) -> List[Dict[str, Any]]:
+        """Get rollup buckets for a metric, oldest first"""
+        query = """
+            SELECT bucket_start, dimension, count
+            FROM analytics_rollups
+            WHERE granularity = ? AND metric = ?
+        """
+        params = [granularity, metric]
+        
+        if since is not None:
+            query += " AND bucket_start >= ?"
+            params.append(since)
+        
+        query += " ORDER BY bucket_start, dimension"
+        
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                return [
+                    {'bucket_start': row[0], 'dimension': row[1], 'count': row[2]}
+                    for row in cursor.fetchall()
+                ]
+        except sqlite3.Error as e:
+            logger.error(f"Failed to get analytics rollups for {metric}: {e}")
+            raise RuntimeError(f"Failed to get analytics rollups for {metric}: {e}")
+    
+    def get_analytics_summary(self, days: int = 30) -> Dict[str, Any]:
+        """Get analytics summary for the last N days from the daily rollups"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
                 
-                # Total documents processed
+                # Daily buckets only, so the cost depends on the window, not history size
                 cursor.execute("""
-                    SELECT COUNT(*) FROM documents 
-                    WHERE upload_time >= ?
-                """, (start_date.isoformat(),))
-                total_documents = cursor.fetchone()[0]
+                    SELECT metric, dimension, SUM(count)
+                    FROM analytics_rollups
+                    WHERE granularity = 'day' AND bucket_start >= date('now', ?)
+                    GROUP BY metric, dimension
+                """, (f'-{int(days)} days',))
                 
-                # Total processing operations
-                cursor.execute("""
-                    SELECT COUNT(*) FROM processing_results 
-                    WHERE created_at >= ?
-                """, (start_date.isoformat(),))
-                total_operations = cursor.fetchone()[0]
+                totals: Dict[str, Dict[str, int]] = {}
+                for metric, dimension, count in cursor.fetchall():
+                    totals.setdefault(metric, {})[dimension] = count
                 
-                # Popular processing modes
-                cursor.execute("""
-                    SELECT processing_mode, COUNT(*) as count
-                    FROM processing_results 
-                    WHERE created_at >= ?
-                    GROUP BY processing_mode
-                    ORDER BY count DESC
-                    LIMIT 5
-                """, (start_date.isoformat(),))
-                popular_modes = cursor.fetchall()
+                def ranked(metric: str, limit: int = 5) -> List[Tuple[str, int]]:
+                    items = totals.get(metric, {}).items()
+                    return sorted(items, key=lambda item: (-item[1], item[0]))[:limit]
                 
                 return {
                     'period_days': days,
-                    'total_sessions': total_sessions,
-                    'total_documents': total_documents,
-                    'total_operations': total_operations,
-                    'popular_modes': [{'mode': row[0], 'count': row[1]} for row in popular_modes]
+                    'total_sessions': sum(totals.get('session', {}).values()),
+                    'total_documents': sum(totals.get('document', {}).values()),
+                    'total_operations': sum(totals.get('processing', {}).values()),
+                    'total_events': sum(totals.get('event', {}).values()),
+                    'popular_modes': [{'mode': mode, 'count': count} for mode, count in ranked('processing')],
+                    'popular_events': [{'event_type': event_type, 'count': count} for event_type, count in ranked('event')],
+                    'top_characters': [{'character_id': character_id, 'count': count} for character_id, count in ranked('character')]
                 }
         except sqlite3.Error as e:
             logger.error(f"Failed to get analytics summary: {e}")
@@ -832,6 +1106,46 @@ class DatabaseManager:
             logger.error(f"Failed to cleanup old sessions: {e}")
             raise RuntimeError(f"Failed to cleanup old sessions: {e}")
     
+    def compact_analytics_if_due(self):
+        """Run compact_analytics() at startup and then at most once per compaction interval"""
+        if time.time() - self._last_compaction < self.COMPACTION_INTERVAL_SECONDS:
+            return
+        self._last_compaction = time.time()
+        try:
+            self.compact_analytics()
+        except RuntimeError as e:
+            logger.warning(f"Scheduled analytics compaction skipped: {e}")
+    
+    def compact_analytics(self, raw_retention_days: int = None,
+                          hourly_retention_days: int = None) -> Dict[str, int]:
+        """Drop raw analytics events and hourly rollups outside their retention windows.
+        
+        Daily rollups are kept indefinitely, so summaries over purged periods stay intact.
+        """
+        raw_retention_days = raw_retention_days or self.RAW_EVENT_RETENTION_DAYS
+        hourly_retention_days = hourly_retention_days or self.HOURLY_ROLLUP_RETENTION_DAYS
+        
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    DELETE FROM analytics_events WHERE timestamp < datetime('now', ?)
+                """, (f'-{int(raw_retention_days)} days',))
+                events_deleted = cursor.rowcount
+                
+                cursor.execute("""
+                    DELETE FROM analytics_rollups
+                    WHERE granularity = 'hour' AND bucket_start < datetime('now', ?)
+                """, (f'-{int(hourly_retention_days)} days',))
+                buckets_deleted = cursor.rowcount
+                conn.commit()
+            
+            logger.info(f"Compacted analytics: {events_deleted} raw events, {buckets_deleted} hourly buckets removed")
+            return {'events_deleted': events_deleted, 'hourly_buckets_deleted': buckets_deleted}
+        except sqlite3.Error as e:
+            logger.error(f"Failed to compact analytics: {e}")
+            raise RuntimeError(f"Failed to compact analytics: {e}")
+    
     def get_database_stats(self) -> Dict[str, Any]:
         """Get database statistics"""
         try:
@@ -842,7 +1156,7 @@ class DatabaseManager:
                 
                 # Table counts
                 tables = ['sessions', 'documents', 'processing_results', 'bookmarks', 
-                         'analytics_events', 'search_history', 'user_preferences']
+                         'analytics_events', 'analytics_rollups', 'search_history', 'user_preferences']
                 
                 for table in tables:
                     cursor.execute(f"SELECT COUNT(*) FROM {table}")
@@ -8,12 +8,17 @@ This module was missing and causing import failures.
 Features:
 - DOCX document loading and rendering
 - Text extraction from DOCX files
-- Page-by-page content extraction
+- Page-by-page content extraction from a load-time page index
+- Streaming XML parsing for very large documents
 - Error handling for corrupted DOCX files
 """
 
+import os
 import logging
-from typing import Dict, List, Any, Optional, Union, Tuple
+import zipfile
+import xml.etree.ElementTree as ET
+from bisect import bisect_right
+from typing import Dict, List, Any, Optional, Union, Tuple, Iterable, Iterator
 import io
 
 # Optional imports with fallbacks
@@ -26,12 +31,110 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+CORE_PROPERTY_TAGS = {
+    '{http://purl.org/dc/elements/1.1/}title': 'title',
+    '{http://purl.org/dc/elements/1.1/}creator': 'author',
+    '{http://purl.org/dc/elements/1.1/}subject': 'subject',
+    '{http://purl.org/dc/terms/}created': 'created',
+    '{http://purl.org/dc/terms/}modified': 'modified',
+}
+
+def _heading_level(style_name: Optional[str]) -> int:
+    """Heading level from a style name/id such as 'Heading 2' or 'Heading2' (0 if not a heading)"""
+    if not style_name or 'heading' not in style_name.lower():
+        return 0
+    digits = ''.join(c for c in style_name if c.isdigit())
+    return int(digits) if digits else 1
+
+def iter_docx_paragraphs(file_data: Union[bytes, str, io.IOBase]):
+    """Stream (text, heading level) for each paragraph of word/document.xml without building a DOM
+    
+    Like python-docx's Document.paragraphs, only paragraphs directly in the body are
+    yielded (table cells are skipped) and text of paragraphs nested in shapes is ignored.
+    """
+    source = io.BytesIO(file_data) if isinstance(file_data, bytes) else file_data
+    with zipfile.ZipFile(source) as archive, archive.open('word/document.xml') as xml_stream:
+        parts: List[str] = []
+        level = 0
+        depth = 0
+        in_body_paragraph = False
+        open_tags: List[str] = []
+        body = None
+        for event, elem in ET.iterparse(xml_stream, events=('start', 'end')):
+            tag = elem.tag
+            if event == 'start':
+                if tag == WORD_NAMESPACE + 'body':
+                    body = elem
+                elif tag == WORD_NAMESPACE + 'p':
+                    depth += 1
+                    if depth == 1:
+                        in_body_paragraph = bool(open_tags) and open_tags[-1] == WORD_NAMESPACE + 'body'
+                        parts, level = [], 0
+                open_tags.append(tag)
+                continue
+            
+            open_tags.pop()
+            if tag == WORD_NAMESPACE + 'p':
+                depth -= 1
+                if depth == 0 and in_body_paragraph:
+                    yield ''.join(parts), level
+            elif depth == 1 and in_body_paragraph:
+                if tag == WORD_NAMESPACE + 't':
+                    parts.append(elem.text or '')
+                elif tag == WORD_NAMESPACE + 'tab':
+                    parts.append('\t')
+                elif tag in (WORD_NAMESPACE + 'br', WORD_NAMESPACE + 'cr'):
+                    parts.append('\n')
+                elif tag == WORD_NAMESPACE + 'pStyle':
+                    level = level or _heading_level(elem.get(WORD_NAMESPACE + 'val'))
+            
+            # Detach finished body children (paragraphs, tables) so memory stays bounded by one block
+            if body is not None and open_tags and open_tags[-1] == WORD_NAMESPACE + 'body':
+                del body[:]
+
+def paginate_paragraphs(paragraphs: Iterable[Tuple[str, int]], char_budget: int,
+                        heading_break_level: int) -> Iterator[List[Tuple[str, int]]]:
+    """Group (text, heading level) paragraphs into pages by character budget, breaking before major headings"""
+    page: List[Tuple[str, int]] = []
+    page_chars = 0
+    for text, level in paragraphs:
+        if page_chars > 0 and (page_chars + len(text) > char_budget or 0 < level <= heading_break_level):
+            yield page
+            page, page_chars = [], 0
+        page.append((text, level))
+        page_chars += len(text)
+    if page:
+        yield page
+
+def iter_docx_pages(file_data: Union[bytes, str, io.IOBase]) -> Iterator[str]:
+    """Stream page texts of a DOCX file using the same pagination as DocxRenderer"""
+    pages = paginate_paragraphs(iter_docx_paragraphs(file_data),
+                                DocxRenderer.PAGE_CHAR_BUDGET, DocxRenderer.HEADING_BREAK_LEVEL)
+    for page in pages:
+        yield '\n'.join(text for text, _ in page)
+
 class DocxRenderer:
     """DOCX document renderer with error handling"""
     
+    # Characters per page when building the page index
+    PAGE_CHAR_BUDGET = 3000
+    # Headings at or above this level always start a new page
+    HEADING_BREAK_LEVEL = 1
+    # Larger files are stream-parsed instead of loaded through python-docx
+    STREAMING_THRESHOLD_BYTES = 10 * 1024 * 1024
+    
     def __init__(self):
-        self.document = None
         self.docx_available = DOCX_AVAILABLE
+        self._reset_index()
+    
+    def _reset_index(self):
+        self.document = None
+        self._paragraphs: List[str] = []
+        self._headings: List[Tuple[int, int, str]] = []  # (paragraph index, level, text)
+        self._page_starts: List[int] = []  # first paragraph index of each page
+        self._metadata: Dict[str, Any] = {}
+        self.streamed = False
         
     def load(self, file_data: Union[bytes, io.IOBase]) -> Dict[str, Any]:
         """
@@ -44,27 +147,28 @@ class DocxRenderer:
             Dict with success status and document info
         """
         try:
-            if not self.docx_available:
-                return {
-                    'success': False,
-                    'error': 'python-docx not available - cannot process DOCX files'
-                }
-            
-            # Load document
-            if isinstance(file_data, bytes):
-                file_stream = io.BytesIO(file_data)
-            else:
-                file_stream = file_data
-                
-            self.document = DocxDocument(file_stream)
+            self._reset_index()
             
-            # Extract basic metadata
-            metadata = self._extract_metadata()
+            if self.docx_available and self._data_size(file_data) <= self.STREAMING_THRESHOLD_BYTES:
+                self.document = DocxDocument(io.BytesIO(file_data) if isinstance(file_data, bytes) else file_data)
+                # Walk the paragraph proxies once; pages are served from plain strings afterwards
+                paragraphs = ((p.text or '', _heading_level(p.style.name if p.style else None))
+                              for p in self.document.paragraphs)
+                self._build_index(paragraphs)
+                self._metadata = self._extract_metadata()
+            else:
+                self.streamed = True
+                if hasattr(file_data, 'seek'):
+                    file_data.seek(0)
+                self._build_index(iter_docx_paragraphs(file_data))
+                if hasattr(file_data, 'seek'):
+                    file_data.seek(0)
+                self._metadata = self._read_core_properties(file_data)
             
             return {
                 'success': True,
-                'total_pages': len(self.document.paragraphs),  # Approximate page count
-                'metadata': metadata
+                'total_pages': self.get_page_count(),
+                'metadata': self._metadata
             }
             
         except Exception as e:
@@ -74,11 +178,38 @@ class DocxRenderer:
                 'error': f'Failed to load DOCX: {str(e)}'
             }
     
+    @staticmethod
+    def _data_size(file_data: Union[bytes, str, io.IOBase]) -> int:
+        if isinstance(file_data, bytes):
+            return len(file_data)
+        if isinstance(file_data, str):
+            return os.path.getsize(file_data)
+        position = file_data.tell()
+        size = file_data.seek(0, io.SEEK_END)
+        file_data.seek(position)
+        return size
+    
+    def _build_index(self, paragraphs):
+        """Record paragraph texts, page start offsets and headings"""
+        for page in paginate_paragraphs(paragraphs, self.PAGE_CHAR_BUDGET, self.HEADING_BREAK_LEVEL):
+            self._page_starts.append(len(self._paragraphs))
+            for text, level in page:
+                if level and text.strip():
+                    self._headings.append((len(self._paragraphs), level, text))
+                self._paragraphs.append(text)
+    
+    def _page_of_paragraph(self, paragraph_index: int) -> int:
+        return bisect_right(self._page_starts, paragraph_index)
+    
+    def _page_range(self, page_number: int) -> Tuple[int, int]:
+        """Paragraph index range [start, end) of a page"""
+        start = self._page_starts[page_number - 1]
+        end = self._page_starts[page_number] if page_number < len(self._page_starts) else len(self._paragraphs)
+        return start, end
+    
     def get_page_count(self) -> int:
-        """Get total number of pages (approximated for DOCX)"""
-        if not self.document:
-            return 0
-        return max(1, len(self.document.paragraphs) // 10)  # Rough estimate
+        """Get total number of pages from the page index"""
+        return len(self._page_starts)
     
     def extract_page_text(self, page_number: int) -> str:
         """
@@ -90,24 +221,12 @@ class DocxRenderer:
         Returns:
             Text content of the page
         """
-        if not self.document:
+        if page_number < 1 or page_number > self.get_page_count():
             return ""
             
         try:
-            # For DOCX, we approximate pages by paragraph groups
-            paragraphs_per_page = 10
-            start_idx = (page_number - 1) * paragraphs_per_page
-            end_idx = start_idx + paragraphs_per_page
-            
-            paragraphs = self.document.paragraphs[start_idx:end_idx]
-            # Safe text extraction from paragraphs
-            text_parts = []
-            for p in paragraphs:
-                if p and hasattr(p, 'text'):
-                    text_parts.append(p.text if p.text else "")
-            text_content = '\n'.join(text_parts)
-            
-            return text_content
+            start, end = self._page_range(page_number)
+            return '\n'.join(self._paragraphs[start:end])
             
         except Exception as e:
             logger.error(f"Text extraction error for page {page_number}: {e}")
@@ -115,15 +234,11 @@ class DocxRenderer:
     
     def extract_all_text(self) -> str:
         """Extract all text from the document"""
-        if not self.document:
+        if not self._page_starts:
             return ""
             
         try:
-            all_text = []
-            for paragraph in self.document.paragraphs:
-                all_text.append(paragraph.text)
-            
-            return '\n'.join(all_text)
+            return '\n'.join(self._paragraphs)
             
         except Exception as e:
             logger.error(f"Full text extraction error: {e}")
@@ -143,7 +258,7 @@ class DocxRenderer:
                 'subject': getattr(core_props, 'subject', None) or '',
                 'created': getattr(core_props, 'created', None),
                 'modified': getattr(core_props, 'modified', None),
-                'paragraph_count': len(self.document.paragraphs)
+                'paragraph_count': len(self._paragraphs)
             }
             
             return metadata
@@ -152,32 +267,30 @@ class DocxRenderer:
             logger.error(f"Metadata extraction error: {e}")
             return {'error': str(e)}
     
-    def _safe_get_heading_level(self, paragraph) -> int:
-        """Safely extract heading level from paragraph style"""
+    def _read_core_properties(self, file_data: Union[bytes, str, io.IOBase]) -> Dict[str, Any]:
+        """Metadata from docProps/core.xml for documents loaded without python-docx"""
+        metadata = {'title': 'Unknown', 'author': 'Unknown', 'subject': '',
+                    'created': None, 'modified': None, 'paragraph_count': len(self._paragraphs)}
         try:
-            if paragraph and hasattr(paragraph, 'style') and paragraph.style:
-                style_name = paragraph.style.name
-                if style_name and len(style_name) > 0 and style_name[-1].isdigit():
-                    return int(style_name[-1])
-        except (AttributeError, ValueError, TypeError, IndexError):
-            pass
-        return 1  # Default level
-
+            source = io.BytesIO(file_data) if isinstance(file_data, bytes) else file_data
+            with zipfile.ZipFile(source) as archive:
+                root = ET.fromstring(archive.read('docProps/core.xml'))
+            for child in root:
+                key = CORE_PROPERTY_TAGS.get(child.tag)
+                if key and child.text:
+                    metadata[key] = child.text
+        except (KeyError, zipfile.BadZipFile, ET.ParseError) as e:
+            logger.warning(f"Could not read DOCX core properties: {e}")
+        return metadata
+    
     def get_table_of_contents(self) -> List[Dict[str, Any]]:
         """Extract table of contents (basic implementation for DOCX)"""
-        if not self.document:
-            return []
-            
         try:
-            toc = []
-            for i, paragraph in enumerate(self.document.paragraphs):
-                # Look for heading-style paragraphs
-                if paragraph.style and 'heading' in paragraph.style.name.lower():
-                    toc.append({
-                        'title': paragraph.text,
-                        'page': (i // 10) + 1,  # Approximate page
-                        'level': self._safe_get_heading_level(paragraph)
-                    })
+            toc = [{
+                'title': text,
+                'page': self._page_of_paragraph(index),
+                'level': level
+            } for index, level, text in self._headings]
             
             return toc[:20]  # Limit to first 20 headings
             
@@ -205,24 +318,25 @@ class DocxRenderer:
         Returns:
             List of search results with context
         """
-        if not self.document or not query:
+        if not self._page_starts or not query:
             return []
             
         try:
             results = []
             query_lower = query.lower()
             
-            for i, paragraph in enumerate(self.document.paragraphs):
-                text = paragraph.text
+            for i, text in enumerate(self._paragraphs):
                 if query_lower in text.lower():
                     results.append({
-                        'page': (i // 10) + 1,  # Approximate page
+                        'page': self._page_of_paragraph(i),
                         'text': text,
                         'context': text[:200],  # First 200 chars as context
                         'match_type': 'exact'
                     })
+                    if len(results) >= 50:  # Limit results
+                        break
             
-            return results[:50]  # Limit results
+            return results
             
         except Exception as e:
             logger.error(f"Search error: {e}")
@@ -8,9 +8,14 @@ Implements regex-based structured Q&A detection and handles standalone content a
 
 import re
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
 from pathlib import Path
 
+try:
+    from .universal_document_reader import iter_pages
+except ImportError:
+    from modules.universal_document_reader import iter_pages
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -84,25 +89,16 @@ class EnhancedUniversalExtractor:
             if file_ext not in self.supported_formats:
                 raise ValueError(f"Unsupported file format: {file_ext}. Supported: {', '.join(self.supported_formats)}")
             
-            # Extract content based on file type
-            raw_content = ""
-            if file_ext == '.pdf':
-                raw_content = self._extract_pdf(file_path)
-            elif file_ext == '.txt':
-                raw_content = self._extract_txt(file_path)
-            elif file_ext == '.docx':
-                raw_content = self._extract_docx(file_path)
-            elif file_ext == '.epub':
-                raw_content = self._extract_epub(file_path)
-            elif file_ext == '.md':
-                raw_content = self._extract_md(file_path)
+            # Stream pages and run smart detection per segment, so only one
+            # segment of the document is in memory at a time
+            examples = []
+            pages = (page.text_content for page in iter_pages(file_path, file_ext))
+            for segment in self._iter_segments(pages):
+                examples.extend(self._smart_content_detection(segment, file_ext))
             
-            if not raw_content:
+            if not examples:
                 logger.warning(f"No content extracted from {file_path}")
-                return []
-            
-            # Smart content detection and processing
-            return self._smart_content_detection(raw_content, file_ext)
+            return examples
                 
         except FileNotFoundError as e:
             logger.error(f"File not found: {e}")
@@ -175,6 +171,21 @@ class EnhancedUniversalExtractor:
             logger.error(f"Content extraction error for {uploaded_file.name}: {e}")
             return ""
     
+    def _iter_segments(self, page_texts: Iterable[str]) -> Iterator[str]:
+        """Group consecutive page texts into segments no longer than the regex limit"""
+        segment: List[str] = []
+        segment_length = 0
+        for text in page_texts:
+            if not text or not text.strip():
+                continue
+            if segment and segment_length + len(text) > self.max_regex_length:
+                yield "\n".join(segment)
+                segment, segment_length = [], 0
+            segment.append(text)
+            segment_length += len(text) + 1
+        if segment:
+            yield "\n".join(segment)
+    
     def _smart_content_detection(self, text: str, source_type: str) -> List[Dict[str, Any]]:
         """
         Smart detection of content type and appropriate processing
@@ -532,87 +543,6 @@ class EnhancedUniversalExtractor:
         
         return min(score, 1.0)
     
-    def _extract_pdf(self, file_path: str) -> str:
-        """Extract content from PDF using built-in PDF processing"""
-        try:
-            # Use built-in PDF processing instead
-            return self._extract_pdf_builtin(file_path)
-        except Exception as e:
-            self.logger.error(f"PDF extraction failed: {e}")
-            return ""
-    
-    def _extract_pdf_builtin(self, file_path: str) -> str:
-        """Basic PDF extraction fallback"""
-        try:
-            import PyPDF2
-            text = ""
-            
-            with open(file_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                for page in reader.pages:
-                    text += page.extract_text() + "\n"
-            
-            return text
-            
-        except Exception as e:
-            logger.error(f"Basic PDF extraction failed: {e}")
-            return ""
-    
-    def _extract_txt(self, file_path: str) -> str:
-        """Extract content from TXT file"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read()
-        except Exception as e:
-            logger.error(f"TXT extraction failed: {e}")
-            return ""
-    
-    def _extract_md(self, file_path: str) -> str:
-        """Extract content from Markdown file"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read()
-        except Exception as e:
-            logger.error(f"Markdown extraction failed: {e}")
-            return ""
-    
-    def _extract_docx(self, file_path: str) -> str:
-        """Extract content from DOCX file"""
-        try:
-            from docx import Document
-            doc = Document(file_path)
-            return "\n".join([paragraph.text for paragraph in doc.paragraphs])
-        except ImportError:
-            logger.error("python-docx not available for DOCX extraction")
-            return ""
-        except Exception as e:
-            logger.error(f"DOCX extraction failed: {e}")
-            return ""
-    
-    def _extract_epub(self, file_path: str) -> str:
-        """Extract content from EPUB file"""
-        try:
-            import ebooklib
-            from ebooklib import epub
-            from bs4 import BeautifulSoup
-            
-            book = epub.read_epub(file_path)
-            text = ""
-            
-            for item in book.get_items():
-                if item.get_type() == ebooklib.ITEM_DOCUMENT:
-                    soup = BeautifulSoup(item.get_content(), 'html.parser')
-                    text += soup.get_text() + "\n"
-            
-            return text
-            
-        except ImportError:
-            logger.error("ebooklib not available for EPUB extraction")
-            return ""
-        except Exception as e:
-            logger.error(f"EPUB extraction failed: {e}")
-            return ""
-    
     def get_extraction_stats(self) -> Dict[str, int]:
         """Get extraction statistics"""
         return self.extraction_stats.copy()
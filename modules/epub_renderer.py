@@ -9,11 +9,17 @@ Features:
 - EPUB document loading and rendering
 - Text extraction from EPUB files
 - Chapter-based navigation
+- Chapter text extracted once at load (compressed for large chapters)
 - Error handling for corrupted EPUB files
 """
 
+import re
+import zlib
 import logging
-from typing import Dict, List, Any, Optional, Union, Tuple
+import posixpath
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Union, Tuple, Iterator
 import io
 import zipfile
 
@@ -33,16 +39,66 @@ except ImportError:
     BS4_AVAILABLE = False
     logging.warning("BeautifulSoup not available - HTML parsing will be limited")
 
+try:
+    import lxml  # noqa: F401 - enables BeautifulSoup's faster lxml parser
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+_TAG_PATTERN = re.compile(r'<[^>]+>')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+HTML_PARSER = 'lxml' if LXML_AVAILABLE else 'html.parser'
+CONTAINER_NAMESPACE = '{urn:oasis:names:tc:opendocument:xmlns:container}'
+OPF_NAMESPACE = '{http://www.idpf.org/2007/opf}'
+
 logger = logging.getLogger(__name__)
 
+def html_to_text(content: str, default_title: str = '') -> Tuple[str, str]:
+    """Title and plain text of a chapter's HTML"""
+    title = default_title
+    if BS4_AVAILABLE:
+        soup = BeautifulSoup(content, HTML_PARSER)
+        # Extract title from HTML if possible
+        title_tag = soup.find(['h1', 'h2', 'title'])
+        if title_tag:
+            title = title_tag.get_text(strip=True)
+        # Body only, so <head> titles and styles are not part of the text
+        text = (soup.body or soup).get_text(separator='\n', strip=True)
+    else:
+        # Basic HTML tag removal if BeautifulSoup not available
+        text = _WHITESPACE_PATTERN.sub(' ', _TAG_PATTERN.sub('', content)).strip()
+    return title, text
+
+def iter_epub_chapters(file_data: Union[bytes, str, io.IOBase]) -> Iterator[Tuple[str, str]]:
+    """Stream (title, text) of each XHTML document in manifest order, reading one chapter at a time"""
+    source = io.BytesIO(file_data) if isinstance(file_data, bytes) else file_data
+    with zipfile.ZipFile(source) as archive:
+        container = ET.fromstring(archive.read('META-INF/container.xml'))
+        opf_path = container.find(f'.//{CONTAINER_NAMESPACE}rootfile').get('full-path')
+        opf_dir = posixpath.dirname(opf_path)
+        manifest = ET.fromstring(archive.read(opf_path)).find(f'{OPF_NAMESPACE}manifest')
+        
+        for item in manifest.iter(f'{OPF_NAMESPACE}item'):
+            if item.get('media-type') != 'application/xhtml+xml':
+                continue
+            name = posixpath.join(opf_dir, item.get('href')) if opf_dir else item.get('href')
+            content = archive.read(name).decode('utf-8', errors='ignore')
+            yield html_to_text(content, item.get('href'))
+
 class EpubRenderer:
     """EPUB document renderer with error handling"""
     
+    # Chapter text longer than this is kept zlib-compressed in memory
+    COMPRESS_MIN_CHARS = 64 * 1024
+    MAX_PARSE_WORKERS = 4
+    
     def __init__(self):
         self.book = None
         self.chapters = []
         self.epub_available = EPUB_AVAILABLE
         self.bs4_available = BS4_AVAILABLE
+        self._toc = None
         
     def load(self, file_data: Union[bytes, io.IOBase]) -> Dict[str, Any]:
         """
@@ -68,6 +124,7 @@ class EpubRenderer:
                 file_stream = file_data
                 
             self.book = epub.read_epub(file_stream)
+            self._toc = None
             
             # Extract chapters
             self.chapters = self._extract_chapters()
@@ -106,19 +163,7 @@ class EpubRenderer:
             return ""
             
         try:
-            chapter = self.chapters[page_number - 1]
-            
-            # Extract text from HTML content
-            if self.bs4_available:
-                soup = BeautifulSoup(chapter['content'], 'html.parser')
-                text = soup.get_text(separator='\n', strip=True)
-            else:
-                # Basic HTML tag removal if BeautifulSoup not available
-                import re
-                text = re.sub(r'<[^>]+>', '', chapter['content'])
-                text = re.sub(r'\s+', ' ', text).strip()
-            
-            return text
+            return self._chapter_text(self.chapters[page_number - 1])
             
         except Exception as e:
             logger.error(f"Text extraction error for page {page_number}: {e}")
@@ -131,8 +176,8 @@ class EpubRenderer:
             
         try:
             all_text = []
-            for i in range(1, len(self.chapters) + 1):
-                chapter_text = self.extract_page_text(i)
+            for chapter in self.chapters:
+                chapter_text = self._chapter_text(chapter)
                 if chapter_text:
                     all_text.append(chapter_text)
             
@@ -148,34 +193,35 @@ class EpubRenderer:
             return []
             
         try:
-            chapters = []
-            
             # Get all document items (chapters)
-            for item in self.book.get_items():
-                if item.get_type() == ebooklib.ITEM_DOCUMENT:
-                    content = item.get_content().decode('utf-8')
-                    
-                    # Extract title from HTML if possible
-                    title = item.get_name()
-                    if self.bs4_available:
-                        soup = BeautifulSoup(content, 'html.parser')
-                        title_tag = soup.find(['h1', 'h2', 'title'])
-                        if title_tag:
-                            title = title_tag.get_text(strip=True)
-                    
-                    chapters.append({
-                        'title': title,
-                        'content': content,
-                        'id': item.get_id(),
-                        'file_name': item.get_name()
-                    })
+            items = [item for item in self.book.get_items() if item.get_type() == ebooklib.ITEM_DOCUMENT]
             
-            return chapters
+            # Each chapter is parsed exactly once; the HTML is not kept
+            with ThreadPoolExecutor(max_workers=min(self.MAX_PARSE_WORKERS, max(1, len(items)))) as pool:
+                return list(pool.map(self._parse_chapter, items))
             
         except Exception as e:
             logger.error(f"Chapter extraction error: {e}")
             return []
     
+    def _parse_chapter(self, item) -> Dict[str, Any]:
+        """Title and plain text of a chapter from a single HTML parse"""
+        content = item.get_content().decode('utf-8')
+        title, text = html_to_text(content, item.get_name())
+        
+        return {
+            'title': title,
+            'text': zlib.compress(text.encode('utf-8')) if len(text) > self.COMPRESS_MIN_CHARS else text,
+            'id': item.get_id(),
+            'file_name': item.get_name(),
+            'content_length': len(content)
+        }
+    
+    @staticmethod
+    def _chapter_text(chapter: Dict[str, Any]) -> str:
+        text = chapter['text']
+        return zlib.decompress(text).decode('utf-8') if isinstance(text, bytes) else text
+    
     def _extract_metadata(self) -> Dict[str, Any]:
         """Extract metadata from EPUB document"""
         if not self.book:
@@ -216,6 +262,9 @@ class EpubRenderer:
         """Extract table of contents from EPUB"""
         if not self.book:
             return []
+        
+        if self._toc is not None:
+            return self._toc
             
         try:
             toc = []
@@ -251,7 +300,8 @@ class EpubRenderer:
                         'level': 1
                     })
             
-            return toc[:50]  # Limit to first 50 entries
+            self._toc = toc[:50]  # Limit to first 50 entries
+            return self._toc
             
         except Exception as e:
             logger.error(f"TOC extraction error: {e}")
@@ -284,34 +334,29 @@ class EpubRenderer:
             
         try:
             results = []
-            query_lower = query.lower()
+            pattern = re.compile(re.escape(query), re.IGNORECASE)
             
             for i, chapter in enumerate(self.chapters):
-                # Extract text for searching
-                if self.bs4_available:
-                    soup = BeautifulSoup(chapter['content'], 'html.parser')
-                    text = soup.get_text()
-                else:
-                    # Basic HTML tag removal
-                    import re
-                    text = re.sub(r'<[^>]+>', '', chapter['content'])
+                text = self._chapter_text(chapter)
                 
-                if query_lower in text.lower():
-                    # Find context around the match
-                    match_index = text.lower().find(query_lower)
+                for match in pattern.finditer(text):
+                    # Context around this occurrence
+                    match_index = match.start()
                     context_start = max(0, match_index - 100)
                     context_end = min(len(text), match_index + 200)
-                    context = text[context_start:context_end]
                     
                     results.append({
                         'page': i + 1,
                         'text': query,
-                        'context': context,
+                        'context': text[context_start:context_end],
+                        'offset': match_index,
                         'match_type': 'exact',
                         'chapter_title': chapter['title']
                     })
+                    if len(results) >= 50:  # Limit results
+                        return results
             
-            return results[:50]  # Limit results
+            return results
             
         except Exception as e:
             logger.error(f"Search error: {e}")
@@ -327,5 +372,5 @@ class EpubRenderer:
             'title': chapter['title'],
             'id': chapter['id'],
             'file_name': chapter['file_name'],
-            'content_length': len(chapter['content'])
+            'content_length': chapter['content_length']
         }
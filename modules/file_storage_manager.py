@@ -6,14 +6,67 @@ Handles file storage operations with support for Render's filesystem constraints
 """
 
 import os
+import mmap
 import shutil
+import hashlib
 import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional, Union, BinaryIO
 import logging
 
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+@dataclass
+class IngestedUpload:
+    """An upload written to storage once, with its content hash"""
+    path: Path
+    sha256: str
+    size: int
+    rss_before_mb: Optional[float] = None
+    rss_after_mb: Optional[float] = None
+    
+    @property
+    def rss_growth_mb(self) -> Optional[float]:
+        """Change in resident memory across the ingest (None where unsupported)"""
+        if self.rss_before_mb is None or self.rss_after_mb is None:
+            return None
+        return self.rss_after_mb - self.rss_before_mb
+
+def current_rss_mb() -> Optional[float]:
+    """Current resident set size of this process in MB (None without psutil)"""
+    if not PSUTIL_AVAILABLE:
+        return None
+    try:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except psutil.Error as e:
+        logger.debug(f"Could not sample RSS: {e}")
+        return None
+
+@contextmanager
+def open_mapped(path: Union[str, Path]):
+    """Read-only memoryview of a file via mmap, valid inside the with block"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield memoryview(b"")
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                yield view
+            finally:
+                # The map cannot close while a view is exported
+                view.release()
+
 class FileStorageManager:
     """Manages file storage with Render compatibility"""
     
@@ -83,6 +136,10 @@ class FileStorageManager:
         try:
             if isinstance(file_data, bytes):
                 file_path.write_bytes(file_data)
+            elif hasattr(file_data, 'getbuffer'):
+                # In-memory uploads are written from a view of their buffer
+                with file_data.getbuffer() as view, open(file_path, 'wb') as f:
+                    f.write(view)
             else:
                 with open(file_path, 'wb') as f:
                     shutil.copyfileobj(file_data, f)
@@ -94,6 +151,58 @@ class FileStorageManager:
             logger.error(f"Error saving upload: {e}")
             raise
     
+    def ingest_upload(self, file_obj: Union[bytes, BinaryIO], filename: str,
+                      chunk_size: int = UPLOAD_CHUNK_SIZE) -> IngestedUpload:
+        """
+        Stream an upload to content-addressed storage, hashing it as it is written.
+        
+        In-memory uploads (e.g. Streamlit's UploadedFile) are written from a view of
+        their buffer, so no extra copy of the content is made. Identical uploads
+        share one stored file.
+        """
+        rss_before = current_rss_mb()
+        suffix = Path(self._sanitize_filename(filename)).suffix.lower()
+        digest = hashlib.sha256()
+        size = 0
+        
+        fd, tmp_name = tempfile.mkstemp(dir=self.upload_path, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                if isinstance(file_obj, (bytes, bytearray, memoryview)) or hasattr(file_obj, 'getbuffer'):
+                    view = file_obj.getbuffer() if hasattr(file_obj, 'getbuffer') else memoryview(file_obj)
+                    with view:
+                        for start in range(0, len(view), chunk_size):
+                            with view[start:start + chunk_size] as chunk:
+                                digest.update(chunk)
+                                out.write(chunk)
+                        size = len(view)
+                else:
+                    if hasattr(file_obj, 'seek'):
+                        file_obj.seek(0)
+                    while chunk := file_obj.read(chunk_size):
+                        digest.update(chunk)
+                        out.write(chunk)
+                        size += len(chunk)
+            
+            sha256 = digest.hexdigest()
+            file_path = self.upload_path / f"{sha256}{suffix}"
+            if file_path.exists():
+                os.unlink(tmp_name)
+            else:
+                os.replace(tmp_name, file_path)
+        except Exception as e:
+            logger.error(f"Error ingesting upload {filename}: {e}")
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+        
+        upload = IngestedUpload(path=file_path, sha256=sha256, size=size,
+                                rss_before_mb=rss_before, rss_after_mb=current_rss_mb())
+        growth = upload.rss_growth_mb
+        logger.info(f"Ingested upload {filename}: {size / (1024 * 1024):.1f}MB as {file_path.name}"
+                    + (f", RSS {upload.rss_after_mb:.0f}MB ({growth:+.1f}MB)" if growth is not None else ""))
+        return upload
+    
     def cleanup_old_files(self, max_age_hours: int = 24):
         """Clean up old temporary files"""
         import time
@@ -58,6 +58,16 @@ except ImportError:
     SKLEARN_AVAILABLE = False
     logging.warning("scikit-learn not available - advanced analysis disabled")
 
+# Persistent result cache for the model-backed analyses
+NLP_CACHE_TTL_SECONDS = 7 * 24 * 3600
+try:
+    from .performance_optimizer import performance_optimizer
+    cached_nlp_result = performance_optimizer.cached(ttl_seconds=NLP_CACHE_TTL_SECONDS, persistent=True)
+except ImportError:
+    def cached_nlp_result(func):
+        return func
+    logging.warning("performance_optimizer not available - NLP results will not be cached")
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -76,6 +86,8 @@ class ProcessingResult:
 class IntelligentProcessor:
     """Core NLP processing engine with multiple analysis modes"""
     
+    SENTENCE_MODEL_NAME = 'all-MiniLM-L6-v2'
+    
     def __init__(self):
         self.nlp = None
         self.sentence_model = None
@@ -114,7 +126,7 @@ class IntelligentProcessor:
                 socket.setdefaulttimeout(10)  # 10 second timeout
                 
                 try:
-                    self.sentence_model = SentenceTransformer('all-MiniLM-L6-v2')
+                    self.sentence_model = SentenceTransformer(self.SENTENCE_MODEL_NAME)
                     logger.info("Sentence transformer model loaded successfully")
                 except Exception as model_error:
                     # Try to use cached model if available
@@ -124,7 +136,7 @@ class IntelligentProcessor:
                         logger.warning(f"Failed to download model, checking cache: {model_error}")
                         # Model might still work if cached
                         try:
-                            self.sentence_model = SentenceTransformer('all-MiniLM-L6-v2', cache_folder=cache_dir)
+                            self.sentence_model = SentenceTransformer(self.SENTENCE_MODEL_NAME, cache_folder=cache_dir)
                             logger.info("Loaded sentence transformer from cache")
                         except:
                             raise model_error
@@ -138,6 +150,25 @@ class IntelligentProcessor:
                 logger.warning("Semantic similarity features will be disabled")
                 self.sentence_transformers_available = False
     
+    @property
+    def model_version(self) -> str:
+        """Identifies the loaded NLP backends, so results from other models are not reused"""
+        parts = []
+        if self.spacy_available and self.nlp is not None:
+            meta = getattr(self.nlp, 'meta', {}) or {}
+            parts.append(f"spacy:{meta.get('lang', '')}_{meta.get('name', '')}-{meta.get('version', '')}")
+        if self.sentence_transformers_available and self.sentence_model is not None:
+            parts.append(f"sentence:{self.SENTENCE_MODEL_NAME}")
+        if self.nltk_available:
+            parts.append("nltk")
+        if self.sklearn_available:
+            parts.append("sklearn")
+        return "|".join(parts) or "basic"
+    
+    def cache_identity(self) -> str:
+        """Stable cache key for `self` in cached methods: results depend only on the models"""
+        return self.model_version
+    
     def _split_into_sentences(self, text: str) -> List[str]:
         """Split text into sentences"""
         if self.spacy_available and self.nlp:
@@ -312,6 +343,7 @@ class IntelligentProcessor:
         
         return results
     
+    @cached_nlp_result
     def generate_questions_from_content(self, text: str, style: str = "Academic", 
                                       count: int = 3, page_number: int = 1) -> List[ProcessingResult]:
         """Generate questions from content using built-in NLP"""
@@ -364,6 +396,7 @@ class IntelligentProcessor:
         
         return results
     
+    @cached_nlp_result
     def create_summary(self, text: str, length: str = "Brief", 
                       style: str = "Paragraph", page_number: int = 1) -> List[ProcessingResult]:
         """Create summary using extractive and abstractive techniques"""
@@ -424,6 +457,7 @@ class IntelligentProcessor:
         
         return [result]
     
+    @cached_nlp_result
     def extract_named_entities(self, text: str, page_number: int = 1) -> List[ProcessingResult]:
         """Extract named entities from text"""
         
@@ -720,6 +754,7 @@ class IntelligentProcessor:
             outline += f"{i+1}. {sentence}\n"
         return outline.strip()
     
+    @cached_nlp_result
     def extract_key_themes(self, text: str, page_number: int = 1) -> List[ProcessingResult]:
         """Extract key themes and topics from text"""
         results = []
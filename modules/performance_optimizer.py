@@ -6,31 +6,99 @@ Implements caching, async processing, and resource optimization
 to improve application performance and scalability.
 """
 
+import os
+import sys
+import abc
+import copy
+import heapq
+import itertools
 import asyncio
 import logging
 import time
+import enum
+import pickle
+import sqlite3
+from pathlib import Path
 from typing import Any, Dict, List, Optional, Callable, Tuple
-from dataclasses import dataclass
-from datetime import datetime, timedelta
+from dataclasses import dataclass, fields, is_dataclass
+from datetime import datetime
 from collections import OrderedDict
 from functools import wraps
 import hashlib
-import json
 import threading
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
 import psutil
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
-@dataclass
+_MISSING = object()
+
+# Containers are sized from a sample of their items, this many levels deep
+SIZE_SAMPLE_ITEMS = 16
+SIZE_MAX_DEPTH = 3
+
+_SIZERS: Dict[type, Callable[[Any], int]] = {
+    str: len,
+    bytes: len,
+    bytearray: len,
+    memoryview: lambda obj: obj.nbytes,
+    int: lambda obj: 8,
+    float: lambda obj: 8,
+    bool: lambda obj: 8,
+    type(None): lambda obj: 8,
+}
+if NUMPY_AVAILABLE:
+    _SIZERS[np.ndarray] = lambda obj: obj.nbytes
+
+def register_sizer(value_type: type, sizer: Callable[[Any], int]):
+    """Size values of exactly this type with a custom function"""
+    _SIZERS[value_type] = sizer
+
+def estimate_size(obj: Any, depth: int = 0) -> int:
+    """Cheap size estimate in bytes: registered sizers, else a sampled recursive estimate"""
+    sizer = _SIZERS.get(type(obj))
+    if sizer is not None:
+        return sizer(obj)
+    
+    size = sys.getsizeof(obj, 64)
+    if depth >= SIZE_MAX_DEPTH:
+        return size
+    
+    if isinstance(obj, dict):
+        items = itertools.chain.from_iterable(itertools.islice(obj.items(), SIZE_SAMPLE_ITEMS))
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        items = itertools.islice(obj, SIZE_SAMPLE_ITEMS)
+    elif hasattr(obj, '__dict__'):
+        return size + estimate_size(vars(obj), depth + 1)
+    else:
+        return size
+    
+    count = len(obj)
+    if count == 0:
+        return size
+    total = 0
+    for item in items:
+        sizer = _SIZERS.get(type(item))
+        total += sizer(item) if sizer is not None else estimate_size(item, depth + 1)
+    return size + total * count // min(count, SIZE_SAMPLE_ITEMS)
+
+@dataclass(slots=True)
 class CacheEntry:
-    """Cache entry with metadata"""
+    """Cache entry with metadata (times are time.monotonic() seconds)"""
     key: str
     value: Any
-    created_at: datetime
-    expires_at: datetime
+    created_at: float
+    expires_at: float
     hit_count: int = 0
     size_bytes: int = 0
+    # [hits, misses, evictions] of the key's namespace
+    namespace_counts: Optional[List[int]] = None
 
 @dataclass
 class PerformanceMetric:
@@ -42,76 +110,91 @@ class PerformanceMetric:
     metadata: Dict[str, Any] = None
 
 class LRUCache:
-    """Least Recently Used cache implementation"""
+    """
+    Least Recently Used cache implementation.
+    
+    Expired entries are dropped proactively from a min-heap of expiry times.
+    Hits, misses and evictions are also counted per namespace, the key prefix
+    before the first ':' (cached() keys are "module.function:hash"), or
+    "default" for keys without one.
+    """
     
-    def __init__(self, max_size: int = 1000, max_memory_mb: int = 100):
+    def __init__(self, max_size: int = 1000, max_memory_mb: int = 100,
+                 sizer: Optional[Callable[[Any], int]] = None):
         self.max_size = max_size
         self.max_memory_bytes = max_memory_mb * 1024 * 1024
-        self.cache = OrderedDict()
+        self.sizer = sizer or estimate_size
+        self.cache: "OrderedDict[str, CacheEntry]" = OrderedDict()
         self.current_memory = 0
         self.lock = threading.Lock()
         self.hits = 0
         self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._namespaces: Dict[str, List[int]] = {}
     
-    def get(self, key: str) -> Optional[Any]:
+    def get(self, key: str, default: Any = None) -> Optional[Any]:
         """Get value from cache"""
         with self.lock:
-            if key in self.cache:
-                # Move to end (most recently used)
-                entry = self.cache.pop(key)
-                self.cache[key] = entry
-                
-                # Check expiration
-                if entry.expires_at < datetime.now():
-                    del self.cache[key]
-                    self.current_memory -= entry.size_bytes
-                    self.misses += 1
-                    return None
-                
-                entry.hit_count += 1
-                self.hits += 1
-                return entry.value
+            entry = self.cache.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                # Expired entries are removed from the heap on the next set()
+                self.misses += 1
+                self._namespace_counts(key)[1] += 1
+                return default
             
-            self.misses += 1
-            return None
+            # Mark as most recently used
+            self.cache.move_to_end(key)
+            entry.hit_count += 1
+            entry.namespace_counts[0] += 1
+            self.hits += 1
+            return entry.value
     
     def set(self, key: str, value: Any, ttl_seconds: int = 3600):
         """Set value in cache"""
+        size = self.sizer(value)
+        now = time.monotonic()
+        expires_at = now + ttl_seconds
+        
         with self.lock:
-            # Calculate size
-            size = self._estimate_size(value)
-            
             # Remove old entry if exists
-            if key in self.cache:
-                old_entry = self.cache[key]
+            old_entry = self.cache.pop(key, None)
+            if old_entry is not None:
                 self.current_memory -= old_entry.size_bytes
             
-            # Evict if necessary
-            while (len(self.cache) >= self.max_size or 
+            if self._expiry_heap and self._expiry_heap[0][0] <= now:
+                self._expire(now)
+            
+            # Evict least recently used entries if necessary
+            while (len(self.cache) >= self.max_size or
                    self.current_memory + size > self.max_memory_bytes) and self.cache:
-                # Remove least recently used
                 oldest_key, oldest_entry = self.cache.popitem(last=False)
                 self.current_memory -= oldest_entry.size_bytes
-                logger.debug(f"Evicted cache entry: {oldest_key}")
+                self.evictions += 1
+                oldest_entry.namespace_counts[2] += 1
             
-            # Add new entry
-            entry = CacheEntry(
-                key=key,
-                value=value,
-                created_at=datetime.now(),
-                expires_at=datetime.now() + timedelta(seconds=ttl_seconds),
-                size_bytes=size
-            )
-            self.cache[key] = entry
+            self.cache[key] = CacheEntry(key, value, now, expires_at, 0, size,
+                                         self._namespace_counts(key))
             self.current_memory += size
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            
+            # Overwritten and evicted keys leave stale heap items behind
+            if len(self._expiry_heap) > 2 * len(self.cache) + 64:
+                self._expiry_heap = [(e.expires_at, k) for k, e in self.cache.items()]
+                heapq.heapify(self._expiry_heap)
     
     def clear(self):
         """Clear all cache entries"""
         with self.lock:
             self.cache.clear()
+            self._expiry_heap.clear()
+            self._namespaces.clear()
             self.current_memory = 0
             self.hits = 0
             self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
     
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
@@ -119,32 +202,188 @@ class LRUCache:
             total_requests = self.hits + self.misses
             hit_rate = self.hits / total_requests if total_requests > 0 else 0
             
+            namespaces = {}
+            for namespace, (hits, misses, evictions) in self._namespaces.items():
+                requests = hits + misses
+                namespaces[namespace] = {
+                    'hits': hits,
+                    'misses': misses,
+                    'evictions': evictions,
+                    'hit_rate': hits / requests if requests > 0 else 0
+                }
+            
             return {
                 'size': len(self.cache),
                 'memory_mb': self.current_memory / (1024 * 1024),
                 'hits': self.hits,
                 'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
                 'hit_rate': hit_rate,
-                'total_requests': total_requests
+                'total_requests': total_requests,
+                'namespaces': namespaces
             }
     
-    def _estimate_size(self, obj: Any) -> int:
-        """Estimate object size in bytes"""
+    def _expire(self, now: float):
+        """Drop every entry whose TTL has passed (caller holds the lock)"""
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self.cache.get(key)
+            # Skip heap items left behind by overwritten or evicted keys
+            if entry is not None and entry.expires_at == expires_at:
+                del self.cache[key]
+                self.current_memory -= entry.size_bytes
+                self.expirations += 1
+    
+    def _namespace_counts(self, key: str) -> List[int]:
+        """[hits, misses, evictions] for the key's namespace (caller holds the lock)"""
+        namespace, separator, _ = key.partition(':')
+        if not separator:
+            namespace = 'default'
+        counts = self._namespaces.get(namespace)
+        if counts is None:
+            counts = self._namespaces[namespace] = [0, 0, 0]
+        return counts
+
+class DiskCache(abc.ABC):
+    """Interface for the persistent second cache tier"""
+    
+    @abc.abstractmethod
+    def get(self, key: str, default: Any = None) -> Any:
+        """Stored value for a key, or default if missing or expired"""
+    
+    @abc.abstractmethod
+    def set(self, key: str, value: Any, ttl_seconds: int = 3600):
+        """Store a value (unpicklable or oversized values may be skipped)"""
+    
+    @abc.abstractmethod
+    def delete(self, key: str):
+        """Remove a key if present"""
+    
+    @abc.abstractmethod
+    def clear(self):
+        """Remove every entry"""
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {}
+
+class SQLiteDiskCache(DiskCache):
+    """Pickled values in SQLite with TTL expiry and least-recently-used size eviction"""
+    
+    def __init__(self, db_path: Optional[str] = None, max_size_mb: int = 512):
+        if db_path is None:
+            base = Path("/tmp") if os.environ.get('RENDER') == 'true' else Path("./data/cache")
+            db_path = str(base / "performance_cache.db")
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        
+        self.db_path = db_path
+        self.max_bytes = max_size_mb * 1024 * 1024
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache_entries (last_access)")
+        self.current_bytes = self.conn.execute(
+            "SELECT COALESCE(SUM(size_bytes), 0) FROM cache_entries").fetchone()[0]
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            
+            now = time.time()
+            if row[1] < now:
+                self._delete(key)
+                self.misses += 1
+                return default
+            
+            self.conn.execute("UPDATE cache_entries SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        
         try:
-            if isinstance(obj, str):
-                return len(obj.encode('utf-8'))
-            elif isinstance(obj, bytes):
-                return len(obj)
-            elif isinstance(obj, (int, float)):
-                return 8
-            elif isinstance(obj, (list, dict)):
-                # Rough estimate
-                return len(json.dumps(obj).encode('utf-8'))
-            else:
-                # Fallback
-                return 1024
-        except:
-            return 1024
+            return pickle.loads(row[0])
+        except Exception as e:
+            logger.warning(f"Dropping unreadable disk cache entry {key}: {e}")
+            self.delete(key)
+            return default
+    
+    def set(self, key: str, value: Any, ttl_seconds: int = 3600):
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.debug(f"Value for {key} is not picklable, skipping disk cache: {e}")
+            return
+        if len(data) > self.max_bytes:
+            return
+        
+        now = time.time()
+        with self.lock:
+            self._delete(key)
+            self.conn.execute(
+                "INSERT INTO cache_entries (key, value, size_bytes, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now + ttl_seconds, now))
+            self.current_bytes += len(data)
+            if self.current_bytes > self.max_bytes:
+                self._evict(now)
+    
+    def delete(self, key: str):
+        with self.lock:
+            self._delete(key)
+    
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM cache_entries")
+            self.current_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            total_requests = self.hits + self.misses
+            size = self.conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+            return {
+                'size': size,
+                'memory_mb': self.current_bytes / (1024 * 1024),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total_requests if total_requests > 0 else 0
+            }
+    
+    def _delete(self, key: str):
+        row = self.conn.execute("SELECT size_bytes FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        if row:
+            self.conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            self.current_bytes -= row[0]
+    
+    def _evict(self, now: float):
+        """Drop expired entries, then least recently used ones down to 90% of the limit"""
+        self.conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (now,))
+        target = self.max_bytes * 0.9
+        total = self.conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM cache_entries").fetchone()[0]
+        for key, size in self.conn.execute(
+                "SELECT key, size_bytes FROM cache_entries ORDER BY last_access").fetchall():
+            if total <= target:
+                break
+            self.conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+        self.current_bytes = total
 
 class AsyncProcessor:
     """Async processing manager"""
@@ -247,41 +486,101 @@ class ResourceMonitor:
 class PerformanceOptimizer:
     """Central performance optimization manager"""
     
-    def __init__(self):
+    def __init__(self, disk_cache: Optional[DiskCache] = None):
         self.cache = LRUCache(max_size=1000, max_memory_mb=100)
+        self.disk_cache = disk_cache
         self.async_processor = AsyncProcessor(max_workers=4)
         self.resource_monitor = ResourceMonitor()
         self.metrics = []
         self.optimization_enabled = True
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
     
-    def cached(self, ttl_seconds: int = 3600):
-        """Decorator for caching function results"""
+    def set_disk_cache(self, disk_cache: Optional[DiskCache]):
+        """Plug in (or remove) the persistent second cache tier"""
+        self.disk_cache = disk_cache
+    
+    def get_disk_cache(self) -> DiskCache:
+        """Persistent tier, creating the default SQLite cache on first use"""
+        if self.disk_cache is None:
+            self.disk_cache = SQLiteDiskCache()
+        return self.disk_cache
+    
+    def cached(self, ttl_seconds: int = 3600, persistent: bool = False):
+        """
+        Decorator for caching function results.
+        
+        Results are kept in memory; with persistent=True they are also written to
+        the disk tier so they survive restarts. Concurrent calls with the same
+        arguments wait for a single computation instead of each running it.
+        Every caller gets its own deep copy, so mutating a result never changes
+        the cached value (or lets the memory and disk tiers disagree).
+        
+        Arguments are keyed by value. Other objects, such as `self` for methods,
+        are keyed by their cache_identity() if they define one; otherwise only
+        by identity within this process, and such calls skip the disk tier.
+        """
         def decorator(func):
+            func_id = f"{func.__module__}.{func.__qualname__}"
+            
             @wraps(func)
             def wrapper(*args, **kwargs):
                 if not self.optimization_enabled:
                     return func(*args, **kwargs)
                 
                 # Create cache key
-                cache_key = self._create_cache_key(func.__name__, args, kwargs)
+                cache_key, stable = self._create_cache_key(func_id, args, kwargs)
+                persist = persistent and stable
                 
                 # Check cache
-                cached_value = self.cache.get(cache_key)
-                if cached_value is not None:
+                cached_value = self._lookup(cache_key, ttl_seconds, persist)
+                if cached_value is not _MISSING:
                     logger.debug(f"Cache hit for {func.__name__}")
-                    return cached_value
-                
-                # Execute function
-                result = func(*args, **kwargs)
+                    return copy.deepcopy(cached_value)
                 
-                # Store in cache
-                self.cache.set(cache_key, result, ttl_seconds)
-                
-                return result
+                return copy.deepcopy(self._compute_once(cache_key, ttl_seconds, persist,
+                                                        lambda: func(*args, **kwargs)))
             
             return wrapper
         return decorator
     
+    def _lookup(self, cache_key: str, ttl_seconds: int, persistent: bool) -> Any:
+        """Memory tier first, then the disk tier (promoting hits into memory)"""
+        value = self.cache.get(cache_key, _MISSING)
+        if value is _MISSING and persistent:
+            value = self.get_disk_cache().get(cache_key, _MISSING)
+            if value is not _MISSING:
+                self.cache.set(cache_key, value, ttl_seconds)
+        return value
+    
+    def _compute_once(self, cache_key: str, ttl_seconds: int, persistent: bool, compute: Callable) -> Any:
+        """Single-flight: the first caller computes, concurrent callers share its result"""
+        with self._inflight_lock:
+            future = self._inflight.get(cache_key)
+            leader = future is None
+            if leader:
+                future = self._inflight[cache_key] = Future()
+        
+        if not leader:
+            return future.result()
+        
+        try:
+            # Another caller may have filled the cache while we acquired leadership
+            result = self._lookup(cache_key, ttl_seconds, persistent)
+            if result is _MISSING:
+                result = compute()
+                self.cache.set(cache_key, result, ttl_seconds)
+                if persistent:
+                    self.get_disk_cache().set(cache_key, result, ttl_seconds)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(cache_key, None)
+    
     def measure_performance(self, operation_name: str = None):
         """Decorator to measure function performance"""
         def decorator(func):
@@ -393,26 +692,62 @@ class PerformanceOptimizer:
             'system_stats': self.resource_monitor.get_system_stats()
         }
     
-    def _create_cache_key(self, func_name: str, args: tuple, kwargs: dict) -> str:
-        """Create cache key from function arguments"""
-        key_parts = [func_name]
-        
-        # Add args
-        for arg in args:
-            if isinstance(arg, (str, int, float, bool)):
-                key_parts.append(str(arg))
-            else:
-                # Hash complex objects
-                key_parts.append(hashlib.md5(str(arg).encode()).hexdigest())
-        
-        # Add kwargs
-        for k, v in sorted(kwargs.items()):
-            key_parts.append(f"{k}={v}")
-        
-        return ":".join(key_parts)
+    def _create_cache_key(self, func_name: str, args: tuple, kwargs: dict) -> Tuple[str, bool]:
+        """Cache key from function arguments, and whether it is stable across processes"""
+        digest = hashlib.sha256()
+        stable = self._hash_value(digest, args)
+        stable = self._hash_value(digest, sorted(kwargs.items())) and stable
+        return f"{func_name}:{digest.hexdigest()}", stable
+    
+    def _hash_value(self, digest, value: Any) -> bool:
+        """Feed a type-tagged canonical encoding of a value into a hash; False if process-local"""
+        stable = True
+        if value is None or isinstance(value, (bool, int, float, str)):
+            digest.update(f"{type(value).__name__}:{value!r};".encode('utf-8'))
+        elif callable(getattr(value, 'cache_identity', None)) and not isinstance(value, type):
+            digest.update(f"identity:{type(value).__qualname__}(".encode('utf-8'))
+            stable = self._hash_value(digest, value.cache_identity())
+            digest.update(b");")
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            digest.update(b"bytes:%d;" % len(value))
+            digest.update(value)
+        elif NUMPY_AVAILABLE and isinstance(value, np.ndarray):
+            digest.update(f"ndarray:{value.dtype.str}:{value.shape};".encode('utf-8'))
+            digest.update(np.ascontiguousarray(value).tobytes())
+        elif isinstance(value, enum.Enum):
+            digest.update(f"enum:{type(value).__qualname__}.{value.name};".encode('utf-8'))
+        elif is_dataclass(value) and not isinstance(value, type):
+            digest.update(f"dataclass:{type(value).__qualname__}(".encode('utf-8'))
+            for field in fields(value):
+                digest.update(f"{field.name}=".encode('utf-8'))
+                stable = self._hash_value(digest, getattr(value, field.name)) and stable
+            digest.update(b");")
+        elif isinstance(value, dict):
+            digest.update(b"dict(")
+            for item in sorted(value.items(), key=lambda kv: repr(kv[0])):
+                stable = self._hash_value(digest, item) and stable
+            digest.update(b");")
+        elif isinstance(value, (list, tuple)):
+            digest.update(f"{type(value).__name__}(".encode('utf-8'))
+            for item in value:
+                stable = self._hash_value(digest, item) and stable
+            digest.update(b");")
+        elif isinstance(value, (set, frozenset)):
+            digest.update(b"set(")
+            for item in sorted(value, key=repr):
+                stable = self._hash_value(digest, item) and stable
+            digest.update(b");")
+        elif type(value).__repr__ is object.__repr__:
+            # The default repr is just the memory address: same-process identity only
+            digest.update(f"object:{type(value).__qualname__}@{id(value)};".encode('utf-8'))
+            stable = False
+        else:
+            # Other objects are keyed by their repr, as before
+            digest.update(f"object:{type(value).__qualname__}:{value!r};".encode('utf-8'))
+        return stable
     
     def cleanup(self):
-        """Cleanup resources"""
+        """Cleanup resources (the persistent tier is kept; clear it explicitly)"""
         self.cache.clear()
         self.async_processor.shutdown()
         self.metrics.clear()
@@ -0,0 +1,173 @@
+"""
+Processing Cache Module
+=======================
+
+Reuses processing results for page text that has already been processed with the
+same mode, parameters and models, so revisiting a page or re-running a mode on a
+popular document does not recompute keywords, summaries, questions or themes.
+
+Results are keyed by (page text hash, processing mode, normalized parameters,
+model version) and persisted through DatabaseManager.store_processing_result;
+a small in-memory LRU sits in front of the database. Changing a mode's entry in
+PROCESSING_MODE_VERSIONS or the model version yields new keys, so stale results
+are never returned; their keys are released by purge_stale() once they age out.
+"""
+
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Dict, List, Optional, Any
+
+from .database_manager import DatabaseManager
+from .intelligent_processor import ProcessingResult
+
+logger = logging.getLogger(__name__)
+
+# Bump a mode's version when its processing logic changes
+PROCESSING_MODE_VERSIONS = {
+    "Keyword Analysis": 1,
+    "Context Extraction": 1,
+    "Q&A Generation": 1,
+    "Summary Creation": 1,
+    "Entity Extraction": 1,
+    "Theme Analysis": 1,
+    "Structure Analysis": 1,
+    "Content Insights": 1,
+}
+
+def normalize_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop unset parameters and canonicalize values so equivalent requests share a key"""
+    normalized = {}
+    for name, value in params.items():
+        if isinstance(value, str):
+            value = ' '.join(value.split())
+        elif isinstance(value, (list, tuple, set)):
+            value = sorted({' '.join(str(v).split()) for v in value} - {''})
+        elif isinstance(value, float):
+            value = round(value, 4)
+        if value not in (None, '', []):
+            normalized[name] = value
+    return normalized
+
+def processing_cache_key(text: str, mode: str, params: Dict[str, Any], model_version: str) -> str:
+    """Cache key for processing a page of text with a mode"""
+    text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    identity = json.dumps({
+        'mode': mode,
+        'mode_version': PROCESSING_MODE_VERSIONS.get(mode, 0),
+        'params': normalize_params(params),
+        'model_version': model_version
+    }, sort_keys=True, default=str)
+    return f"{text_hash}:{hashlib.sha256(identity.encode('utf-8')).hexdigest()[:32]}"
+
+class ProcessingResultCache:
+    """Stored processing results looked up by processing_cache_key()"""
+
+    def __init__(self, db: Optional[DatabaseManager] = None, max_entries: int = 256):
+        self.db = db
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, List[ProcessingResult]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, cache_key: str, page_number: int) -> Optional[List[ProcessingResult]]:
+        """Copies of the stored results for a key, attributed to page_number (None on a miss)"""
+        with self._lock:
+            results = self._memory.get(cache_key)
+            if results is not None:
+                self._memory.move_to_end(cache_key)
+
+        if results is None and self.db is not None:
+            try:
+                records = self.db.get_cached_processing_results(cache_key)
+            except RuntimeError as e:
+                logger.warning(f"Processing cache lookup failed: {e}")
+                records = []
+            if records:
+                results = [self._from_record(record) for record in records]
+                self._remember(cache_key, results)
+
+        if results is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return [
+            replace(result, source_page=page_number, metadata={**result.metadata, 'from_cache': True})
+            for result in results
+        ]
+
+    def put(self, cache_key: str, results: List[ProcessingResult]):
+        """Keep freshly computed results in memory (the database copy is written with the results)"""
+        if results:
+            # Copies, so callers mutating their results cannot change later hits
+            self._remember(cache_key, [replace(result, metadata=dict(result.metadata)) for result in results])
+
+    def invalidate(self, processing_mode: Optional[str] = None):
+        """Stop reusing stored results for one mode, or for all modes"""
+        with self._lock:
+            self._memory.clear()
+        if self.db is not None:
+            try:
+                count = self.db.invalidate_processing_cache(processing_mode)
+                logger.info(f"Invalidated {count} cached processing results"
+                            + (f" for {processing_mode}" if processing_mode else ""))
+            except RuntimeError as e:
+                logger.warning(f"Processing cache invalidation failed: {e}")
+
+    def purge_stale(self, max_age_days: Optional[int] = None) -> int:
+        """Release database cache keys of superseded runs and of results past retention"""
+        if self.db is None:
+            return 0
+        try:
+            count = self.db.purge_processing_cache(max_age_days)
+            logger.info(f"Released {count} stale processing cache keys")
+            return count
+        except RuntimeError as e:
+            logger.warning(f"Processing cache purge failed: {e}")
+            return 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        total_requests = self.hits + self.misses
+        return {
+            'memory_entries': len(self._memory),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total_requests if total_requests > 0 else 0
+        }
+
+    def _remember(self, cache_key: str, results: List[ProcessingResult]):
+        with self._lock:
+            self._memory[cache_key] = results
+            self._memory.move_to_end(cache_key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    @staticmethod
+    def _from_record(record) -> ProcessingResult:
+        """Rebuild a processor result from a database record"""
+        data = record.result_data
+        return ProcessingResult(
+            id=data.get('id', record.result_id),
+            type=data.get('type', ''),
+            content=data.get('content', ''),
+            source_text=data.get('source_text', ''),
+            source_page=record.page_number,
+            confidence=record.confidence,
+            metadata=data.get('metadata') or {},
+            timestamp=data.get('timestamp', record.created_at.isoformat())
+        )
+
+# Global instance, shared across Streamlit reruns
+processing_cache = ProcessingResultCache()
+
+def get_processing_cache(db: Optional[DatabaseManager] = None) -> ProcessingResultCache:
+    """Get the global processing result cache, attaching a database (and purging it) if it has none"""
+    if db is not None and processing_cache.db is None:
+        processing_cache.db = db
+        processing_cache.purge_stale()
+    return processing_cache
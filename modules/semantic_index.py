@@ -0,0 +1,289 @@
+"""
+Semantic Index Module
+=====================
+
+Chunk-level embedding index for semantic search and retrieval over whole documents.
+
+Documents are split into fixed-size, overlapping word chunks that are embedded once
+and cached by document hash. Queries cost a single query embedding followed by a
+matrix-vector product (or an HNSW lookup for very large corpora).
+
+Features:
+- Fixed-size chunking with page attribution
+- Batched, normalized chunk embeddings cached in memory and on disk
+- Exact top-k via matrix-vector product, optional HNSW for big documents
+- Per-chunk token counts for prompt budgeting
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Iterable, Union
+
+import numpy as np
+
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    HNSWLIB_AVAILABLE = False
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_token_encoder = None
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken when available, otherwise estimate from characters"""
+    global _token_encoder, TIKTOKEN_AVAILABLE
+    if TIKTOKEN_AVAILABLE:
+        try:
+            if _token_encoder is None:
+                _token_encoder = tiktoken.get_encoding("cl100k_base")
+            return len(_token_encoder.encode(text))
+        except Exception as e:
+            # Encoding files could not be loaded (e.g. offline); stop retrying
+            logger.warning(f"tiktoken unavailable, estimating token counts: {e}")
+            TIKTOKEN_AVAILABLE = False
+    return max(1, len(text) // 4)
+
+@dataclass
+class DocumentChunk:
+    """A fixed-size slice of document text"""
+    chunk_id: int
+    text: str
+    page_number: int
+    token_count: int
+
+class DocumentSemanticIndex:
+    """Normalized chunk embeddings for a single document"""
+
+    def __init__(self, doc_hash: str, chunks: List[DocumentChunk], embeddings: np.ndarray,
+                 ann_threshold: int = 20000):
+        self.doc_hash = doc_hash
+        self.chunks = chunks
+        self.embeddings = embeddings.astype(np.float32, copy=False)
+        self.ann_index = None
+
+        if HNSWLIB_AVAILABLE and len(chunks) >= ann_threshold:
+            self.ann_index = hnswlib.Index(space='ip', dim=self.embeddings.shape[1])
+            self.ann_index.init_index(max_elements=len(chunks), ef_construction=200, M=16)
+            self.ann_index.add_items(self.embeddings, np.arange(len(chunks)))
+            self.ann_index.set_ef(64)
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def search(self, query_embedding: np.ndarray, top_k: int = 5) -> List[Tuple[DocumentChunk, float]]:
+        """Top-k chunks by cosine similarity to a normalized query embedding"""
+        if not self.chunks:
+            return []
+        top_k = min(top_k, len(self.chunks))
+
+        if self.ann_index is not None:
+            labels, distances = self.ann_index.knn_query(query_embedding, k=top_k)
+            # Inner-product space reports 1 - dot; convert back to cosine similarity
+            return [(self.chunks[int(i)], 1.0 - float(d)) for i, d in zip(labels[0], distances[0])]
+
+        scores = self.embeddings @ query_embedding.astype(np.float32, copy=False)
+        if top_k < len(scores):
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            candidates = np.arange(len(scores))
+        ranked = candidates[np.argsort(-scores[candidates])]
+        return [(self.chunks[int(i)], float(scores[i])) for i in ranked]
+
+class SemanticIndexManager:
+    """Builds, caches and queries chunk indexes keyed by document hash"""
+
+    def __init__(self, encoder=None, model_name: str = "all-MiniLM-L6-v2",
+                 chunk_words: int = 120, overlap_words: int = 20,
+                 cache_dir: Optional[str] = None, max_indexes: int = 8):
+        self.encoder = encoder
+        self.model_name = model_name
+        self.chunk_words = chunk_words
+        self.overlap_words = overlap_words
+        self.max_indexes = max_indexes
+
+        if cache_dir:
+            self.cache_dir = Path(cache_dir)
+        elif os.environ.get('RENDER') == 'true':
+            self.cache_dir = Path("/tmp/semantic_index")
+        else:
+            self.cache_dir = Path("./data/semantic_index")
+
+        self._indexes: Dict[str, DocumentSemanticIndex] = {}
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="semantic-index")
+
+    @property
+    def available(self) -> bool:
+        """Whether an embedding model is configured"""
+        return self.encoder is not None
+
+    def set_encoder(self, encoder, model_name: Optional[str] = None):
+        """Attach an embedding model exposing encode() (e.g. SentenceTransformer)"""
+        self.encoder = encoder
+        if model_name:
+            self.model_name = model_name
+
+    def chunk_pages(self, pages: Iterable[Tuple[int, str]]) -> List[DocumentChunk]:
+        """Split page texts into overlapping fixed-size word chunks"""
+        chunks = []
+        step = max(1, self.chunk_words - self.overlap_words)
+
+        for page_number, text in pages:
+            words = (text or "").split()
+            for start in range(0, len(words), step):
+                chunk_text = ' '.join(words[start:start + self.chunk_words])
+                chunks.append(DocumentChunk(
+                    chunk_id=len(chunks),
+                    text=chunk_text,
+                    page_number=page_number,
+                    token_count=count_tokens(chunk_text)
+                ))
+                if start + self.chunk_words >= len(words):
+                    break
+
+        return chunks
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Batch-embed texts into L2-normalized float32 vectors"""
+        vectors = np.asarray(self.encoder.encode(texts, batch_size=64, show_progress_bar=False),
+                             dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def build(self, doc_hash: str, pages: Iterable[Tuple[int, str]]) -> Optional[DocumentSemanticIndex]:
+        """Build (or load from cache) the index for a document"""
+        if not self.available:
+            return None
+
+        existing = self.get(doc_hash, wait=False)
+        if existing is not None:
+            return existing
+
+        doc_index = self._load_from_disk(doc_hash)
+        if doc_index is None:
+            start_time = time.perf_counter()
+            chunks = self.chunk_pages(pages)
+            embeddings = self.embed([c.text for c in chunks]) if chunks else np.zeros((0, 1), dtype=np.float32)
+            doc_index = DocumentSemanticIndex(doc_hash, chunks, embeddings)
+            self._save_to_disk(doc_index)
+            logger.info(f"Built semantic index for {doc_hash[:12]}: {len(chunks)} chunks "
+                        f"in {time.perf_counter() - start_time:.2f}s")
+
+        self._remember(doc_index)
+        return doc_index
+
+    def build_async(self, doc_hash: str, source: Union[bytes, str], file_type: str) -> Optional[Future]:
+        """Build the index in the background from a document file path or bytes.
+        
+        The worker reads pages with its own iter_pages() pass over the document, so
+        the caller never extracts page text and no renderer is shared across threads.
+        """
+        if not self.available:
+            return None
+        with self._lock:
+            if doc_hash in self._indexes:
+                return None
+            if doc_hash not in self._pending:
+                future = self._executor.submit(self._build_from_source, doc_hash, source, file_type)
+                self._pending[doc_hash] = future
+                # Registered after the future is pending, so a build that already finished still clears it
+                future.add_done_callback(lambda done: self._clear_pending(doc_hash, done))
+            return self._pending.get(doc_hash)
+    
+    def _build_from_source(self, doc_hash: str, source: Union[bytes, str],
+                           file_type: str) -> Optional[DocumentSemanticIndex]:
+        from .universal_document_reader import iter_pages
+        pages = ((page.page_number, page.text_content or "") for page in iter_pages(source, file_type))
+        return self.build(doc_hash, pages)
+    
+    def _clear_pending(self, doc_hash: str, future: Future):
+        with self._lock:
+            if self._pending.get(doc_hash) is future:
+                del self._pending[doc_hash]
+
+    def get(self, doc_hash: str, wait: bool = True) -> Optional[DocumentSemanticIndex]:
+        """Index for a document, optionally waiting for a background build"""
+        with self._lock:
+            doc_index = self._indexes.get(doc_hash)
+            future = self._pending.get(doc_hash)
+
+        if doc_index is None and future is not None and wait:
+            try:
+                doc_index = future.result()
+            except Exception as e:
+                logger.error(f"Background semantic indexing failed for {doc_hash[:12]}: {e}")
+        return doc_index
+
+    def search(self, doc_hash: str, query: str, top_k: int = 5,
+               pages: Optional[Iterable[Tuple[int, str]]] = None) -> List[Tuple[DocumentChunk, float]]:
+        """Top-k chunks for a query, building the index from pages if it does not exist yet"""
+        if not self.available or not query.strip():
+            return []
+
+        doc_index = self.get(doc_hash)
+        if doc_index is None and pages is not None:
+            doc_index = self.build(doc_hash, pages)
+        if doc_index is None:
+            return []
+
+        query_embedding = self.embed([query])[0]
+        return doc_index.search(query_embedding, top_k)
+
+    def _remember(self, doc_index: DocumentSemanticIndex):
+        """Keep the most recently built indexes in memory"""
+        with self._lock:
+            self._indexes.pop(doc_index.doc_hash, None)
+            self._indexes[doc_index.doc_hash] = doc_index
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.pop(next(iter(self._indexes)))
+
+    def _cache_path(self, doc_hash: str) -> Path:
+        model_tag = ''.join(c if c.isalnum() else '_' for c in self.model_name)
+        return self.cache_dir / f"{doc_hash}_{model_tag}_{self.chunk_words}_{self.overlap_words}.npz"
+
+    def _save_to_disk(self, doc_index: DocumentSemanticIndex):
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            chunks_json = json.dumps([asdict(c) for c in doc_index.chunks])
+            with open(self._cache_path(doc_index.doc_hash), 'wb') as f:
+                np.savez(f, embeddings=doc_index.embeddings, chunks=np.array(chunks_json))
+        except OSError as e:
+            logger.warning(f"Could not cache semantic index for {doc_index.doc_hash[:12]}: {e}")
+
+    def _load_from_disk(self, doc_hash: str) -> Optional[DocumentSemanticIndex]:
+        path = self._cache_path(doc_hash)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                chunks = [DocumentChunk(**c) for c in json.loads(str(data['chunks']))]
+                return DocumentSemanticIndex(doc_hash, chunks, data['embeddings'])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable semantic index cache {path}: {e}")
+            return None
+
+# Global instance
+semantic_index = SemanticIndexManager()
+
+def get_semantic_index_manager(encoder=None) -> SemanticIndexManager:
+    """Get the global semantic index manager, attaching an encoder if it has none"""
+    if encoder is not None and not semantic_index.available:
+        semantic_index.set_encoder(encoder)
+    return semantic_index
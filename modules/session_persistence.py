@@ -240,7 +240,8 @@ class SessionPersistence:
         self.db.update_session(self._session_id, session_data)
     
     def store_document(self, file_content: bytes, filename: str, 
-                      format_type: str, metadata: Dict[str, Any] = None) -> str:
+                      format_type: str, metadata: Dict[str, Any] = None,
+                      file_hash: Optional[str] = None, storage_path: Optional[str] = None) -> str:
         """Store document in database and return document ID"""
         if not self._initialized:
             self.initialize_session()
@@ -250,7 +251,9 @@ class SessionPersistence:
             filename=filename,
             content=file_content,
             format_type=format_type,
-            metadata=metadata
+            metadata=metadata,
+            file_hash=file_hash,
+            storage_path=storage_path
         )
         
         # Update session state with current document
@@ -298,7 +301,8 @@ class SessionPersistence:
         return content
     
     def save_processing_result(self, processing_mode: str, page_number: int,
-                              result_data: Dict[str, Any], confidence: float) -> str:
+                              result_data: Dict[str, Any], confidence: float,
+                              cache_key: str = None) -> str:
         """Save processing result to database"""
         if not self._initialized or 'current_document_id' not in st.session_state:
             return ""
@@ -311,7 +315,8 @@ class SessionPersistence:
             processing_mode=processing_mode,
             page_number=page_number,
             result_data=result_data,
-            confidence=confidence
+            confidence=confidence,
+            cache_key=cache_key
         )
         
         # Record analytics event
@@ -507,6 +512,10 @@ class SessionPersistence:
         """Clean up old sessions"""
         return self.db.cleanup_old_sessions(days)
     
+    def compact_analytics(self, raw_retention_days: int = None, hourly_retention_days: int = None):
+        """Purge raw analytics events outside the retention window"""
+        return self.db.compact_analytics(raw_retention_days, hourly_retention_days)
+    
     # Utility methods for Streamlit integration
     def sync_to_database(self):
         """Manually sync session state to database"""
@@ -12,12 +12,24 @@ Features:
 - Search and navigation capabilities
 - Bookmark management
 - Table of contents extraction
+- Rendered page cache with neighbour prefetch
+- Low-resolution page thumbnails cached on disk
+- Lazy page iteration straight from files
 """
 
 import os
 import io
+import re
+import math
+import mmap
+import hashlib
 import logging
-from typing import Dict, List, Any, Optional, Tuple, Union
+import threading
+import multiprocessing
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+from typing import Dict, List, Any, Optional, Tuple, Union, Iterator
 from datetime import datetime
 from pathlib import Path
 
@@ -83,6 +95,120 @@ class DocumentPage:
         self.annotations = kwargs.get('annotations', [])
         self.links = kwargs.get('links', [])
 
+class PageRenderCache:
+    """Thread-safe LRU of rendered page images, bounded by total bytes"""
+    
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Tuple) -> Optional[bytes]:
+        """Get a cached image and mark it most recently used"""
+        with self.lock:
+            data = self.entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return data
+    
+    def put(self, key: Tuple, data: bytes):
+        """Cache an image, evicting least recently used entries to stay under max_bytes"""
+        if len(data) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= len(old)
+            while self.entries and self.current_bytes + len(data) > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+            self.entries[key] = data
+            self.current_bytes += len(data)
+    
+    def __contains__(self, key: Tuple) -> bool:
+        with self.lock:
+            return key in self.entries
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'memory_mb': self.current_bytes / (1024 * 1024),
+                'hit_rate': self.hits / total if total else 0
+            }
+
+# Shared across renderers and reruns; keyed by (document hash, page, zoom)
+page_render_cache = PageRenderCache()
+
+THUMBNAIL_WIDTH = 160
+THUMBNAIL_QUALITY = 70
+# Upper bound on thumbnail worker processes, whatever the core count
+THUMBNAIL_MAX_WORKERS = 4
+
+def thumbnail_cache_dir() -> Path:
+    """Root directory of the on-disk thumbnail cache"""
+    if os.environ.get('RENDER') == 'true':
+        return Path("/tmp/thumbnails")
+    return Path("./data/thumbnails")
+
+def thumbnail_path(doc_hash: str, page_number: int, width: int = THUMBNAIL_WIDTH) -> Path:
+    return thumbnail_cache_dir() / doc_hash / f"{page_number}_{width}.jpg"
+
+def cached_thumbnail(doc_hash: str, page_number: int = 1, width: int = THUMBNAIL_WIDTH) -> Optional[bytes]:
+    """Previously generated thumbnail for a document page, if any"""
+    try:
+        return thumbnail_path(doc_hash, page_number, width).read_bytes()
+    except OSError:
+        return None
+
+def _write_thumbnail(page, path: Path, width: int):
+    """Rasterize a page at the zoom that makes it `width` pixels wide and save it as JPEG"""
+    zoom = width / max(page.rect.width, 1)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+    data = pix.tobytes("jpeg", jpg_quality=THUMBNAIL_QUALITY)
+    # Write-then-rename so readers never see a partial file
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+    return data
+
+# Per-process document for thumbnail workers (PyMuPDF objects cannot be shared)
+_thumbnail_worker_doc = None
+
+# One background thread schedules thumbnail jobs for all documents, so at most one
+# worker pool exists at a time. Workers are spawned rather than forked: forking from
+# a threaded server copies locks held by other threads into the children.
+_thumbnail_scheduler = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-thumbnails")
+
+# Neighbor prefetching for all renderers shares one background thread
+_prefetch_scheduler = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-prefetch")
+
+def _init_thumbnail_worker(source: Union[bytes, str]):
+    global _thumbnail_worker_doc
+    if isinstance(source, str):
+        _thumbnail_worker_doc = fitz.open(source)
+    else:
+        _thumbnail_worker_doc = fitz.open(stream=source, filetype="pdf")
+
+def _render_thumbnail_batch(page_numbers: List[int], doc_hash: str, width: int) -> int:
+    """Render a batch of thumbnails in a worker process"""
+    rendered = 0
+    for page_number in page_numbers:
+        try:
+            _write_thumbnail(_thumbnail_worker_doc[page_number - 1],
+                             thumbnail_path(doc_hash, page_number, width), width)
+            rendered += 1
+        except Exception as e:
+            logger.debug(f"Thumbnail for page {page_number} failed: {e}")
+    return rendered
+
 class BaseRenderer:
     """Base class for document renderers"""
     
@@ -117,13 +243,48 @@ class BaseRenderer:
     def extract_table_of_contents(self) -> List[Dict]:
         """Extract table of contents"""
         return []
+    
+    def render_thumbnail(self, page_number: int, width: int = THUMBNAIL_WIDTH,
+                         cached_only: bool = False) -> Optional[bytes]:
+        """Small preview image of a page (formats without page images have none)"""
+        return None
+    
+    def is_page_rendered(self, page_number: int, zoom: float = 1.0) -> bool:
+        """Whether render_page can be served without rasterizing"""
+        return False
+    
+    def generate_thumbnails_async(self, width: int = THUMBNAIL_WIDTH) -> Optional[Future]:
+        """Start generating thumbnails for every page in the background"""
+        return None
 
 class PDFRenderer(BaseRenderer):
     """Enhanced PDF renderer using PyMuPDF"""
     
-    def __init__(self):
+    # Pages around the viewed page rendered ahead of time
+    PREFETCH_OFFSETS = (1, -1, 2, -2)
+    # Pages per worker task when generating thumbnails in bulk
+    THUMBNAIL_BATCH_SIZE = 25
+    # Pages whose text, text blocks and character index are kept (LRU per cache)
+    PAGE_CACHE_MAX_PAGES = 256
+    
+    def __init__(self, render_cache: Optional[PageRenderCache] = None):
         super().__init__()
         self.doc = None
+        self.doc_hash = None
+        self.render_cache = render_cache or page_render_cache
+        # PyMuPDF documents are not safe for concurrent use
+        self._doc_lock = threading.RLock()
+        self._text_cache: "OrderedDict[int, str]" = OrderedDict()
+        self._blocks_cache: "OrderedDict[int, List[Dict]]" = OrderedDict()
+        # page -> (search text, flat x0, y0, x1, y1 per character; NaN for inserted separators)
+        self._char_index_cache: "OrderedDict[int, Tuple[str, array]]" = OrderedDict()
+        self._page_cache_lock = threading.Lock()
+        # Bumped on every page request; older prefetch jobs stop at their next page
+        self._prefetch_generation = 0
+        self._prefetch_job: Optional[Future] = None
+        self._source = None
+        self._thumbnail_jobs: Dict[Tuple[str, int], Future] = {}
+        self._thumbnail_lock = threading.RLock()
         
     def load(self, file_data: Union[bytes, str]) -> bool:
         """Load PDF from bytes or file path"""
@@ -132,10 +293,21 @@ class PDFRenderer(BaseRenderer):
                 logger.error("PyMuPDF not available for PDF rendering")
                 return False
             
-            if isinstance(file_data, str):
-                self.doc = fitz.open(file_data)
-            else:
-                self.doc = fitz.open(stream=file_data, filetype="pdf")
+            self._cancel_prefetch()
+            with self._doc_lock:
+                if isinstance(file_data, str):
+                    self.doc = fitz.open(file_data)
+                    stat = os.stat(file_data)
+                    self.doc_hash = hashlib.sha256(
+                        f"{os.path.abspath(file_data)}:{stat.st_size}:{stat.st_mtime_ns}".encode()
+                    ).hexdigest()
+                else:
+                    self.doc = fitz.open(stream=file_data, filetype="pdf")
+                    self.doc_hash = hashlib.sha256(file_data).hexdigest()
+                self._source = file_data
+                self._text_cache = OrderedDict()
+                self._blocks_cache = OrderedDict()
+                self._char_index_cache = OrderedDict()
             
             logger.info(f"PDF loaded successfully: {self.doc.page_count} pages")
             return True
@@ -171,92 +343,302 @@ class PDFRenderer(BaseRenderer):
             if not self.doc or page_number < 1 or page_number > self.doc.page_count:
                 return None
             
-            page = self.doc[page_number - 1]  # fitz uses 0-based indexing
-            
-            # Create transformation matrix for zoom
-            mat = fitz.Matrix(zoom * 2, zoom * 2)  # High DPI for quality
+            # The requested page wins over neighbors prefetched for an earlier request
+            self._cancel_prefetch()
+            img_data = self.rasterize_page(page_number, zoom)
             
-            # Render page as image
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("png")
+            with self._doc_lock:
+                rect = self.doc[page_number - 1].rect
             
-            # Extract text with positions
-            text_blocks = []
-            try:
-                text_dict = page.get_text("dict")
-                for block in text_dict.get("blocks", []):
-                    if "lines" in block:
-                        for line in block["lines"]:
-                            for span in line["spans"]:
-                                text_blocks.append({
-                                    'text': span['text'],
-                                    'bbox': span['bbox'],
-                                    'font': span.get('font', ''),
-                                    'size': span.get('size', 0),
-                                    'flags': span.get('flags', 0)
-                                })
-            except Exception as e:
-                logger.warning(f"Failed to extract text blocks: {str(e)}")
-            
-            # Extract page text
-            text_content = page.get_text()
-            
-            # Get page dimensions
-            rect = page.rect
-            
-            return DocumentPage(
+            page = DocumentPage(
                 page_number=page_number,
-                text_content=text_content,
+                text_content=self.extract_text(page_number),
                 image_data=img_data,
                 width=rect.width,
                 height=rect.height,
-                text_blocks=text_blocks
+                text_blocks=self.extract_text_blocks(page_number)
             )
             
+            # Warm the pages the reader is likely to open next, once this page is done
+            self._prefetch_neighbors(page_number, zoom)
+            return page
+            
         except Exception as e:
             logger.error(f"Failed to render PDF page {page_number}: {str(e)}")
             return None
     
+    def rasterize_page(self, page_number: int, zoom: float = 1.0) -> Optional[bytes]:
+        """PNG image of a page, served from the render cache when possible"""
+        key = (self.doc_hash, page_number, round(zoom, 3))
+        img_data = self.render_cache.get(key)
+        if img_data is not None:
+            return img_data
+        
+        with self._doc_lock:
+            page = self.doc[page_number - 1]  # fitz uses 0-based indexing
+            
+            # Create transformation matrix for zoom
+            mat = fitz.Matrix(zoom * 2, zoom * 2)  # High DPI for quality
+            
+            # Render page as image
+            pix = page.get_pixmap(matrix=mat)
+            img_data = pix.tobytes("png")
+        
+        self.render_cache.put(key, img_data)
+        return img_data
+    
+    def extract_text_blocks(self, page_number: int) -> List[Dict]:
+        """Text spans with positions and font info (cached per page)"""
+        cached = self._cached_page(self._blocks_cache, page_number)
+        if cached is not None:
+            return cached
+        
+        text_blocks = []
+        try:
+            with self._doc_lock:
+                text_dict = self.doc[page_number - 1].get_text("dict")
+            for block in text_dict.get("blocks", []):
+                if "lines" in block:
+                    for line in block["lines"]:
+                        for span in line["spans"]:
+                            text_blocks.append({
+                                'text': span['text'],
+                                'bbox': span['bbox'],
+                                'font': span.get('font', ''),
+                                'size': span.get('size', 0),
+                                'flags': span.get('flags', 0)
+                            })
+        except Exception as e:
+            logger.warning(f"Failed to extract text blocks: {str(e)}")
+            return text_blocks
+        
+        self._remember_page(self._blocks_cache, page_number, text_blocks)
+        return text_blocks
+    
     def extract_text(self, page_number: int) -> str:
         """Extract text from PDF page"""
         try:
             if not self.doc or page_number < 1 or page_number > self.doc.page_count:
                 return ""
             
-            page = self.doc[page_number - 1]
-            return page.get_text()
+            text = self._cached_page(self._text_cache, page_number)
+            if text is None:
+                with self._doc_lock:
+                    text = self.doc[page_number - 1].get_text()
+                self._remember_page(self._text_cache, page_number, text)
+            return text
             
         except Exception as e:
             logger.error(f"Failed to extract text from PDF page {page_number}: {str(e)}")
             return ""
     
-    def search_text(self, query: str, page_number: int = None) -> List[Dict]:
-        """Search for text in PDF"""
+    def is_page_rendered(self, page_number: int, zoom: float = 1.0) -> bool:
+        return (self.doc_hash, page_number, round(zoom, 3)) in self.render_cache
+    
+    def render_thumbnail(self, page_number: int, width: int = THUMBNAIL_WIDTH,
+                         cached_only: bool = False) -> Optional[bytes]:
+        """Low-resolution JPEG of a page, read from the disk cache or rendered on demand"""
+        if not self.doc or page_number < 1 or page_number > self.doc.page_count:
+            return None
+        
+        data = cached_thumbnail(self.doc_hash, page_number, width)
+        if data is not None or cached_only:
+            return data
+        
+        try:
+            path = thumbnail_path(self.doc_hash, page_number, width)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with self._doc_lock:
+                return _write_thumbnail(self.doc[page_number - 1], path, width)
+        except Exception as e:
+            logger.warning(f"Failed to render thumbnail for page {page_number}: {str(e)}")
+            return None
+    
+    def generate_thumbnails(self, width: int = THUMBNAIL_WIDTH, max_workers: Optional[int] = None) -> int:
+        """Render every missing thumbnail in a process pool; returns the number rendered"""
+        if not self.doc:
+            return 0
+        
+        doc_hash, source = self.doc_hash, self._source
+        missing = [page_number for page_number in range(1, self.doc.page_count + 1)
+                   if not thumbnail_path(doc_hash, page_number, width).exists()]
+        if not missing:
+            return 0
+        
+        thumbnail_path(doc_hash, 1, width).parent.mkdir(parents=True, exist_ok=True)
+        batches = [missing[i:i + self.THUMBNAIL_BATCH_SIZE]
+                   for i in range(0, len(missing), self.THUMBNAIL_BATCH_SIZE)]
+        max_workers = max_workers or min(len(batches), os.cpu_count() or 1, THUMBNAIL_MAX_WORKERS)
+        
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_thumbnail_worker, initargs=(source,)) as pool:
+                rendered = sum(pool.map(_render_thumbnail_batch, batches,
+                                        [doc_hash] * len(batches), [width] * len(batches)))
+        except Exception as e:
+            logger.warning(f"Parallel thumbnail generation failed, rendering serially: {e}")
+            rendered = 0
+            for page_number in missing:
+                # Stop if another document was loaded meanwhile
+                if self.doc_hash != doc_hash:
+                    break
+                if self.render_thumbnail(page_number, width) is not None:
+                    rendered += 1
+        
+        logger.info(f"Generated {rendered} thumbnails for {doc_hash[:12]}")
+        return rendered
+    
+    def generate_thumbnails_async(self, width: int = THUMBNAIL_WIDTH) -> Optional[Future]:
+        """Generate thumbnails in the background, once per document and width"""
+        if not self.doc:
+            return None
+        
+        key = (self.doc_hash, width)
+        with self._thumbnail_lock:
+            if key not in self._thumbnail_jobs:
+                future = _thumbnail_scheduler.submit(self.generate_thumbnails, width)
+                self._thumbnail_jobs[key] = future
+                # Registered after the job is tracked, so a job that already finished still clears it
+                future.add_done_callback(lambda done: self._clear_thumbnail_job(key, done))
+            return self._thumbnail_jobs.get(key)
+    
+    def _clear_thumbnail_job(self, key: Tuple[str, int], future: Future):
+        with self._thumbnail_lock:
+            if self._thumbnail_jobs.get(key) is future:
+                del self._thumbnail_jobs[key]
+    
+    def _cancel_prefetch(self):
+        """Stop prefetching for earlier page requests"""
+        self._prefetch_generation += 1
+        job = self._prefetch_job
+        if job is not None:
+            job.cancel()
+    
+    def _prefetch_neighbors(self, page_number: int, zoom: float):
+        """Render nearby pages in the background so paging is served from cache"""
+        doc_hash = self.doc_hash
+        page_count = self.doc.page_count
+        generation = self._prefetch_generation
+        
+        def prefetch():
+            for offset in self.PREFETCH_OFFSETS:
+                neighbor = page_number + offset
+                # Stop if another page was requested or another document loaded meanwhile;
+                # the document lock is only held while one neighbor is rasterized
+                if self._prefetch_generation != generation or self.doc_hash != doc_hash:
+                    return
+                if 1 <= neighbor <= page_count and (doc_hash, neighbor, round(zoom, 3)) not in self.render_cache:
+                    try:
+                        self.rasterize_page(neighbor, zoom)
+                    except Exception as e:
+                        logger.debug(f"Prefetch of page {neighbor} failed: {e}")
+        
+        self._prefetch_job = _prefetch_scheduler.submit(prefetch)
+    
+    def search_text(self, query: Union[str, List[str]], page_number: int = None) -> List[Dict]:
+        """Search for one or more terms in PDF (case-insensitive, single pass per page)"""
         results = []
         
         try:
             if not self.doc:
                 return results
             
-            pages_to_search = [page_number - 1] if page_number else range(self.doc.page_count)
+            terms = [query] if isinstance(query, str) else list(query)
+            terms = [term for term in dict.fromkeys(terms) if term and term.strip()]
+            if not terms:
+                return results
             
-            for page_num in pages_to_search:
-                page = self.doc[page_num]
-                text_instances = page.search_for(query)
-                
-                for inst in text_instances:
-                    results.append({
-                        'page': page_num + 1,
-                        'text': query,
-                        'bbox': list(inst),
-                        'context': self._get_text_context(page, inst, query)
-                    })
+            # Longest terms first so overlapping terms prefer the longer match
+            pattern = re.compile('|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True)),
+                                 re.IGNORECASE)
+            term_lookup = {term.lower(): term for term in terms}
+            
+            pages_to_search = [page_number] if page_number else range(1, self.doc.page_count + 1)
+            
+            # Sequential on purpose: extraction is serialized by the document lock and
+            # the regex scan holds the GIL, so worker threads would only add overhead
+            for number in pages_to_search:
+                results.extend(self._search_page(number, pattern, term_lookup))
                     
         except Exception as e:
             logger.error(f"Failed to search PDF: {str(e)}")
         
         return results
     
+    def _search_page(self, page_number: int, pattern, term_lookup: Dict[str, str]) -> List[Dict]:
+        """All matches of a compiled pattern on one page, with bbox and context per occurrence"""
+        text, boxes = self._page_char_index(page_number)
+        results = []
+        
+        for match in pattern.finditer(text):
+            start, end = match.span()
+            results.append({
+                'page': page_number,
+                'text': term_lookup.get(match.group(0).lower(), match.group(0)),
+                'bbox': self._union_bbox(boxes, start, end),
+                'context': self._get_text_context(text, start, end),
+                'offset': start
+            })
+        
+        return results
+    
+    def _page_char_index(self, page_number: int) -> Tuple[str, array]:
+        """Page text for searching plus the bbox of every character (LRU over recent pages)"""
+        cached = self._cached_page(self._char_index_cache, page_number)
+        if cached is not None:
+            return cached
+        
+        with self._doc_lock:
+            raw = self.doc[page_number - 1].get_text("rawdict")
+        
+        separator = (math.nan,) * 4
+        chars: List[str] = []
+        boxes = array('d')
+        for block in raw.get("blocks", []):
+            if "lines" not in block:
+                continue
+            if chars:
+                chars.append("\n")
+                boxes.extend(separator)
+            for line_index, line in enumerate(block["lines"]):
+                # Lines are joined by a space so phrases can match across line breaks
+                if line_index:
+                    chars.append(" ")
+                    boxes.extend(separator)
+                for span in line["spans"]:
+                    for char in span.get("chars", []):
+                        chars.append(char["c"])
+                        boxes.extend(char["bbox"])
+        
+        index = (''.join(chars), boxes)
+        self._remember_page(self._char_index_cache, page_number, index)
+        return index
+    
+    def _cached_page(self, cache: OrderedDict, page_number: int):
+        """Cached per-page value, marked as most recently used"""
+        with self._page_cache_lock:
+            value = cache.get(page_number)
+            if value is not None:
+                cache.move_to_end(page_number)
+            return value
+    
+    def _remember_page(self, cache: OrderedDict, page_number: int, value):
+        """Store a per-page value, evicting the least recently used pages"""
+        with self._page_cache_lock:
+            cache[page_number] = value
+            cache.move_to_end(page_number)
+            while len(cache) > self.PAGE_CACHE_MAX_PAGES:
+                cache.popitem(last=False)
+    
+    @staticmethod
+    def _union_bbox(boxes: array, start: int, end: int) -> List[float]:
+        """Smallest rectangle covering characters start..end of a flat bbox array"""
+        covered = [boxes[i:i + 4] for i in range(4 * start, 4 * end, 4) if not math.isnan(boxes[i])]
+        if not covered:
+            return []
+        return [min(b[0] for b in covered), min(b[1] for b in covered),
+                max(b[2] for b in covered), max(b[3] for b in covered)]
+    
     def extract_table_of_contents(self) -> List[Dict]:
         """Extract PDF table of contents"""
         try:
@@ -281,38 +663,28 @@ class PDFRenderer(BaseRenderer):
             logger.error(f"Failed to extract TOC: {str(e)}")
             return []
     
-    def _get_text_context(self, page, bbox, query: str, context_chars: int = 100) -> str:
-        """Get text context around search result"""
-        try:
-            page_text = page.get_text()
-            query_index = page_text.lower().find(query.lower())
-            
-            if query_index == -1:
-                return query
-            
-            start = max(0, query_index - context_chars)
-            end = min(len(page_text), query_index + len(query) + context_chars)
-            
-            context = page_text[start:end]
-            return context.strip()
-            
-        except Exception:
-            return query
+    def _get_text_context(self, page_text: str, start: int, end: int, context_chars: int = 100) -> str:
+        """Get text context around a search result occurrence"""
+        context = page_text[max(0, start - context_chars):min(len(page_text), end + context_chars)]
+        return context.strip()
 
 class TextRenderer(BaseRenderer):
     """Text file renderer for TXT, MD files"""
     
+    LINES_PER_PAGE = 50
+    
     def __init__(self):
         super().__init__()
         self.content = ""
         self.pages = []
-        self.lines_per_page = 50
+        self.lines_per_page = self.LINES_PER_PAGE
     
     def load(self, file_data: Union[bytes, str]) -> bool:
         """Load text file"""
         try:
-            if isinstance(file_data, bytes):
-                self.content = file_data.decode('utf-8', errors='ignore')
+            if isinstance(file_data, (bytes, bytearray, memoryview, mmap.mmap)):
+                # Decodes straight from the buffer (e.g. a memory-mapped upload)
+                self.content = str(file_data, 'utf-8', errors='ignore')
             else:
                 self.content = file_data
             
@@ -391,6 +763,81 @@ class TextRenderer(BaseRenderer):
         
         return results
 
+def _iter_pdf_texts(source: Union[bytes, str]) -> Iterator[str]:
+    """Page texts of a PDF, extracting one page at a time"""
+    if PYMUPDF_AVAILABLE:
+        doc = fitz.open(source) if isinstance(source, str) else fitz.open(stream=source, filetype="pdf")
+        try:
+            for page in doc:
+                yield page.get_text()
+        finally:
+            doc.close()
+        return
+    
+    # PyPDF2 also parses pages lazily
+    import PyPDF2
+    stream = open(source, 'rb') if isinstance(source, str) else io.BytesIO(source)
+    with stream:
+        for page in PyPDF2.PdfReader(stream).pages:
+            yield page.extract_text() or ""
+
+def _iter_text_pages(source: Union[bytes, str], lines_per_page: int) -> Iterator[str]:
+    """Pages of a text file, reading lines_per_page lines at a time"""
+    if isinstance(source, str):
+        stream = open(source, 'r', encoding='utf-8', errors='ignore', newline='')
+    else:
+        stream = io.TextIOWrapper(io.BytesIO(source), encoding='utf-8', errors='ignore', newline='')
+    
+    with stream:
+        lines = []
+        for line in stream:
+            lines.append(line[:-1] if line.endswith('\n') else line)
+            if len(lines) == lines_per_page:
+                yield '\n'.join(lines)
+                lines = []
+        if lines:
+            yield '\n'.join(lines)
+
+def _iter_html_pages(source: Union[bytes, str], lines_per_page: int) -> Iterator[str]:
+    """Pages of an HTML file's visible text, lines_per_page lines at a time"""
+    from .epub_renderer import html_to_text
+    
+    # Tags can span lines, so the markup is converted as a whole before paging
+    if isinstance(source, str):
+        with open(source, 'r', encoding='utf-8', errors='ignore') as f:
+            markup = f.read()
+    else:
+        markup = source.decode('utf-8', errors='ignore')
+    _, text = html_to_text(markup)
+    yield from _iter_text_pages(text.encode('utf-8'), lines_per_page)
+
+def iter_pages(source: Union[bytes, str], file_type: str) -> Iterator[DocumentPage]:
+    """
+    Lazily yield text-only pages of a document from a file path or bytes.
+    
+    Only the current page is held in memory, so chunking, processing and export
+    stages can consume documents of any size as a generator pipeline.
+    """
+    file_type = file_type.lower().replace('.', '')
+    
+    if file_type == 'pdf':
+        texts = _iter_pdf_texts(source)
+    elif file_type in ('txt', 'md'):
+        texts = _iter_text_pages(source, TextRenderer.LINES_PER_PAGE)
+    elif file_type == 'html':
+        texts = _iter_html_pages(source, TextRenderer.LINES_PER_PAGE)
+    elif file_type == 'docx':
+        from .docx_renderer import iter_docx_pages
+        texts = iter_docx_pages(source)
+    elif file_type == 'epub':
+        from .epub_renderer import iter_epub_chapters
+        texts = (text for _, text in iter_epub_chapters(source))
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+    
+    for page_number, text in enumerate(texts, start=1):
+        yield DocumentPage(page_number=page_number, text_content=text)
+
 class UniversalDocumentReader:
     """Main document reader class with multi-format support"""
     
@@ -423,8 +870,14 @@ class UniversalDocumentReader:
         self.current_format = None
         self.document_metadata = None
         
-    def load_document(self, file_data: Union[bytes, str], file_type: str, filename: str = "") -> Dict[str, Any]:
-        """Load document of specified type"""
+    def load_document(self, file_data: Union[bytes, str, Path], file_type: str, filename: str = "",
+                      content_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Load document of specified type.
+        
+        A Path is opened in place rather than read into memory; content_hash
+        (the file's SHA-256, if already known) keys page and thumbnail caches.
+        """
         try:
             file_type = file_type.lower().replace('.', '')
             
@@ -437,16 +890,27 @@ class UniversalDocumentReader:
             
             renderer = self.renderers[file_type]
             
-            if not renderer.load(file_data):
+            if isinstance(file_data, Path):
+                loaded = self._load_from_path(renderer, file_data)
+            else:
+                loaded = renderer.load(file_data)
+            
+            if not loaded:
                 return {
                     'success': False,
                     'error': f"Failed to load {file_type} document"
                 }
             
+            if content_hash and isinstance(renderer, PDFRenderer):
+                renderer.doc_hash = content_hash
+            
             self.current_renderer = renderer
             self.current_format = file_type
             self.document_metadata = renderer.get_metadata()
             
+            # Previews for the navigator are produced in the background
+            renderer.generate_thumbnails_async()
+            
             return {
                 'success': True,
                 'total_pages': renderer.get_page_count(),
@@ -463,6 +927,17 @@ class UniversalDocumentReader:
                 'error': str(e)
             }
     
+    @staticmethod
+    def _load_from_path(renderer: BaseRenderer, path: Path) -> bool:
+        """Hand a file to a renderer without an intermediate bytes copy"""
+        if not isinstance(renderer, TextRenderer):
+            return renderer.load(str(path))
+        
+        if path.stat().st_size == 0:
+            return renderer.load(b"")
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return renderer.load(mapped)
+    
     def render_page(self, page_number: int, zoom: float = 1.0) -> Optional[DocumentPage]:
         """Render specific page"""
         if not self.current_renderer:
@@ -470,6 +945,21 @@ class UniversalDocumentReader:
         
         return self.current_renderer.render_page(page_number, zoom)
     
+    def render_thumbnail(self, page_number: int, width: int = THUMBNAIL_WIDTH,
+                         cached_only: bool = False) -> Optional[bytes]:
+        """Render low-resolution preview of a page (cached_only: never rasterize)"""
+        if not self.current_renderer:
+            return None
+        
+        return self.current_renderer.render_thumbnail(page_number, width, cached_only)
+    
+    def is_page_rendered(self, page_number: int, zoom: float = 1.0) -> bool:
+        """Check if a page image is already cached at this zoom"""
+        if not self.current_renderer:
+            return False
+        
+        return self.current_renderer.is_page_rendered(page_number, zoom)
+    
     def extract_page_text(self, page_number: int) -> str:
         """Extract text from specific page"""
         if not self.current_renderer:
@@ -477,6 +967,15 @@ class UniversalDocumentReader:
         
         return self.current_renderer.extract_text(page_number)
     
+    def iter_pages(self, start_page: int = 1, end_page: Optional[int] = None) -> Iterator[DocumentPage]:
+        """Yield text of the loaded document's pages one at a time"""
+        if not self.current_renderer:
+            return
+        
+        last_page = min(end_page or self.get_page_count(), self.get_page_count())
+        for page_number in range(max(1, start_page), last_page + 1):
+            yield DocumentPage(page_number=page_number, text_content=self.extract_page_text(page_number))
+    
     def search_document(self, query: str, page_number: int = None) -> List[Dict]:
         """Search entire document or specific page"""
         if not self.current_renderer:
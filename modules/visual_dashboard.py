@@ -336,7 +336,7 @@ class VisualDashboard:
             if hasattr(performance_optimizer, 'cache'):
                 st.subheader("🗄️ Cache Performance")
                 
-                cache_stats = performance_optimizer.cache.stats()
+                cache_stats = performance_optimizer.cache.get_stats()
                 
                 col1, col2, col3, col4 = st.columns(4)
                 col1.metric("Cache Size", cache_stats.get('size', 0))
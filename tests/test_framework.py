@@ -9,6 +9,9 @@ import pytest
 import asyncio
 import tempfile
 import os
+import sqlite3
+import threading
+import time
 from pathlib import Path
 from unittest.mock import Mock, patch, MagicMock
 from datetime import datetime, timedelta
@@ -17,9 +20,20 @@ import json
 # Import modules to test
 from modules.data_validator import DataValidator, ValidationResult
 from modules.business_rules import BusinessRules, ProcessingPriority
-from modules.performance_optimizer import PerformanceOptimizer, LRUCache
+from modules.performance_optimizer import PerformanceOptimizer, LRUCache, DiskCache, SQLiteDiskCache
 from modules.ux_improvements import UXEnhancements, ProgressTracker
 from modules.integration_manager import IntegrationManager, ProcessingContext
+from modules.database_manager import DatabaseManager
+from modules.intelligent_processor import ProcessingResult
+from modules.processing_cache import ProcessingResultCache, normalize_params, processing_cache_key
+import modules.universal_document_reader as document_reader
+from modules.universal_document_reader import (
+    PageRenderCache, PDFRenderer, TextRenderer, iter_pages, _iter_text_pages,
+    thumbnail_path, cached_thumbnail, _write_thumbnail
+)
+from modules.docx_renderer import iter_docx_pages, DOCX_AVAILABLE
+from modules.epub_renderer import iter_epub_chapters
+from modules.enhanced_universal_extractor import EnhancedUniversalExtractor
 
 class TestDataValidator:
     """Test data validation functionality"""
@@ -254,7 +268,80 @@ class TestPerformanceOptimizer:
         assert stats['size'] == 3
         assert stats['hits'] == 2
         assert stats['misses'] == 1
-    
+
+    def test_lru_cache_expiry(self):
+        """Test expired entries are dropped from the heap on the next set"""
+        cache = LRUCache(max_size=10, max_memory_mb=1)
+        cache.set("short", "value", ttl_seconds=-1)
+        cache.set("long", "value", ttl_seconds=3600)
+
+        assert cache.get("short") is None
+        cache.set("other", "value", ttl_seconds=3600)
+
+        stats = cache.get_stats()
+        assert stats['expirations'] == 1
+        assert stats['size'] == 2
+        assert "short" not in cache.cache
+
+    def test_lru_cache_sizers(self):
+        """Test memory accounting with estimated and custom sizes"""
+        from modules.performance_optimizer import estimate_size
+
+        assert estimate_size("abcd") == 4
+        assert estimate_size(b"x" * 100) == 100
+        assert estimate_size(["x" * 100] * 100) >= 100 * 100
+
+        cache = LRUCache(max_size=100, max_memory_mb=1, sizer=lambda value: 400 * 1024)
+        for i in range(3):
+            cache.set(f"key{i}", i, ttl_seconds=3600)
+        stats = cache.get_stats()
+        assert stats['size'] == 2
+        assert stats['evictions'] == 1
+        assert cache.get("key0") is None
+
+    def test_lru_cache_namespace_stats(self):
+        """Test hits, misses and evictions are counted per key namespace"""
+        cache = LRUCache(max_size=2, max_memory_mb=1)
+        cache.set("search:a", 1, ttl_seconds=3600)
+        cache.set("plain", 2, ttl_seconds=3600)
+        cache.get("search:a")
+        cache.get("search:missing")
+        cache.get("plain")
+        cache.set("search:b", 3, ttl_seconds=3600)  # evicts "search:a", least recently used
+
+        namespaces = cache.get_stats()['namespaces']
+        assert namespaces['search']['hits'] == 1
+        assert namespaces['search']['misses'] == 1
+        assert namespaces['search']['evictions'] == 1
+        assert namespaces['default']['hits'] == 1
+        assert namespaces['default']['evictions'] == 0
+
+    def test_lru_cache_concurrent_access(self):
+        """Test concurrent gets, sets and stats do not corrupt the cache"""
+        import threading
+        cache = LRUCache(max_size=50, max_memory_mb=1)
+        errors = []
+
+        def worker(n):
+            try:
+                for i in range(2000):
+                    key = f"ns{(n + i) % 7}:{i % 80}"
+                    cache.set(key, i, ttl_seconds=3600)
+                    cache.get(f"ns{i % 11}:{i % 90}")
+                    if i % 50 == 0:
+                        cache.get_stats()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert len(cache.cache) <= 50
+
     def test_cache_decorator(self):
         """Test caching decorator"""
         call_count = 0
@@ -279,7 +366,125 @@ class TestPerformanceOptimizer:
         result3 = expensive_function(3)
         assert result3 == 6
         assert call_count == 2
-    
+
+    def test_cache_decorator_returns_copies(self):
+        """Test mutating a returned value does not change the cached one"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            optimizer = PerformanceOptimizer(disk_cache=SQLiteDiskCache(os.path.join(tmp_dir, "cache.db")))
+
+            @optimizer.cached(ttl_seconds=60, persistent=True)
+            def analyze(text):
+                return [{'content': text, 'metadata': {}}]
+
+            first = analyze("original")
+            first[0]['content'] = "enhanced"
+            first[0]['metadata']['enhanced_with_ai'] = True
+
+            assert analyze("original") == [{'content': 'original', 'metadata': {}}]
+            optimizer.cache.clear()
+            assert analyze("original") == [{'content': 'original', 'metadata': {}}]
+
+    def test_cache_decorator_single_flight(self):
+        """Test concurrent identical calls compute once"""
+        import threading
+        import time
+        call_count = 0
+
+        @self.optimizer.cached(ttl_seconds=60)
+        def slow_function(x):
+            nonlocal call_count
+            call_count += 1
+            time.sleep(0.2)
+            return x * 2
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(slow_function(7))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == [14] * 8
+        assert call_count == 1
+
+    def test_persistent_cache_tier(self):
+        """Test persistent results survive a new optimizer and are keyed by cache_identity"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "cache.db")
+            call_count = 0
+
+            class Processor:
+                def __init__(self, model):
+                    self.model = model
+
+                def cache_identity(self):
+                    return self.model
+
+                def analyze(self, text):
+                    nonlocal call_count
+                    call_count += 1
+                    return {'text': text, 'model': self.model}
+
+            def make_analyze(optimizer):
+                return optimizer.cached(ttl_seconds=60, persistent=True)(Processor.analyze)
+
+            first = PerformanceOptimizer(disk_cache=SQLiteDiskCache(db_path))
+            assert make_analyze(first)(Processor("v1"), "hello") == {'text': 'hello', 'model': 'v1'}
+            assert call_count == 1
+
+            # Fresh process state: served from disk for an equal (not identical) self
+            second = PerformanceOptimizer(disk_cache=SQLiteDiskCache(db_path))
+            analyze = make_analyze(second)
+            assert analyze(Processor("v1"), "hello") == {'text': 'hello', 'model': 'v1'}
+            assert call_count == 1
+            assert second.disk_cache.get_stats()['hits'] == 1
+
+            # Different identity is a different key
+            analyze(Processor("v2"), "hello")
+            assert call_count == 2
+
+            # cleanup() only drops the memory tier
+            second.cleanup()
+            assert second.disk_cache.get_stats()['size'] == 2
+
+    def test_persistent_cache_skips_unstable_keys(self):
+        """Test objects keyed only by process identity are not written to disk"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            disk_cache = SQLiteDiskCache(os.path.join(tmp_dir, "cache.db"))
+            optimizer = PerformanceOptimizer(disk_cache=disk_cache)
+
+            @optimizer.cached(ttl_seconds=60, persistent=True)
+            def describe(obj):
+                return type(obj).__name__
+
+            marker = object()
+            assert describe(marker) == 'object'
+            assert describe(marker) == 'object'
+            assert disk_cache.get_stats()['size'] == 0
+            assert optimizer.cache.get_stats()['hits'] == 1
+
+    def test_sqlite_disk_cache_expiry_and_eviction(self):
+        """Test disk tier TTL expiry and size-bounded eviction"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            disk_cache = SQLiteDiskCache(os.path.join(tmp_dir, "cache.db"), max_size_mb=1)
+
+            disk_cache.set("expired", "value", ttl_seconds=-1)
+            assert disk_cache.get("expired") is None
+
+            blob = b"x" * (300 * 1024)
+            for i in range(5):
+                disk_cache.set(f"blob{i}", blob, ttl_seconds=60)
+            stats = disk_cache.get_stats()
+            assert stats['memory_mb'] <= 0.9
+            assert stats['evictions'] > 0
+            assert disk_cache.get("blob4") == blob
+            assert disk_cache.get("blob0") is None
+
+    def test_disk_cache_is_abstract(self):
+        """Test DiskCache implementations must provide the tier operations"""
+        with pytest.raises(TypeError):
+            DiskCache()
+
     def test_performance_measurement(self):
         """Test performance measurement decorator"""
         @self.optimizer.measure_performance("test_operation")
@@ -319,6 +524,358 @@ class TestPerformanceOptimizer:
         assert stats['cpu_percent'] >= 0
         assert stats['memory_percent'] >= 0
 
+class TestProcessingCache:
+    """Test processing result reuse through cache keys"""
+    
+    def setup_method(self):
+        """Set up a throwaway database"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.temp_dir, 'cache.db'))
+        self.session_id = self.db.create_session('tester')
+        self.document_id = self.db.store_document(self.session_id, 'doc.txt', b'text', 'txt')
+    
+    def _store(self, cache_key, content, session_id=None, mode="Summary Creation"):
+        return self.db.store_processing_result(
+            self.document_id, session_id or self.session_id, mode, 1,
+            {'id': content, 'type': 'summary', 'content': content, 'metadata': {}}, 0.9,
+            cache_key=cache_key
+        )
+    
+    def test_normalize_params(self):
+        """Test equivalent parameters normalize to the same value"""
+        assert normalize_params({'keywords': [' b ', 'a', 'a', ''], 'query': '  two   words ',
+                                 'temperature': 0.700001, 'unset': None, 'empty': ''}) == {
+            'keywords': ['a', 'b'], 'query': 'two words', 'temperature': 0.7
+        }
+    
+    def test_processing_cache_key(self):
+        """Test keys depend on text, mode, params and model, not on param formatting"""
+        key = processing_cache_key("page text", "Summary Creation", {'keywords': ['a', 'b']}, 'v1')
+        assert key == processing_cache_key("page text", "Summary Creation", {'keywords': ['b', ' a']}, 'v1')
+        assert key != processing_cache_key("other text", "Summary Creation", {'keywords': ['a', 'b']}, 'v1')
+        assert key != processing_cache_key("page text", "Theme Analysis", {'keywords': ['a', 'b']}, 'v1')
+        assert key != processing_cache_key("page text", "Summary Creation", {'keywords': ['a']}, 'v1')
+        assert key != processing_cache_key("page text", "Summary Creation", {'keywords': ['a', 'b']}, 'v2')
+    
+    def test_cached_results_come_from_latest_run(self):
+        """Test only the most recent run stored under a key is returned"""
+        other_session = self.db.create_session('other')
+        self._store('key', 'old-1')
+        self._store('key', 'old-2')
+        self._store('key', 'new-1', session_id=other_session)
+        self._store('key', 'new-2', session_id=other_session)
+        self._store('unrelated', 'x')
+        
+        records = self.db.get_cached_processing_results('key')
+        assert [r.result_data['content'] for r in records] == ['new-1', 'new-2']
+    
+    def test_invalidate_processing_cache(self):
+        """Test invalidation releases keys per mode while keeping the results"""
+        self._store('summary-key', 'summary')
+        self._store('theme-key', 'theme', mode="Theme Analysis")
+        
+        assert self.db.invalidate_processing_cache("Theme Analysis") == 1
+        assert self.db.get_cached_processing_results('theme-key') == []
+        assert len(self.db.get_cached_processing_results('summary-key')) == 1
+        assert len(self.db.get_processing_results(self.document_id)) == 2
+        
+        assert self.db.invalidate_processing_cache() == 1
+        assert self.db.get_cached_processing_results('summary-key') == []
+    
+    def test_purge_processing_cache(self):
+        """Test superseded runs and expired keys are released"""
+        other_session = self.db.create_session('other')
+        self._store('key', 'old')
+        self._store('key', 'new', session_id=other_session)
+        self._store('aged', 'aged')
+        with sqlite3.connect(self.db.db_path) as conn:
+            conn.execute("UPDATE processing_results SET created_at = datetime('now', '-60 days') "
+                         "WHERE cache_key = 'aged'")
+        
+        assert self.db.purge_processing_cache(max_age_days=30) == 2
+        assert [r.result_data['content'] for r in self.db.get_cached_processing_results('key')] == ['new']
+        assert self.db.get_cached_processing_results('aged') == []
+    
+    def test_cache_key_column_migration(self):
+        """Test databases created before result caching gain the cache_key column"""
+        db_path = os.path.join(self.temp_dir, 'legacy.db')
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("""
+                CREATE TABLE processing_results (
+                    result_id TEXT PRIMARY KEY, document_id TEXT NOT NULL, session_id TEXT NOT NULL,
+                    processing_mode TEXT NOT NULL, page_number INTEGER NOT NULL,
+                    result_data TEXT NOT NULL, confidence REAL NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+        
+        legacy = DatabaseManager(db_path)
+        with sqlite3.connect(db_path) as conn:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(processing_results)")}
+        assert 'cache_key' in columns
+        legacy.store_processing_result('doc', 'session', "Summary Creation", 1, {'content': 'x'}, 0.5,
+                                       cache_key='key')
+        assert len(legacy.get_cached_processing_results('key')) == 1
+    
+    def test_result_cache_round_trip(self):
+        """Test the in-memory tier hands out copies attributed to the requested page"""
+        cache = ProcessingResultCache(self.db)
+        result = ProcessingResult(id='r1', type='summary', content='text', source_text='src',
+                                  source_page=1, confidence=0.9, metadata={'a': 1}, timestamp='t')
+        assert cache.get('key', 1) is None
+        cache.put('key', [result])
+        result.metadata['a'] = 2
+        
+        hit = cache.get('key', 7)
+        assert hit[0].source_page == 7
+        assert hit[0].metadata == {'a': 1, 'from_cache': True}
+        hit[0].metadata['a'] = 3
+        assert cache.get('key', 7)[0].metadata['a'] == 1
+        assert cache.get_stats()['hits'] == 2
+
+class TestPageRenderCache:
+    """Test the byte-bounded page image cache"""
+    
+    def test_byte_bound(self):
+        """Test entries are evicted to stay under max_bytes"""
+        cache = PageRenderCache(max_bytes=100)
+        for page in range(1, 5):
+            cache.put(('doc', page, 1.0), b'x' * 30)
+        
+        assert cache.current_bytes == 90
+        assert ('doc', 1, 1.0) not in cache
+        assert all(('doc', page, 1.0) in cache for page in (2, 3, 4))
+        
+        # Larger than the whole cache: not stored, nothing evicted
+        cache.put(('doc', 5, 1.0), b'x' * 101)
+        assert ('doc', 5, 1.0) not in cache
+        assert cache.get_stats()['entries'] == 3
+    
+    def test_replacing_entry_updates_size(self):
+        """Test re-putting a key replaces its bytes instead of adding to them"""
+        cache = PageRenderCache(max_bytes=100)
+        cache.put(('doc', 1, 1.0), b'x' * 60)
+        cache.put(('doc', 1, 1.0), b'x' * 20)
+        
+        assert cache.current_bytes == 20
+        assert cache.get(('doc', 1, 1.0)) == b'x' * 20
+    
+    def test_lru_order(self):
+        """Test reads refresh recency, so the least recently used entry is evicted"""
+        cache = PageRenderCache(max_bytes=90)
+        for page in (1, 2, 3):
+            cache.put(('doc', page, 1.0), b'x' * 30)
+        
+        assert cache.get(('doc', 1, 1.0)) is not None
+        cache.put(('doc', 4, 1.0), b'x' * 30)
+        
+        assert ('doc', 2, 1.0) not in cache
+        assert list(cache.entries) == [('doc', 3, 1.0), ('doc', 1, 1.0), ('doc', 4, 1.0)]
+        assert cache.get(('doc', 2, 1.0)) is None
+        assert cache.hits == 1 and cache.misses == 1
+
+class TestPageIterators:
+    """Test lazy page iteration over generated TXT, DOCX and EPUB files"""
+    
+    def setup_method(self):
+        """Set up a scratch directory"""
+        self.temp_dir = tempfile.mkdtemp()
+    
+    def _write_epub(self, chapters):
+        """Minimal EPUB: container, package manifest and one XHTML file per chapter"""
+        import zipfile
+        path = os.path.join(self.temp_dir, 'book.epub')
+        items = ''.join(
+            f'<item id="c{i}" href="c{i}.xhtml" media-type="application/xhtml+xml"/>' for i in range(len(chapters))
+        )
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr('mimetype', 'application/epub+zip')
+            archive.writestr('META-INF/container.xml', (
+                '<?xml version="1.0"?><container version="1.0" '
+                'xmlns="urn:oasis:names:tc:opendocument:xmlns:container"><rootfiles>'
+                '<rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+                '</rootfiles></container>'
+            ))
+            archive.writestr('OEBPS/content.opf', (
+                '<?xml version="1.0"?><package xmlns="http://www.idpf.org/2007/opf" version="3.0">'
+                f'<manifest><item id="css" href="style.css" media-type="text/css"/>{items}</manifest>'
+                '</package>'
+            ))
+            for i, (title, body) in enumerate(chapters):
+                archive.writestr(f'OEBPS/c{i}.xhtml', (
+                    f'<html xmlns="http://www.w3.org/1999/xhtml"><head><title>{title}</title><style>h1 {{ margin: 0 }}</style></head>'
+                    f'<body><h1>{title}</h1><p>{body}</p></body></html>'
+                ))
+        return path
+    
+    def test_iter_text_pages(self):
+        """Test text is split every lines_per_page lines, keeping a short last page"""
+        source = "\n".join(f"line {i}" for i in range(7)).encode('utf-8')
+        pages = list(_iter_text_pages(source, 3))
+        
+        assert pages == ["line 0\nline 1\nline 2", "line 3\nline 4\nline 5", "line 6"]
+    
+    def test_iter_pages_txt_from_path(self):
+        """Test pages of a text file on disk are numbered from 1"""
+        path = os.path.join(self.temp_dir, 'doc.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(f"line {i}" for i in range(TextRenderer.LINES_PER_PAGE + 1)))
+        
+        pages = list(iter_pages(path, '.TXT'))
+        assert [page.page_number for page in pages] == [1, 2]
+        assert pages[1].text_content == f"line {TextRenderer.LINES_PER_PAGE}"
+    
+    def test_iter_pages_html_strips_markup(self):
+        """Test HTML pages carry visible text only"""
+        markup = b"<html><head><style>p {}</style></head><body><h1>Title</h1><p>Body text</p></body></html>"
+        text = "\n".join(page.text_content for page in iter_pages(markup, 'html'))
+        
+        assert "Title" in text and "Body text" in text
+        assert "<" not in text and "p {}" not in text
+    
+    def test_iter_pages_unsupported_type(self):
+        """Test unknown formats are rejected when iteration starts"""
+        with pytest.raises(ValueError):
+            list(iter_pages(b"data", 'xyz'))
+    
+    @pytest.mark.skipif(not DOCX_AVAILABLE, reason="python-docx not installed")
+    def test_iter_docx_pages(self):
+        """Test DOCX paragraphs are paginated, with level-1 headings starting a page"""
+        from docx import Document
+        document = Document()
+        document.add_heading("Chapter One", level=1)
+        document.add_paragraph("First paragraph.")
+        document.add_heading("Chapter Two", level=1)
+        document.add_paragraph("Second paragraph.")
+        path = os.path.join(self.temp_dir, 'doc.docx')
+        document.save(path)
+        
+        pages = list(iter_docx_pages(path))
+        assert pages == ["Chapter One\nFirst paragraph.", "Chapter Two\nSecond paragraph."]
+        assert [page.text_content for page in iter_pages(path, 'docx')] == pages
+    
+    def test_iter_epub_chapters(self):
+        """Test XHTML chapters are read in manifest order, skipping other items"""
+        path = self._write_epub([("Opening", "It began."), ("Ending", "It ended.")])
+        
+        chapters = list(iter_epub_chapters(path))
+        assert [title for title, _ in chapters] == ["Opening", "Ending"]
+        assert "It began." in chapters[0][1] and "margin" not in chapters[0][1]
+        assert [page.page_number for page in iter_pages(path, 'epub')] == [1, 2]
+    
+    def test_extractor_detects_content_per_segment(self):
+        """Test smart detection runs per segment: Q&A in one segment no longer hides prose in another"""
+        qa = ["Q: What is the nature of the mind and how can we know it?",
+              "A: The mind is awareness itself, known by resting in what is already present."] * 25
+        prose = ["The river ran quietly past the old mill where the villagers gathered "
+                 "every evening to talk about the harvest and the weather."] * 50
+        path = os.path.join(self.temp_dir, 'mixed.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(qa + prose))
+        
+        # Whole document in one segment: Q&A detection covers all of it
+        extractor = EnhancedUniversalExtractor()
+        assert {example['type'] for example in extractor.extract_text(path)} == {'structured_qa'}
+        
+        # One page per segment: the prose page is classified on its own
+        extractor = EnhancedUniversalExtractor()
+        extractor.max_regex_length = 4000
+        assert {example['type'] for example in extractor.extract_text(path)} == {'structured_qa', 'monologue'}
+
+class TestThumbnails:
+    """Test the on-disk thumbnail cache and background thumbnail jobs"""
+    
+    def setup_method(self):
+        """Set up a scratch thumbnail directory"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+    
+    def test_thumbnail_path(self, monkeypatch):
+        """Test thumbnails are stored per document, page and width"""
+        monkeypatch.setenv('RENDER', 'true')
+        assert thumbnail_path('abc', 3) == Path('/tmp/thumbnails/abc/3_160.jpg')
+        monkeypatch.delenv('RENDER')
+        assert thumbnail_path('abc', 3, width=320) == Path('./data/thumbnails/abc/3_320.jpg')
+    
+    def test_cached_thumbnail(self, monkeypatch):
+        """Test cached thumbnails are read back, and missing ones return None"""
+        monkeypatch.setattr(document_reader, 'thumbnail_cache_dir', lambda: self.temp_dir)
+        assert cached_thumbnail('abc', 1) is None
+        
+        path = thumbnail_path('abc', 1)
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b'jpeg')
+        assert cached_thumbnail('abc', 1) == b'jpeg'
+        assert cached_thumbnail('abc', 1, width=320) is None
+    
+    def test_write_thumbnail_replaces_atomically(self, monkeypatch):
+        """Test thumbnails are rasterized to width and written via a renamed temp file"""
+        zooms = []
+        monkeypatch.setattr(document_reader, 'fitz',
+                            type('FakeFitz', (), {'Matrix': staticmethod(lambda x, y: zooms.append((x, y)))}),
+                            raising=False)
+        pixmap = Mock()
+        pixmap.tobytes.return_value = b'new'
+        page = Mock()
+        page.rect.width = 400
+        page.get_pixmap.return_value = pixmap
+        
+        path = self.temp_dir / '1_160.jpg'
+        path.write_bytes(b'old')
+        replaced = []
+        real_replace = os.replace
+        
+        def checked_replace(src, dst):
+            # The final path still holds the old image until the rename
+            assert path.read_bytes() == b'old' and Path(src).read_bytes() == b'new'
+            replaced.append((Path(src), Path(dst)))
+            real_replace(src, dst)
+        
+        monkeypatch.setattr(document_reader.os, 'replace', checked_replace)
+        assert _write_thumbnail(page, path, 160) == b'new'
+        
+        assert zooms == [(0.4, 0.4)]
+        assert path.read_bytes() == b'new'
+        assert replaced[0][1] == path
+        assert list(self.temp_dir.iterdir()) == [path]
+    
+    def test_generate_thumbnails_async_dedup(self, monkeypatch):
+        """Test concurrent requests share one job per document and width, cleared when done"""
+        release = threading.Event()
+        calls = []
+        
+        def generate(width):
+            calls.append(width)
+            release.wait(5)
+            return 1
+        
+        renderer = PDFRenderer()
+        renderer.doc = Mock(page_count=1)
+        renderer.doc_hash = 'abc'
+        monkeypatch.setattr(renderer, 'generate_thumbnails', generate)
+        
+        first = renderer.generate_thumbnails_async()
+        assert renderer.generate_thumbnails_async() is first
+        other_width = renderer.generate_thumbnails_async(width=320)
+        assert other_width is not first
+        
+        release.set()
+        assert first.result(5) == 1 and other_width.result(5) == 1
+        assert calls == [160, 320]
+        self._wait_for_jobs_cleared(renderer)
+        
+        # A finished job does not block regenerating later
+        assert renderer.generate_thumbnails_async().result(5) == 1
+        assert calls == [160, 320, 160]
+        self._wait_for_jobs_cleared(renderer)
+    
+    @staticmethod
+    def _wait_for_jobs_cleared(renderer, timeout: float = 5.0):
+        # Done callbacks may run just after result() returns
+        deadline = time.monotonic() + timeout
+        while renderer._thumbnail_jobs and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert renderer._thumbnail_jobs == {}
+
 class TestUXEnhancements:
     """Test UX enhancement features"""
     